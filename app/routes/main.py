@@ -12,6 +12,7 @@ import bleach
 from app.routes import main_bp
 from app.models import Post, Category, Tag, Comment
 from app.forms import CommentForm, SearchForm
+from app.utils import get_catalog
 from app import db
 
 
@@ -39,15 +40,14 @@ def index():
     )
     posts = pagination.items
     
-    # 获取所有分类和标签用于侧边栏
-    categories = Category.query.all()
-    tags = Tag.query.all()
+    # 侧边栏分类和标签读目录快照，稳定状态下不查库
+    catalog = get_catalog()
     
     return render_template('index.html',
                          posts=posts,
                          pagination=pagination,
-                         categories=categories,
-                         tags=tags)
+                         categories=catalog['categories'],
+                         tags=catalog['tags'])
 
 
 @main_bp.route('/post/<slug>')
@@ -232,18 +232,19 @@ def archives():
     归档页面路由
     按时间顺序展示所有文章
     """
-    posts = Post.query.filter_by(is_published=True).order_by(
-        Post.published_at.desc()
-    ).all()
+    # 只取模板用到的列，不加载正文
+    posts = db.session.query(
+        Post.slug, Post.title, Post.published_at, Post.created_at
+    ).filter(
+        Post.is_published == True,
+        Post.published_at.isnot(None)
+    ).order_by(Post.published_at.desc()).all()
     
     # 按年月分组
     archives_dict = {}
     for post in posts:
-        if post.published_at:
-            year_month = post.published_at.strftime('%Y年%m月')
-            if year_month not in archives_dict:
-                archives_dict[year_month] = []
-            archives_dict[year_month].append(post)
+        year_month = post.published_at.strftime('%Y年%m月')
+        archives_dict.setdefault(year_month, []).append(post)
     
     return render_template('archives.html', archives=archives_dict)
 
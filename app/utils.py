@@ -4,14 +4,31 @@
 包含模板过滤器和其他辅助函数
 """
 
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 from markdown import markdown
 import bleach
+from flask import current_app
+from sqlalchemy import event, func, literal, select, union_all, and_
+from sqlalchemy.orm import attributes
+
+from app import db
+
+
+# Markdown渲染结果缓存（按内容哈希，进程内LRU）
+MARKDOWN_CACHE_SIZE = 512
+_markdown_cache = OrderedDict()
+_markdown_cache_lock = threading.Lock()
 
 
 def markdown_filter(text):
     """
     Markdown转HTML模板过滤器
+    相同内容只渲染一次，之后直接读取缓存
     
     Args:
         text: Markdown格式的文本
@@ -22,6 +39,33 @@ def markdown_filter(text):
     if not text:
         return ''
     
+    key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    with _markdown_cache_lock:
+        html = _markdown_cache.get(key)
+        if html is not None:
+            _markdown_cache.move_to_end(key)
+            return html
+    
+    html = _render_markdown(text)
+    
+    with _markdown_cache_lock:
+        _markdown_cache[key] = html
+        while len(_markdown_cache) > MARKDOWN_CACHE_SIZE:
+            _markdown_cache.popitem(last=False)
+    
+    return html
+
+
+def _render_markdown(text):
+    """
+    渲染Markdown并清理HTML
+    
+    Args:
+        text: Markdown格式的文本
+        
+    Returns:
+        str: 渲染后的HTML
+    """
     # 允许的HTML标签
     allowed_tags = [
         'p', 'br', 'strong', 'em', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
@@ -87,3 +131,126 @@ def timesince_filter(dt):
     else:
         years = int(seconds / 31536000)
         return f'{years}年前'
+
+
+# 侧边栏分类/标签目录（含已发布文章数），进程内快照
+# 版本号存放在实例目录的文件里（文件字节数即版本号），多个worker共享，
+# 任一worker提交修改后所有worker下次访问时重建；TTL只在绕过应用直接改库时兜底
+CATALOG_CACHE_TTL = 300
+CATALOG_VERSION_FILE = 'catalog.version'
+CatalogEntry = namedtuple('CatalogEntry', 'id name slug post_count')
+_catalog = {'data': None, 'built_at': 0.0, 'generation': None}
+_catalog_lock = threading.Lock()
+
+
+def _catalog_version_path():
+    return os.path.join(current_app.instance_path, CATALOG_VERSION_FILE)
+
+
+def _catalog_generation():
+    """读取共享版本号，文件不存在为0，读取失败返回None"""
+    try:
+        return os.stat(_catalog_version_path()).st_size
+    except FileNotFoundError:
+        return 0
+    except OSError:
+        return None
+
+
+def _build_catalog():
+    """一条分组查询统计所有分类和标签的已发布文章数"""
+    from app.models import Post, Category, Tag
+    from app.models.post import post_tags
+
+    published = Post.is_published == True
+    category_counts = select(
+        literal('category').label('kind'), Category.id, Category.name, Category.slug,
+        func.count(Post.id).label('post_count')
+    ).select_from(Category).outerjoin(
+        Post, and_(Post.category_id == Category.id, published)
+    ).group_by(Category.id, Category.name, Category.slug)
+    tag_counts = select(
+        literal('tag').label('kind'), Tag.id, Tag.name, Tag.slug,
+        func.count(Post.id).label('post_count')
+    ).select_from(Tag).outerjoin(
+        post_tags, post_tags.c.tag_id == Tag.id
+    ).outerjoin(
+        Post, and_(Post.id == post_tags.c.post_id, published)
+    ).group_by(Tag.id, Tag.name, Tag.slug)
+
+    catalog = {'categories': [], 'tags': []}
+    rows = db.session.execute(union_all(category_counts, tag_counts)).all()
+    for row in sorted(rows, key=lambda r: (r.kind, r.id)):
+        entry = CatalogEntry(row.id, row.name, row.slug, row.post_count)
+        catalog['categories' if row.kind == 'category' else 'tags'].append(entry)
+    return catalog
+
+
+def get_catalog():
+    """
+    获取分类/标签目录
+    分类、标签或文章发布状态变化的事务提交后共享版本号加一，所有worker下次访问时重建
+    
+    Returns:
+        dict: {'categories': [CatalogEntry], 'tags': [CatalogEntry]}
+    """
+    # 先读版本号再重建：重建期间有新的提交，版本号随之变化，下次访问会再重建
+    generation = _catalog_generation()
+    with _catalog_lock:
+        if (_catalog['data'] is not None and generation is not None
+                and generation == _catalog['generation']
+                and time.monotonic() - _catalog['built_at'] < CATALOG_CACHE_TTL):
+            return _catalog['data']
+    
+    data = _build_catalog()
+    
+    with _catalog_lock:
+        _catalog['data'] = data
+        _catalog['generation'] = generation
+        _catalog['built_at'] = time.monotonic()
+    return data
+
+
+def invalidate_catalog():
+    """目录版本号加一（以O_APPEND追加1字节，多进程并发也不会丢失）"""
+    with _catalog_lock:
+        _catalog['data'] = None
+    try:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        fd = os.open(_catalog_version_path(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, b'.')
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"目录版本号递增失败: {e}")
+
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_catalog_dirty(session, flush_context):
+    """分类、标签有增删改，或文章增删、改变发布状态/分类/标签时标记目录待重建"""
+    from app.models import Post, Category, Tag
+    
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, (Post, Category, Tag)):
+            session.info['_catalog_dirty'] = True
+            return
+    for obj in session.dirty:
+        # 浏览量等其他字段的修改不影响目录
+        if isinstance(obj, (Category, Tag)) or (isinstance(obj, Post) and any(
+            attributes.get_history(obj, key).has_changes()
+            for key in ('is_published', 'category_id', 'category', 'tags')
+        )):
+            session.info['_catalog_dirty'] = True
+            return
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_catalog(session):
+    if session.info.pop('_catalog_dirty', False):
+        invalidate_catalog()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_catalog_mark(session):
+    session.info.pop('_catalog_dirty', None)
@@ -1,35 +1,76 @@
 # -*- coding: utf-8 -*-
 """
 Flask应用初始化
+
+create_app 只组装应用，不连接数据库：建表、初始化数据由 `flask init-db` 完成，
+worker启动不依赖数据库可用。各阶段耗时记录在 app.extensions['startup']，
+`flask startup-report` 可查看。
 """
 
+import os
+import time
+
+_import_started = time.perf_counter()
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_marshmallow import Marshmallow
 
 # 初始化扩展
 db = SQLAlchemy()
-migrate = Migrate()
 jwt = JWTManager()
 ma = Marshmallow()
 
+_import_ms = (time.perf_counter() - _import_started) * 1000
+
+# alembic迁移脚本目录
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+# 引入迁移之前 db.create_all() 建出的表结构对应的版本
+BASELINE_REVISION = '0001'
+# 补齐引入迁移之前新增的列和表的版本，从更早版本升级上来时需要重建计数、评论路径和日志预聚合
+BACKFILL_REVISION = '0004'
+
+
+class StartupTimer:
+    """记录create_app各阶段耗时（毫秒）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, round((now - self._last) * 1000, 1)))
+        self._last = now
+
+    def report(self):
+        return {
+            'import_ms': round(_import_ms, 1),
+            'phases': self.phases,
+            'total_ms': round((self._last - self.started) * 1000, 1)
+        }
+
 
 def create_app(config_name='default'):
     """应用工厂函数"""
     from app.config import config
     
+    timer = StartupTimer()
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
+    timer.mark('config')
     
     # 初始化扩展
     db.init_app(app)
-    migrate.init_app(app, db)
     jwt.init_app(app)
     ma.init_app(app)
+    # 数据库迁移（alembic）只有flask命令行用得到，运行时不导入
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        _init_migrate(app)
     
     # 配置CORS
     CORS(app, resources={
@@ -39,6 +80,7 @@ def create_app(config_name='default'):
             "allow_headers": ["Content-Type", "Authorization"]
         }
     })
+    timer.mark('extensions')
     
     # 注册蓝图
     from app.routes.auth import auth_bp
@@ -54,18 +96,72 @@ def create_app(config_name='default'):
     app.register_blueprint(comments_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(tech_bp, url_prefix='/api')
+    timer.mark('blueprints')
     
     # 注册日志中间件
     from app.utils.logger import APILogger
-    app.before_request(APILogger.before_request)
-    app.after_request(APILogger.after_request)
+    APILogger.init_app(app)
     
-    # 创建数据库表并初始化数据
-    with app.app_context():
-        from app.models import User, Post, Category, Tag, Comment, APILog, TestTechResource, init_test_tech_resources, LoginLog
-        db.create_all()
-        # 初始化测试技术资源数据
-        init_test_tech_resources()
+    # 请求级SQL统计（在日志中间件之后注册，after_request先于日志执行）
+    from app.utils.sql_profiler import sql_profiler
+    sql_profiler.init_app(app)
+    
+    # 运行指标（/metrics）
+    from app.utils.metrics import metrics
+    metrics.init_app(app)
+    
+    # 日志保留与归档
+    from app.utils.log_retention import log_retention
+    log_retention.init_app(app)
+    
+    # 浏览量写缓冲
+    from app.utils.view_counter import view_counter
+    view_counter.init_app(app)
+    
+    # Markdown渲染缓存
+    from app.utils.render import renderer
+    renderer.init_app(app)
+    
+    # 写后失效的共享版本号（以下各缓存共用）
+    from app.utils.generations import generations
+    generations.init_app(app)
+    
+    # Token版本号缓存
+    from app.utils.auth import token_versions
+    token_versions.init_app(app)
+    
+    # 公开接口响应缓存
+    from app.utils.response_cache import response_cache
+    response_cache.init_app(app)
+    
+    # 归档缓存
+    from app.utils.archives import archive_cache
+    archive_cache.init_app(app)
+    
+    # 分类/标签目录
+    from app.utils.catalog import catalog_cache
+    catalog_cache.init_app(app)
+    
+    # 测试技术资源快照
+    from app.utils.tech_resources import tech_resource_cache
+    tech_resource_cache.init_app(app)
+    
+    # 全文搜索后端
+    from app.utils import search
+    search.init_app(app)
+    timer.mark('services')
+    
+    # 注册命令行命令
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # 开发环境可在启动时自动建表；数据库连不上只警告，不影响启动
+    if app.config.get('AUTO_INIT_DB'):
+        try:
+            init_db(app)
+        except Exception as e:
+            print(f"⚠️ 自动初始化数据库失败，请稍后执行 flask init-db: {e}")
+        timer.mark('init_db')
     
     # JWT错误处理
     @jwt.expired_token_loader
@@ -80,6 +176,14 @@ def create_app(config_name='default'):
     def missing_token_callback(error):
         return {'code': 401, 'msg': '缺少Token', 'data': None}, 401
     
+    @jwt.token_in_blocklist_loader
+    def check_token_version(jwt_header, jwt_payload):
+        return token_versions.is_revoked(jwt_payload)
+    
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return {'code': 401, 'msg': 'Token已失效，请重新登录', 'data': None}, 401
+    
     # 全局错误处理
     @app.errorhandler(404)
     def not_found(error):
@@ -90,4 +194,81 @@ def create_app(config_name='default'):
         db.session.rollback()
         return {'code': 500, 'msg': '服务器内部错误', 'data': None}, 500
     
+    timer.mark('handlers')
+    app.extensions['startup'] = timer.report()
+    if app.config.get('STARTUP_REPORT'):
+        report = app.extensions['startup']
+        phases = ', '.join(f'{name}={ms}ms' for name, ms in report['phases'])
+        print(f"启动耗时 import={report['import_ms']}ms {phases} total={report['total_ms']}ms")
+    
     return app
+
+
+def _init_migrate(app):
+    from flask_migrate import Migrate
+    
+    if 'migrate' not in app.extensions:
+        Migrate(app, db, directory=MIGRATIONS_DIR)
+
+
+def upgrade_schema(app):
+    """
+    按迁移脚本把表结构升级到最新版本（需在应用上下文中调用）
+    
+    空库从头执行全部迁移；引入迁移之前用 create_all 建的库没有版本表，
+    先标记为基线版本再升级，并为已有数据回填新增的计数、路径等列。
+    """
+    from flask_migrate import stamp, upgrade
+    from sqlalchemy import inspect
+    
+    _init_migrate(app)
+    tables = set(inspect(db.engine).get_table_names())
+    if 'alembic_version' not in tables and 'users' in tables:
+        stamp(revision=BASELINE_REVISION)
+    revision = _current_revision()
+    upgrade()
+    if _needs_backfill(revision):
+        _backfill()
+
+
+def _current_revision():
+    from alembic.migration import MigrationContext
+    
+    with db.engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def _needs_backfill(revision):
+    """升级前的版本早于 BACKFILL_REVISION（空库没有数据，不需要回填）"""
+    from alembic.script import ScriptDirectory
+    
+    if revision is None:
+        return False
+    script = ScriptDirectory(MIGRATIONS_DIR)
+    older = {r.revision for r in script.iterate_revisions(BACKFILL_REVISION, 'base')}
+    return revision in older - {BACKFILL_REVISION}
+
+
+def _backfill():
+    """为升级前已有的数据重建冗余计数、评论物化路径和日志预聚合"""
+    from app.models.counters import recount_all
+    from app.models.comment import rebuild_comment_paths
+    from app.utils.rollup import log_rollup
+    
+    recount_all()
+    comments = rebuild_comment_paths()
+    logs = log_rollup.rebuild()
+    print(f"已回填冗余计数、{comments} 条评论路径、{logs} 条日志的预聚合")
+
+
+def init_db(app, seed=True):
+    """升级表结构、创建全文索引，并初始化测试技术资源数据（幂等）"""
+    from app.utils import search
+    
+    with app.app_context():
+        from app import models  # noqa: F401  注册所有模型
+        upgrade_schema(app)
+        search.get_backend().ensure_schema()
+        if seed:
+            from app.models import init_test_tech_resources
+            init_test_tech_resources()
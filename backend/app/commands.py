@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Flask命令行命令
+"""
+
+import os
+import time
+
+import click
+
+
+def register_commands(app):
+    """注册自定义命令"""
+
+    @app.cli.command('init-db')
+    @click.option('--no-seed', is_flag=True, help='不初始化测试技术资源数据')
+    @click.option('--wait', default=0, show_default=True, help='数据库未就绪时最多等待的秒数')
+    def init_db_command(no_seed, wait):
+        """执行数据库迁移、创建全文索引并初始化数据（幂等，部署时在启动worker前执行）"""
+        from sqlalchemy.exc import OperationalError
+        from app import init_db
+
+        deadline = time.time() + wait
+        while True:
+            try:
+                init_db(app, seed=not no_seed)
+                break
+            except OperationalError as e:
+                if time.time() >= deadline:
+                    raise click.ClickException(f'数据库不可用: {e.orig}')
+                click.echo('数据库未就绪，2秒后重试...')
+                time.sleep(2)
+        click.echo('数据库初始化完成')
+
+    @app.cli.command('startup-report')
+    def startup_report():
+        """查看本次create_app各阶段耗时"""
+        report = app.extensions.get('startup')
+        if not report:
+            click.echo('没有启动耗时记录')
+            return
+        click.echo(f'{"导入扩展":<12}{report["import_ms"]:>8.1f} ms')
+        for name, ms in report['phases']:
+            click.echo(f'{name:<12}{ms:>8.1f} ms')
+        click.echo(f'{"合计":<12}{report["total_ms"]:>8.1f} ms')
+
+    @app.cli.command('recount')
+    def recount():
+        """重建文章评论数、分类/标签已发布文章数等冗余计数"""
+        from app.models.counters import recount_all
+        from app.utils.catalog import catalog_cache
+        from app.utils.response_cache import response_cache
+
+        result = recount_all()
+        # 批量UPDATE不经过会话事件，手动失效带计数的缓存和ETag
+        response_cache.invalidate('posts')
+        catalog_cache.invalidate()
+        for table, rows in result.items():
+            click.echo(f'{table}: {rows} 行已重新计数')
+
+    @app.cli.command('rebuild-comment-paths')
+    @click.option('--chunk-size', default=1000, show_default=True, help='每批处理的评论数')
+    def rebuild_comment_paths_command(chunk_size):
+        """重建评论的物化路径（升级后为已有评论回填 root_id/path）"""
+        from app.models.comment import rebuild_comment_paths
+
+        count = rebuild_comment_paths(chunk_size)
+        click.echo(f'已更新 {count} 条评论的路径')
+
+    @app.cli.command('reindex-posts')
+    def reindex_posts():
+        """重建文章全文搜索索引"""
+        from app.utils import search
+
+        backend = search.get_backend()
+        count = backend.rebuild()
+        click.echo(f'{backend.name}: 已索引 {count} 篇文章')
+
+    @app.cli.command('rerender-posts')
+    @click.option('--chunk-size', default=500, show_default=True, help='每批读取的文章数')
+    @click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='渲染进程数')
+    @click.option('--checkpoint', default='.rerender-posts.checkpoint', show_default=True,
+                  help='断点文件，记录已处理的最大文章ID')
+    @click.option('--restart', is_flag=True, help='忽略断点文件，从头开始')
+    @click.option('--dry-run', is_flag=True, help='只统计会变化的文章数，不写库')
+    def rerender_posts(chunk_size, workers, checkpoint, restart, dry_run):
+        """按当前渲染配置重新生成所有文章的content_html"""
+        from concurrent.futures import ProcessPoolExecutor
+        from sqlalchemy import bindparam
+        from app import db
+        from app.models import Post
+        from app.utils.render import render_many
+        from app.utils.response_cache import response_cache
+
+        last_id = 0
+        if not restart and not dry_run and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                last_id = int(f.read().strip() or 0)
+            click.echo(f'从断点继续：id > {last_id}')
+
+        total = Post.query.filter(Post.id > last_id).count()
+        table = Post.__table__
+        stmt = table.update().where(table.c.id == bindparam('post_id')).values(
+            content_html=bindparam('html')
+        )
+        processed = changed = 0
+        started = time.time()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                rows = db.session.query(Post.id, Post.content, Post.content_html).filter(
+                    Post.id > last_id
+                ).order_by(Post.id).limit(chunk_size).all()
+                if not rows:
+                    break
+
+                htmls = render_many([row.content for row in rows], pool, workers)
+                updates = [
+                    {'post_id': row.id, 'html': html}
+                    for row, html in zip(rows, htmls) if html != row.content_html
+                ]
+                if updates and not dry_run:
+                    db.session.execute(stmt, updates)
+                    db.session.commit()
+                    # 批量UPDATE不经过会话事件，文章列表/详情的缓存和ETag需要手动失效
+                    response_cache.invalidate('posts')
+                else:
+                    db.session.rollback()
+
+                processed += len(rows)
+                changed += len(updates)
+                last_id = rows[-1].id
+                if not dry_run:
+                    with open(checkpoint, 'w') as f:
+                        f.write(str(last_id))
+
+                elapsed = time.time() - started
+                click.echo(f'{processed}/{total} 已处理，{changed} 篇变化，'
+                           f'{processed / elapsed if elapsed else 0:.1f} 篇/秒，last_id={last_id}')
+
+        if dry_run:
+            click.echo(f'[dry-run] 共 {processed} 篇，其中 {changed} 篇的content_html会变化')
+        else:
+            if os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            click.echo(f'完成：共 {processed} 篇，更新 {changed} 篇')
+
+    @app.cli.command('rebuild-log-rollups')
+    @click.option('--since', default=None, help='只重建该日期(YYYY-MM-DD，UTC)及之后的数据')
+    @click.option('--chunk-size', default=5000, show_default=True, help='每批读取的日志条数')
+    def rebuild_log_rollups(since, chunk_size):
+        """根据原始API日志重建预聚合统计（重建期间的新日志可能被重复计数，建议低峰执行）"""
+        from datetime import datetime
+        from app.utils.rollup import log_rollup
+
+        since_dt = datetime.strptime(since, '%Y-%m-%d') if since else None
+        started = time.time()
+        count = log_rollup.rebuild(chunk_size=chunk_size, since=since_dt)
+        click.echo(f'已聚合 {count} 条日志，耗时 {time.time() - started:.1f}s')
+
+    @app.cli.command('purge-api-logs')
+    @click.option('--days', type=int, default=None, help='保留天数，默认取 API_LOG_RETENTION_DAYS')
+    @click.option('--no-archive', is_flag=True, help='不写归档文件，直接删除')
+    @click.option('--dry-run', is_flag=True, help='只统计过期日志数量')
+    def purge_api_logs(days, no_archive, dry_run):
+        """把过期的API日志归档为gzip NDJSON后分批删除（适合放进cron每天执行）"""
+        from app.utils.log_retention import log_retention
+
+        result = log_retention.purge(days=days, archive=not no_archive, dry_run=dry_run, echo=click.echo)
+        if dry_run:
+            click.echo(f'[dry-run] {result["cutoff"]} 之前共 {result["expired"]} 条日志过期')
+            if result['dropped_partitions']:
+                click.echo(f'[dry-run] 将删除分区: {", ".join(result["dropped_partitions"])}')
+            return
+        click.echo(f'完成：归档 {result["archived"]} 条，删除 {result["deleted"]} 条')
+        if result['dropped_partitions']:
+            click.echo(f'已删除分区: {", ".join(result["dropped_partitions"])}')
+        for path in result['files']:
+            click.echo(f'归档文件: {path}')
+
+    @app.cli.command('partition-api-logs')
+    @click.option('--months-ahead', default=3, show_default=True, help='提前创建的月分区数')
+    def partition_api_logs(months_ahead):
+        """把api_logs改为按月RANGE分区（仅MySQL；会重建表，请在低峰执行）"""
+        from app.utils.log_retention import log_retention
+
+        try:
+            created = log_retention.init_partitions(months_ahead)
+        except RuntimeError as e:
+            click.echo(str(e))
+            return
+        added = log_retention.ensure_partitions(months_ahead)
+        click.echo('已转换为分区表' if created else f'已是分区表，新增 {added} 个分区')
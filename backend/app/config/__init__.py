@@ -32,6 +32,99 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     UPLOAD_FOLDER = os.path.join(basedir, '..', 'uploads')
     
+    # 启动时自动建表并初始化数据（默认关闭，部署时先执行 flask init-db）
+    AUTO_INIT_DB = os.environ.get('AUTO_INIT_DB', '').lower() in ('1', 'true', 'yes')
+    # 启动时打印各阶段耗时
+    STARTUP_REPORT = os.environ.get('STARTUP_REPORT', '').lower() in ('1', 'true', 'yes')
+    
+    # 浏览量写缓冲配置
+    VIEW_COUNT_BUFFERED = True
+    VIEW_COUNT_FLUSH_INTERVAL = float(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 5.0))
+    
+    # Markdown渲染缓存：内存LRU条数，磁盘缓存目录（为空则只用内存）
+    MARKDOWN_CACHE_SIZE = int(os.environ.get('MARKDOWN_CACHE_SIZE', 1024))
+    MARKDOWN_CACHE_DIR = os.environ.get('MARKDOWN_CACHE_DIR')
+    
+    # 写后失效的共享版本号：file（同机多worker共享目录）/ redis（多机部署）/ local（仅本进程）
+    GENERATION_STORE = os.environ.get('GENERATION_STORE', 'file')
+    GENERATION_DIR = os.environ.get('GENERATION_DIR') or os.path.join(basedir, '..', '..', 'cache', 'generations')
+    GENERATION_URL = os.environ.get('GENERATION_URL', 'redis://localhost:6379/0')
+    
+    # Token版本号缓存：数据库被应用之外修改时最多滞后的秒数
+    TOKEN_VERSION_CACHE_TTL = int(os.environ.get('TOKEN_VERSION_CACHE_TTL', 30))
+    
+    # 归档缓存：文章发布后所有worker立即失效，数据库被应用之外修改时最多滞后的秒数
+    ARCHIVES_CACHE_TTL = int(os.environ.get('ARCHIVES_CACHE_TTL', 300))
+    
+    # 分类/标签目录快照：修改后所有worker立即失效，数据库被应用之外修改时最多滞后的秒数
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 300))
+    
+    # 测试技术资源快照：其他进程修改资源后，最多隔多少秒通过水位检查发现
+    TECH_RESOURCES_CHECK_INTERVAL = int(os.environ.get('TECH_RESOURCES_CHECK_INTERVAL', 60))
+    
+    # 公开接口响应缓存：memory / disk / redis / null
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+    # 内存LRU的条数 / 磁盘缓存的文件数上限
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR') or os.path.join(basedir, '..', '..', 'cache', 'responses')
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    
+    # 公开接口的Cache-Control：浏览器每次带ETag验证（304很便宜），
+    # 反向代理（nginx proxy_cache + proxy_cache_revalidate）可短时间共享缓存
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 0))
+    HTTP_CACHE_SHARED_MAX_AGE = int(os.environ.get('HTTP_CACHE_SHARED_MAX_AGE', 10))
+    
+    # 全文搜索后端：auto（按数据库类型选择）/ sqlite / mysql / memory
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    # memory后端：数据库被应用之外修改时最多滞后的秒数
+    SEARCH_SYNC_INTERVAL = int(os.environ.get('SEARCH_SYNC_INTERVAL', 300))
+    
+    # API日志写入配置（后台线程批量写入）
+    API_LOG_ASYNC = True
+    API_LOG_QUEUE_SIZE = int(os.environ.get('API_LOG_QUEUE_SIZE', 10000))
+    API_LOG_BATCH_SIZE = int(os.environ.get('API_LOG_BATCH_SIZE', 200))
+    API_LOG_FLUSH_INTERVAL = float(os.environ.get('API_LOG_FLUSH_INTERVAL', 1.0))
+    
+    # API日志预聚合：分钟/小时粒度的保留天数（天粒度永久保留）
+    API_LOG_ROLLUP = True
+    API_LOG_ROLLUP_MINUTE_DAYS = int(os.environ.get('API_LOG_ROLLUP_MINUTE_DAYS', 2))
+    API_LOG_ROLLUP_HOUR_DAYS = int(os.environ.get('API_LOG_ROLLUP_HOUR_DAYS', 90))
+    
+    # API日志采样：(方法, 路由模板通配, 状态码或类别, 采样率)，按顺序匹配第一条，未匹配的全部记录
+    API_LOG_SAMPLING = [
+        ('*', '*', '5xx', 1.0),
+        ('*', '*', '4xx', 1.0),
+        ('GET', '*', '2xx', 0.01),
+        ('GET', '*', '3xx', 0.01),
+    ]
+    API_LOG_EXCLUDE_PATHS = ['/health', '/metrics', '/static/', '/favicon.ico']
+    API_LOG_EXCLUDE_METHODS = ['OPTIONS']
+    # 请求/响应内容记录：errors（仅4xx/5xx）/ all / none，白名单路由始终记录
+    API_LOG_CAPTURE_PAYLOADS = os.environ.get('API_LOG_CAPTURE_PAYLOADS', 'errors')
+    API_LOG_CAPTURE_ROUTES = []
+    API_LOG_REDACT_FIELDS = ['password', 'token', 'access_token']
+    API_LOG_PAYLOAD_LIMIT = 1000
+    
+    # API原始日志保留天数，过期日志由 flask purge-api-logs 归档后删除
+    API_LOG_RETENTION_DAYS = int(os.environ.get('API_LOG_RETENTION_DAYS', 30))
+    API_LOG_ARCHIVE_DIR = os.environ.get('API_LOG_ARCHIVE_DIR') or os.path.join(basedir, '..', '..', 'log_archive')
+    API_LOG_PURGE_CHUNK = int(os.environ.get('API_LOG_PURGE_CHUNK', 5000))
+    
+    # 请求级SQL统计：Server-Timing响应头和API日志中的SQL条数/耗时；
+    # 同一语句单次请求执行超过阈值次视为疑似N+1，开启警告时写日志
+    SQL_PROFILE = os.environ.get('SQL_PROFILE', '1').lower() in ('1', 'true', 'yes')
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    SQL_N_PLUS_ONE_WARN = False
+    
+    # 运行指标：/metrics 输出Prometheus文本格式；多worker部署需设置 METRICS_DIR（启动前清空），
+    # 各worker写各自的内存映射文件，抓取时汇总；设置 METRICS_TOKEN 后抓取需带 Bearer Token
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    METRICS_PATH = '/metrics'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_SAMPLE_INTERVAL = float(os.environ.get('METRICS_SAMPLE_INTERVAL', 5.0))
+    
     @staticmethod
     def init_app(app):
         pass
@@ -46,6 +139,9 @@ class DevelopmentConfig(Config):
     
     # 开发环境CORS允许所有
     CORS_ORIGINS = '*'
+    
+    # 开发环境输出疑似N+1查询警告
+    SQL_N_PLUS_ONE_WARN = True
 
 
 class ProductionConfig(Config):
@@ -64,11 +160,27 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
+    
+    # 测试环境同步写日志和浏览量，便于断言
+    API_LOG_ASYNC = False
+    API_LOG_SAMPLING = []
+    RESPONSE_CACHE_BACKEND = 'null'
+    GENERATION_STORE = 'local'
+    VIEW_COUNT_BUFFERED = False
+
+
+class BenchmarkConfig(Config):
+    """压测配置（python -m benchmarks）：与生产相同的缓存和日志策略，使用独立的数据库"""
+    DEBUG = False
+    
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL') or \
+        'sqlite:///' + os.path.abspath(os.path.join(basedir, '..', '..', 'benchmarks', 'bench.db'))
 
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
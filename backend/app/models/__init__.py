@@ -6,8 +6,9 @@
 from .user import User
 from .post import Post, Category, Tag, post_tags
 from .comment import Comment
-from .log import APILog
+from .log import APILog, APILogRollup
 from .tech_resource import TestTechResource, init_test_tech_resources
 from .login_log import LoginLog
+from . import counters  # 注册冗余计数维护钩子
 
-__all__ = ['User', 'Post', 'Category', 'Tag', 'Comment', 'post_tags', 'APILog', 'TestTechResource', 'init_test_tech_resources', 'LoginLog']
+__all__ = ['User', 'Post', 'Category', 'Tag', 'Comment', 'post_tags', 'APILog', 'APILogRollup', 'TestTechResource', 'init_test_tech_resources', 'LoginLog']
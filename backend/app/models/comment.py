@@ -1,31 +1,67 @@
 # -*- coding: utf-8 -*-
 """
 评论模型
+
+楼中楼用物化路径保存：path 为从根评论到自身的ID序列（每段定宽补零，以/结尾），
+root_id 为所在楼（根评论）的ID。按 (root_id, path) 排序即为深度优先的展示顺序，
+一条查询就能取出若干整楼，再在内存里组装成树。
 """
 
 from datetime import datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import attributes
+
 from app import db
 
 
+# 路径每段的位数与最大层级（path列长度 = 段宽 × 层级）
+PATH_SEGMENT_WIDTH = 10
+MAX_DEPTH = 60
+
+
+def make_path(parent_path, comment_id):
+    """父评论路径 + 自身ID段"""
+    return f"{parent_path or ''}{comment_id:0{PATH_SEGMENT_WIDTH}d}/"
+
+
 class Comment(db.Model):
     """评论模型"""
     __tablename__ = 'comments'
+    __table_args__ = (
+        # 整楼按路径顺序读取
+        db.Index('ix_comments_root_path', 'root_id', 'path'),
+        # 文章下已审核根评论按时间分页
+        db.Index('ix_comments_post_parent_approved_created',
+                 'post_id', 'parent_id', 'is_approved', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     content_html = db.Column(db.Text)
     
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     parent_id = db.Column(db.Integer, db.ForeignKey('comments.id'))
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]),
                              lazy='dynamic', cascade='all, delete-orphan')
     
+    # 物化路径，插入后自动维护
+    root_id = db.Column(db.Integer)
+    path = db.Column(db.String((PATH_SEGMENT_WIDTH + 1) * MAX_DEPTH))
+    
     is_approved = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @property
+    def depth(self):
+        """层级，根评论为0"""
+        if not self.path:
+            return 0
+        return len(self.path) // (PATH_SEGMENT_WIDTH + 1) - 1
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -39,3 +75,113 @@ class Comment(db.Model):
             } if self.author else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    @staticmethod
+    def to_dict_list(comments):
+        """批量序列化，作者一次查询"""
+        from app.models.user import User
+        
+        comments = list(comments)
+        user_ids = {c.user_id for c in comments}
+        authors = {}
+        if user_ids:
+            rows = db.session.query(User.id, User.username, User.avatar).filter(User.id.in_(user_ids))
+            authors = {row.id: {'id': row.id, 'username': row.username, 'avatar': row.avatar} for row in rows}
+        return [{
+            'id': c.id,
+            'content': c.content,
+            'content_html': c.content_html,
+            'is_approved': c.is_approved,
+            'author': authors.get(c.user_id),
+            'created_at': c.created_at.isoformat() if c.created_at else None
+        } for c in comments]
+    
+    @staticmethod
+    def load_threads(roots):
+        """
+        加载若干根评论下的整楼，组装成树
+        
+        一条 root_id IN (...) ORDER BY root_id, path 的查询取出所有楼层，
+        作者一次批量查询；未审核评论及其下的回复不返回。
+        
+        Args:
+            roots: 当前页的根评论（保持其顺序）
+        
+        Returns:
+            list: 根评论字典，每个节点带 replies 和 depth
+        """
+        roots = list(roots)
+        if not roots:
+            return []
+        nodes = Comment.query.filter(
+            Comment.root_id.in_([r.id for r in roots]),
+            Comment.is_approved == True
+        ).order_by(Comment.root_id, Comment.path).all()
+        
+        by_id = {}
+        for comment, data in zip(nodes, Comment.to_dict_list(nodes)):
+            data['depth'] = comment.depth
+            data['replies'] = []
+            parent = by_id.get(comment.parent_id)
+            # 按路径排序保证父节点先出现；父节点未审核时整棵子树跳过
+            if comment.parent_id is not None and parent is None:
+                continue
+            by_id[comment.id] = data
+            if parent is not None:
+                parent['replies'].append(data)
+        return [by_id[r.id] for r in roots if r.id in by_id]
+
+
+@event.listens_for(Comment, 'after_insert')
+def _set_comment_path(mapper, connection, target):
+    """插入后根据父评论补全物化路径（同一事务内多一条UPDATE）"""
+    table = Comment.__table__
+    if target.parent_id is None:
+        root_id, parent_path = target.id, ''
+    else:
+        parent = target.parent if 'parent' in attributes.instance_dict(target) else None
+        if parent is not None and parent.path:
+            root_id, parent_path = parent.root_id, parent.path
+        else:
+            row = connection.execute(
+                select(table.c.root_id, table.c.path).where(table.c.id == target.parent_id)
+            ).first()
+            root_id, parent_path = (row.root_id, row.path) if row else (target.id, '')
+    path = make_path(parent_path, target.id)
+    connection.execute(table.update().where(table.c.id == target.id).values(
+        root_id=root_id, path=path, updated_at=table.c.updated_at
+    ))
+    attributes.set_committed_value(target, 'root_id', root_id)
+    attributes.set_committed_value(target, 'path', path)
+
+
+def rebuild_comment_paths(chunk_size=1000):
+    """按ID顺序重建所有评论的物化路径（父评论ID总是小于子评论），返回更新行数"""
+    table = Comment.__table__
+    paths = {}
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.parent_id).where(table.c.id > last_id)
+            .order_by(table.c.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            parent = paths.get(row.parent_id) if row.parent_id is not None else None
+            root_id, parent_path = parent if parent else (row.id, '')
+            path = make_path(parent_path, row.id)
+            paths[row.id] = (root_id, path)
+            params.append({'comment_id': row.id, 'root_id': root_id, 'path': path})
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('comment_id')).values(
+                root_id=db.bindparam('root_id'), path=db.bindparam('path'),
+                updated_at=table.c.updated_at
+            ), params
+        )
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+    return updated
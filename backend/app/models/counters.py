@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+冗余计数维护
+
+posts.comment_count、categories.published_post_count、tags.published_post_count
+在会话flush时根据本次变更增量更新（col = col + n），与业务写入处于同一事务。
+批量 Query.update()/delete() 不经过这里，可用 `flask recount` 重建。
+"""
+
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import attributes
+
+from app import db
+from app.models.post import Post, Category, Tag, post_tags
+from app.models.comment import Comment
+
+
+_STATE_KEY = '_counter_post_state'
+_EXPIRE_KEY = '_counter_expire'
+
+
+def _post_tag_ids(conn, post_id):
+    """读取文章当前的标签ID集合"""
+    rows = conn.execute(select(post_tags.c.tag_id).where(post_tags.c.post_id == post_id))
+    return {row[0] for row in rows}
+
+
+def _committed_value(obj, key):
+    """取属性在本次flush之前的值"""
+    history = attributes.get_history(obj, key)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, key)
+
+
+def _counted_fields_changed(post):
+    """发布状态、分类或标签是否有变化"""
+    for key in ('is_published', 'category_id', 'category', 'tags'):
+        if attributes.get_history(post, key).has_changes():
+            return True
+    return False
+
+
+@event.listens_for(db.session, 'before_flush')
+def _capture_post_state(session, flush_context, instances):
+    """flush前记录受影响文章的原始状态（发布状态、分类、标签）"""
+    state = session.info.setdefault(_STATE_KEY, {})
+    conn = session.connection()
+    for obj in list(session.deleted) + list(session.dirty):
+        if not isinstance(obj, Post) or obj.id is None or obj in state:
+            continue
+        if obj not in session.deleted and not _counted_fields_changed(obj):
+            continue
+        state[obj] = (
+            bool(_committed_value(obj, 'is_published')),
+            _committed_value(obj, 'category_id'),
+            _post_tag_ids(conn, obj.id)
+        )
+
+
+@event.listens_for(db.session, 'after_flush')
+def _apply_counter_deltas(session, flush_context):
+    """flush后按前后状态差异增量更新计数列"""
+    before = session.info.pop(_STATE_KEY, {})
+    conn = session.connection()
+    post_deltas, category_deltas, tag_deltas = {}, {}, {}
+
+    def add(deltas, key, n):
+        if key is not None:
+            deltas[key] = deltas.get(key, 0) + n
+
+    # 文章：发布状态、分类、标签变化
+    posts = set(before)
+    posts.update(obj for obj in session.new if isinstance(obj, Post))
+    for post in posts:
+        was_published, old_category_id, old_tag_ids = before.get(post, (False, None, set()))
+        if post in session.deleted:
+            published, category_id, tag_ids = False, None, set()
+        else:
+            published = bool(post.is_published)
+            category_id = post.category_id
+            tag_ids = _post_tag_ids(conn, post.id)
+        if was_published:
+            add(category_deltas, old_category_id, -1)
+            for tag_id in old_tag_ids:
+                add(tag_deltas, tag_id, -1)
+        if published:
+            add(category_deltas, category_id, 1)
+            for tag_id in tag_ids:
+                add(tag_deltas, tag_id, 1)
+
+    # 评论：新增/删除
+    deleted_post_ids = {obj.id for obj in session.deleted if isinstance(obj, Post)}
+    for obj in session.new:
+        if isinstance(obj, Comment):
+            add(post_deltas, obj.post_id, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Comment) and obj.post_id not in deleted_post_ids:
+            add(post_deltas, obj.post_id, -1)
+
+    expire = session.info.setdefault(_EXPIRE_KEY, [])
+    for model, column, deltas in (
+        (Post, 'comment_count', post_deltas),
+        (Category, 'published_post_count', category_deltas),
+        (Tag, 'published_post_count', tag_deltas),
+    ):
+        table = model.__table__
+        for key, n in deltas.items():
+            if n == 0:
+                continue
+            values = {column: table.c[column] + n}
+            # 评论数不算文章内容修改，显式保留updated_at，避免触发onupdate；
+            # 分类/标签的updated_at含计数变化（目录快照的水位），照常更新
+            if model is Post:
+                values['updated_at'] = table.c.updated_at
+            conn.execute(table.update().where(table.c.id == key).values(values))
+            expire.append((model, key, column))
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _expire_counters(session, flush_context):
+    """让内存中的对象下次访问时重新加载计数"""
+    for model, key, column in session.info.pop(_EXPIRE_KEY, []):
+        obj = session.identity_map.get(session.identity_key(model, key))
+        if obj is not None:
+            session.expire(obj, [column])
+
+
+def recount_all():
+    """全量重建所有冗余计数，返回各表更新行数"""
+    posts = Post.__table__
+    categories = Category.__table__
+    tags = Tag.__table__
+    comments = Comment.__table__
+
+    comment_count = select(func.count(comments.c.id)).where(
+        comments.c.post_id == posts.c.id
+    ).scalar_subquery()
+    category_count = select(func.count(posts.c.id)).where(
+        posts.c.category_id == categories.c.id,
+        posts.c.is_published == True
+    ).scalar_subquery()
+    tag_count = select(func.count(posts.c.id)).select_from(
+        post_tags.join(posts, posts.c.id == post_tags.c.post_id)
+    ).where(
+        post_tags.c.tag_id == tags.c.id,
+        posts.c.is_published == True
+    ).scalar_subquery()
+
+    result = {
+        'posts': db.session.execute(
+            posts.update().values(comment_count=comment_count, updated_at=posts.c.updated_at)
+        ).rowcount,
+        'categories': db.session.execute(
+            categories.update().values(published_post_count=category_count)
+        ).rowcount,
+        'tags': db.session.execute(tags.update().values(published_post_count=tag_count)).rowcount,
+    }
+    db.session.commit()
+    return result
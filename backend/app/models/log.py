@@ -10,6 +10,11 @@ from app import db
 class APILog(db.Model):
     """API调用日志"""
     __tablename__ = 'api_logs'
+    __table_args__ = (
+        # 管理后台按状态码、用户筛选后按时间倒序分页
+        db.Index('ix_api_logs_status_created', 'status_code', 'created_at'),
+        db.Index('ix_api_logs_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     method = db.Column(db.String(10), nullable=False)  # GET/POST/PUT/DELETE
@@ -19,9 +24,11 @@ class APILog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # 用户ID
     status_code = db.Column(db.Integer)                # 响应状态码
     response_time = db.Column(db.Float)                # 响应时间(秒)
+    db_query_count = db.Column(db.Integer)             # 本次请求执行的SQL条数
+    db_time = db.Column(db.Float)                      # SQL总耗时(秒)
     request_data = db.Column(db.Text)                  # 请求数据(JSON)
     response_data = db.Column(db.Text)                 # 响应数据(JSON)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # 关联关系
     user = db.relationship('User', backref='api_logs', lazy=True)
@@ -37,7 +44,30 @@ class APILog(db.Model):
             'username': self.user.username if self.user else None,
             'status_code': self.status_code,
             'response_time': self.response_time,
+            'db_query_count': self.db_query_count,
+            'db_time': self.db_time,
             'request_data': self.request_data,
             'response_data': self.response_data,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class APILogRollup(db.Model):
+    """API日志预聚合（按分钟/小时/天分桶）"""
+    __tablename__ = 'api_log_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket_start', 'method', 'route', 'status_class',
+                            name='uq_api_log_rollups_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)   # minute/hour/day
+    bucket_start = db.Column(db.DateTime, nullable=False)    # 桶起始时间(UTC)
+    method = db.Column(db.String(10), nullable=False)
+    route = db.Column(db.String(200), nullable=False)        # 路由模板，如 /api/posts/<slug>
+    status_class = db.Column(db.String(5), nullable=False)   # 2xx/3xx/4xx/5xx
+    count = db.Column(db.Integer, nullable=False, default=0)
+    latency_sum = db.Column(db.Float, nullable=False, default=0)
+    latency_min = db.Column(db.Float)
+    latency_max = db.Column(db.Float)
+    latency_sketch = db.Column(db.Text)                      # 延迟分布草图(JSON)，用于估算分位数
@@ -10,6 +10,10 @@ from app import db
 class LoginLog(db.Model):
     """用户登录日志"""
     __tablename__ = 'login_logs'
+    __table_args__ = (
+        # 查询用户最近一次成功登录
+        db.Index('ix_login_logs_user_status_created', 'user_id', 'login_status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -7,6 +7,7 @@ from datetime import datetime, timezone
 import re
 import unicodedata
 from app import db
+from app.utils.view_counter import view_counter
 
 
 def slugify(text):
@@ -55,7 +56,9 @@ class Category(db.Model):
     name = db.Column(db.String(50), unique=True, nullable=False)
     slug = db.Column(db.String(50), unique=True, nullable=False, index=True)
     description = db.Column(db.String(200), default='')
+    published_post_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 冗余计数
     created_at = db.Column(db.DateTime, default=now_utc)
+    updated_at = db.Column(db.DateTime, default=now_utc, onupdate=now_utc)  # 含计数变化，用于ETag水位
     
     posts = db.relationship('Post', backref='category', lazy='dynamic')
     
@@ -79,7 +82,7 @@ class Category(db.Model):
             'name': self.name,
             'slug': self.slug,
             'description': self.description,
-            'post_count': self.posts.filter_by(is_published=True).count()
+            'post_count': self.published_post_count or 0
         }
 
 
@@ -90,7 +93,9 @@ class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(30), unique=True, nullable=False)
     slug = db.Column(db.String(30), unique=True, nullable=False, index=True)
+    published_post_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 冗余计数
     created_at = db.Column(db.DateTime, default=now_utc)
+    updated_at = db.Column(db.DateTime, default=now_utc, onupdate=now_utc)  # 含计数变化，用于ETag水位
     
     posts = db.relationship('Post', secondary=post_tags,
                            backref=db.backref('tags', lazy='dynamic'),
@@ -114,13 +119,21 @@ class Tag(db.Model):
             'id': self.id,
             'name': self.name,
             'slug': self.slug,
-            'post_count': self.posts.filter_by(is_published=True).count()
+            'post_count': self.published_post_count or 0
         }
 
 
 class Post(db.Model):
     """文章模型"""
     __tablename__ = 'posts'
+    __table_args__ = (
+        # 已发布文章列表的各种排序都走索引范围扫描
+        db.Index('ix_posts_published_published_at', 'is_published', 'published_at'),
+        db.Index('ix_posts_published_view_count', 'is_published', 'view_count'),
+        db.Index('ix_posts_published_created_at', 'is_published', 'created_at'),
+        # 分类页按发布时间分页
+        db.Index('ix_posts_published_category_published_at', 'is_published', 'category_id', 'published_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -129,14 +142,15 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)  # Markdown原文
     content_html = db.Column(db.Text)  # 渲染后的HTML
     
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
     
     is_published = db.Column(db.Boolean, default=False)
     view_count = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 冗余计数
     
     created_at = db.Column(db.DateTime, default=now_utc, index=True)
-    updated_at = db.Column(db.DateTime, default=now_utc, onupdate=now_utc)
+    updated_at = db.Column(db.DateTime, default=now_utc, onupdate=now_utc, index=True)
     published_at = db.Column(db.DateTime)
     
     comments = db.relationship('Comment', backref='post', lazy='dynamic',
@@ -162,40 +176,106 @@ class Post(db.Model):
         return slug
     
     def increment_view_count(self):
-        """增加浏览次数"""
-        self.view_count += 1
-        db.session.commit()
+        """增加浏览次数（进程内累加，定期批量落库）"""
+        view_counter.incr(self.id)
+    
+    def get_view_count(self):
+        """获取浏览次数（已落库的值加上未落库的增量）"""
+        return (self.view_count or 0) + view_counter.pending(self.id)
     
     def get_comment_count(self):
         """获取评论数"""
-        return self.comments.count()
+        return self.comment_count or 0
     
     def get_tags_list(self):
         """获取标签列表"""
         return [tag.name for tag in self.tags]
     
-    def to_dict(self, include_content=False):
-        """转换为字典"""
+    def to_dict(self, include_content=False, include_views=True):
+        """
+        转换为字典
+
+        include_views=False 时不含浏览量：文章详情的响应被缓存并带ETag，
+        浏览量不让它们失效，改由 /posts/<id>/views 单独获取
+        """
+        return self._build_dict(
+            comment_count=self.get_comment_count(),
+            tags=[tag.to_dict() for tag in self.tags],
+            category=self.category.to_dict() if self.category else None,
+            author=self.author,
+            include_content=include_content,
+            include_views=include_views
+        )
+    
+    @staticmethod
+    def to_dict_list(posts, include_content=False):
+        """
+        批量序列化文章列表
+        作者、分类、标签按整页分组查询后在内存中组装，
+        计数直接读取冗余列，查询条数与每页文章数、标签数无关
+        """
+        from app.models.user import User
+        
+        posts = list(posts)
+        if not posts:
+            return []
+        post_ids = [p.id for p in posts]
+        
+        # 标签
+        tag_rows = db.session.query(post_tags.c.post_id, Tag).join(
+            Tag, Tag.id == post_tags.c.tag_id
+        ).filter(post_tags.c.post_id.in_(post_ids)).order_by(Tag.id).all()
+        tags_by_post = {}
+        for post_id, tag in tag_rows:
+            tags_by_post.setdefault(post_id, []).append(tag.to_dict())
+        
+        # 分类
+        category_ids = {p.category_id for p in posts if p.category_id}
+        categories = {}
+        if category_ids:
+            for category in Category.query.filter(Category.id.in_(category_ids)).all():
+                categories[category.id] = category.to_dict()
+        
+        # 作者
+        user_ids = {p.user_id for p in posts}
+        authors = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()}
+        
+        return [
+            p._build_dict(
+                comment_count=p.get_comment_count(),
+                tags=tags_by_post.get(p.id, []),
+                category=categories.get(p.category_id),
+                author=authors.get(p.user_id),
+                include_content=include_content
+            )
+            for p in posts
+        ]
+    
+    def _build_dict(self, comment_count, tags, category, author, include_content=False, include_views=True):
+        """根据已加载的关联数据组装字典"""
         data = {
             'id': self.id,
             'title': self.title,
             'slug': self.slug,
             'summary': self.summary,
             'is_published': self.is_published,
-            'view_count': self.view_count,
-            'comment_count': self.get_comment_count(),
-            'tags': [tag.to_dict() for tag in self.tags],
-            'category': self.category.to_dict() if self.category else None,
+            'view_count': self.get_view_count(),
+            'comment_count': comment_count,
+            'tags': tags,
+            'category': category,
             'author': {
-                'id': self.author.id,
-                'username': self.author.username,
-                'avatar': self.author.avatar
-            } if self.author else None,
+                'id': author.id,
+                'username': author.username,
+                'avatar': author.avatar
+            } if author else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'published_at': self.published_at.isoformat() if self.published_at else None
         }
         
+        if not include_views:
+            del data['view_count']
+        
         if include_content:
             data['content'] = self.content
             data['content_html'] = self.content_html
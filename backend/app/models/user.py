@@ -21,6 +21,7 @@ class User(db.Model):
     website = db.Column(db.String(200), default='')
     is_admin = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
+    token_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 权限变化时自增，使旧Token失效
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     
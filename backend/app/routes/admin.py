@@ -4,12 +4,16 @@
 """
 
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
 from sqlalchemy import func
 
 from app import db
-from app.models import User, APILog, LoginLog
+from app.models import User, Post, Comment, APILog, LoginLog
 from app.schemas import UserSchema
+from app.utils.auth import admin_required
+from app.utils.pagination import paginate, CursorError
+from app.utils.response_cache import response_cache
+from app.utils.rollup import log_rollup, RollupBucket
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -21,24 +25,12 @@ def api_response(code=200, msg='操作成功', data=None):
     return {'code': code, 'msg': msg, 'data': data}
 
 
-def check_admin():
-    """检查是否为管理员"""
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    return user and user.is_admin
-
-
 # ==================== 日志模块 ====================
 
 @admin_bp.route('/logs', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_logs():
     """获取API调用日志（仅管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     method = request.args.get('method')  # 按HTTP方法筛选
     status_code = request.args.get('status_code', type=int)  # 按状态码筛选
     user_id = request.args.get('user_id', type=int)  # 按用户筛选
@@ -52,68 +44,72 @@ def get_logs():
     if user_id:
         query = query.filter_by(user_id=user_id)
     
-    pagination = query.order_by(APILog.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        items, meta = paginate(query, APILog.created_at, APILog.id, default_per_page=20)
+    except CursorError:
+        return api_response(400, '无效的游标'), 400
     
-    logs = [log.to_dict() for log in pagination.items]
+    logs = [log.to_dict() for log in items]
     
-    return api_response(200, '获取成功', {
-        'items': logs,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    })
+    return api_response(200, '获取成功', dict(items=logs, **meta))
 
 
 @admin_bp.route('/logs/stats', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_logs_stats():
-    """获取日志统计（仅管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
+    """
+    获取日志统计（仅管理员）
     
-    # 总请求数
-    total_requests = APILog.query.count()
+    读取预聚合表而不是扫描原始日志；可选参数 start/end（ISO时间，UTC）
+    指定统计区间，默认统计全部数据。
+    """
+    from datetime import datetime
+    
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else datetime.utcnow()
+    except ValueError:
+        return api_response(400, '无效的时间格式'), 400
     
-    # 今日请求数
-    from datetime import datetime, timedelta
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_requests = APILog.query.filter(APILog.created_at >= today).count()
     
-    # 按HTTP方法统计
-    method_stats = db.session.query(
-        APILog.method,
-        func.count(APILog.id).label('count')
-    ).group_by(APILog.method).all()
+    buckets = log_rollup.query(start, end)
+    today_buckets = log_rollup.query(today, datetime.utcnow(), group_by=())
     
-    # 按状态码统计
-    status_stats = db.session.query(
-        APILog.status_code,
-        func.count(APILog.id).label('count')
-    ).group_by(APILog.status_code).all()
+    total = RollupBucket()
+    by_method, by_status, by_route = {}, {}, {}
+    for (method, route, status_class), bucket in buckets.items():
+        total.merge(bucket)
+        by_method[method] = by_method.get(method, 0) + bucket.count
+        by_status[status_class] = by_status.get(status_class, 0) + bucket.count
+        by_route.setdefault((method, route), RollupBucket()).merge(bucket)
     
-    # 平均响应时间
-    avg_response_time = db.session.query(func.avg(APILog.response_time)).scalar() or 0
+    # 请求量最多的接口
+    top_routes = sorted(by_route.items(), key=lambda item: item[1].count, reverse=True)[:20]
+    latency = total.to_dict()
     
     return api_response(200, '获取成功', {
-        'total_requests': total_requests,
-        'today_requests': today_requests,
-        'method_stats': [{'method': m.method, 'count': m.count} for m in method_stats],
-        'status_stats': [{'status_code': s.status_code, 'count': s.count} for s in status_stats],
-        'avg_response_time': round(avg_response_time, 4)
+        'total_requests': total.count,
+        'today_requests': sum(bucket.count for bucket in today_buckets.values()),
+        'method_stats': [{'method': m, 'count': n} for m, n in sorted(by_method.items())],
+        'status_stats': [{'status_class': c, 'count': n} for c, n in sorted(by_status.items())],
+        'avg_response_time': latency['avg'],
+        'latency': {key: latency[key] for key in ('min', 'max', 'p50', 'p95', 'p99')},
+        'route_stats': [
+            dict(method=method, route=route, **bucket.to_dict())
+            for (method, route), bucket in top_routes
+        ]
     })
 
 
 # ==================== 接口文档模块 ====================
 
 @admin_bp.route('/api-docs', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_api_docs():
     """获取博客接口文档（仅管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     api_docs = {
         'auth': {
             'name': '用户认证模块',
@@ -172,14 +168,27 @@ def get_api_docs():
                     'description': '获取文章列表，支持分页、搜索、筛选',
                     'params': {
                         'page': '页码（默认1）',
-                        'per_page': '每页数量（默认10）',
+                        'per_page': '每页数量（默认10，上限100）',
                         'keyword': '搜索关键词',
                         'category_id': '分类ID筛选',
-                        'tag_id': '标签ID筛选'
+                        'tag_id': '标签ID筛选',
+                        'sort': '排序字段：published_at/created_at/views',
+                        'order': '排序方向：desc/asc',
+                        'cursor': '游标分页（传空值取第一页，之后传next_cursor）',
+                        'with_total': '为false时不返回总数'
                     },
                     'response': '文章列表（含分页信息）',
                     'permission': '公开'
                 },
+                {
+                    'method': 'GET',
+                    'path': '/api/archives',
+                    'name': '文章归档',
+                    'description': '按年月分组的已发布文章',
+                    'params': {},
+                    'response': '年月分组列表（含每月篇数和文章标题）',
+                    'permission': '公开'
+                },
                 {
                     'method': 'GET',
                     'path': '/api/posts/{slug}',
@@ -188,7 +197,18 @@ def get_api_docs():
                     'params': {
                         'slug': '文章slug'
                     },
-                    'response': '文章详情（含内容）',
+                    'response': '文章详情（含内容，不含浏览量）',
+                    'permission': '公开'
+                },
+                {
+                    'method': 'GET',
+                    'path': '/api/posts/{id}/views',
+                    'name': '文章浏览量',
+                    'description': '获取文章当前浏览量（文章详情会被缓存，浏览量单独获取）',
+                    'params': {
+                        'id': '文章ID'
+                    },
+                    'response': '文章ID和浏览量',
                     'permission': '公开'
                 },
                 {
@@ -324,53 +344,89 @@ def get_api_docs():
 
 # ==================== 用户管理模块 ====================
 
+def _user_stats(user_ids):
+    """
+    一条语句查出一页用户的文章数、评论数和最近一次成功登录
+    
+    Returns:
+        {user_id: (post_count, comment_count, last_ip, last_login_at)}
+    """
+    if not user_ids:
+        return {}
+    
+    post_counts = db.session.query(
+        Post.user_id.label('user_id'), func.count(Post.id).label('n')
+    ).filter(Post.user_id.in_(user_ids)).group_by(Post.user_id).subquery()
+    
+    comment_counts = db.session.query(
+        Comment.user_id.label('user_id'), func.count(Comment.id).label('n')
+    ).filter(Comment.user_id.in_(user_ids)).group_by(Comment.user_id).subquery()
+    
+    # 每个用户按时间倒序编号，取第1条即最近一次成功登录
+    ranked_logins = db.session.query(
+        LoginLog.user_id.label('user_id'),
+        LoginLog.ip_address.label('ip_address'),
+        LoginLog.created_at.label('created_at'),
+        func.row_number().over(
+            partition_by=LoginLog.user_id,
+            order_by=(LoginLog.created_at.desc(), LoginLog.id.desc())
+        ).label('rn')
+    ).filter(
+        LoginLog.user_id.in_(user_ids),
+        LoginLog.login_status == 'success'
+    ).subquery()
+    
+    rows = db.session.query(
+        User.id,
+        func.coalesce(post_counts.c.n, 0),
+        func.coalesce(comment_counts.c.n, 0),
+        ranked_logins.c.ip_address,
+        ranked_logins.c.created_at
+    ).outerjoin(
+        post_counts, post_counts.c.user_id == User.id
+    ).outerjoin(
+        comment_counts, comment_counts.c.user_id == User.id
+    ).outerjoin(
+        ranked_logins, (ranked_logins.c.user_id == User.id) & (ranked_logins.c.rn == 1)
+    ).filter(User.id.in_(user_ids)).all()
+    
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
 @admin_bp.route('/users', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_users():
     """获取所有用户信息（仅管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    try:
+        items, meta = paginate(User.query, User.created_at, User.id, default_per_page=20)
+    except CursorError:
+        return api_response(400, '无效的游标'), 400
     
-    pagination = User.query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    stats = _user_stats([user.id for user in items])
     
     users = []
-    for user in pagination.items:
+    for user in items:
         user_data = user.to_dict()
         # 添加统计信息
-        user_data['post_count'] = user.posts.count()
-        user_data['comment_count'] = user.comments.count()
+        post_count, comment_count, last_ip, last_login_at = stats.get(user.id, (0, 0, None, None))
+        user_data['post_count'] = post_count
+        user_data['comment_count'] = comment_count
         user_data['last_log'] = None
-        
-        # 获取最近登录日志（从LoginLog表中获取）
-        last_login = LoginLog.query.filter_by(user_id=user.id, login_status='success').order_by(LoginLog.created_at.desc()).first()
-        if last_login:
+        if last_login_at:
             user_data['last_log'] = {
-                'ip_address': last_login.ip_address,
-                'created_at': last_login.created_at.isoformat()
+                'ip_address': last_ip,
+                'created_at': last_login_at.isoformat()
             }
         
         users.append(user_data)
     
-    return api_response(200, '获取成功', {
-        'items': users,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    })
+    return api_response(200, '获取成功', dict(items=users, **meta))
 
 
 @admin_bp.route('/users/stats', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_users_stats():
     """获取用户统计（仅管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     # 总用户数
     total_users = User.query.count()
     
@@ -395,12 +451,9 @@ def get_users_stats():
 
 
 @admin_bp.route('/users/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_user(id):
     """删除用户（仅管理员，不能删除自己）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     current_user_id = int(get_jwt_identity())
     if id == current_user_id:
         return api_response(400, '不能删除当前登录用户'), 400
@@ -410,6 +463,8 @@ def delete_user(id):
     try:
         db.session.delete(user)
         db.session.commit()
+        # 用户的文章和评论随之级联删除
+        response_cache.invalidate('posts')
         return api_response(200, '删除成功')
     except Exception as e:
         db.session.rollback()
@@ -417,12 +472,9 @@ def delete_user(id):
 
 
 @admin_bp.route('/users/<int:id>/toggle-admin', methods=['PUT'])
-@jwt_required()
+@admin_required
 def toggle_user_admin(id):
     """切换用户管理员权限（仅管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     current_user_id = int(get_jwt_identity())
     if id == current_user_id:
         return api_response(400, '不能修改自己的权限'), 400
@@ -4,12 +4,13 @@
 """
 
 from flask import Blueprint, request
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 
 from app import db
 from app.models import User, LoginLog
 from app.schemas import UserSchema, UserLoginSchema
+from app.utils.auth import create_user_token
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -49,8 +50,8 @@ def register():
         db.session.add(user)
         db.session.commit()
         
-        # 生成Token（identity必须是字符串）
-        access_token = create_access_token(identity=str(user.id))
+        # 生成Token（带角色声明）
+        access_token = create_user_token(user)
         
         return api_response(200, '注册成功', {
             'token': access_token,
@@ -86,8 +87,8 @@ def login():
         # 更新最后登录时间
         user.last_seen = db.func.now()
         
-        # 生成Token（identity必须是字符串）
-        access_token = create_access_token(identity=str(user.id))
+        # 生成Token（带角色声明）
+        access_token = create_user_token(user)
         
         # 记录登录日志
         login_log = LoginLog(
@@ -6,12 +6,15 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
-from markdown import markdown
-import bleach
 
 from app import db
-from app.models import Comment, Post, User
+from app.models import Comment, Post
+from app.models.comment import MAX_DEPTH
 from app.schemas import CommentSchema
+from app.utils.auth import is_admin
+from app.utils.response_cache import response_cache
+from app.utils.render import render_markdown
+from app.utils.pagination import paginate, CursorError
 
 comments_bp = Blueprint('comments', __name__)
 comment_schema = CommentSchema()
@@ -22,38 +25,32 @@ def api_response(code=200, msg='操作成功', data=None):
     return {'code': code, 'msg': msg, 'data': data}
 
 
-def render_markdown(content):
-    """渲染Markdown为HTML"""
-    html = markdown(content, extensions=['extra'])
-    allowed_tags = ['p', 'br', 'strong', 'em', 'u', 'code', 'pre', 'a']
-    allowed_attrs = {'a': ['href', 'title']}
-    return bleach.clean(html, tags=allowed_tags, attributes=allowed_attrs)
-
-
 @comments_bp.route('/posts/<int:post_id>/comments', methods=['GET'])
 def get_comments(post_id):
-    """获取文章评论列表"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    """
+    获取文章评论列表（按根评论分页）
     
+    tree=1 时每条根评论带上整楼回复（replies嵌套），查询条数与楼层数无关
+    """
     post = Post.query.get_or_404(post_id)
     
-    pagination = Comment.query.filter_by(
+    query = Comment.query.filter_by(
         post_id=post_id,
         parent_id=None,
         is_approved=True
-    ).order_by(Comment.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
     )
     
-    comments = [comment.to_dict() for comment in pagination.items]
+    try:
+        items, meta = paginate(query, Comment.created_at, Comment.id, default_per_page=20)
+    except CursorError:
+        return api_response(400, '无效的游标'), 400
     
-    return api_response(200, '获取成功', {
-        'items': comments,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    })
+    if request.args.get('tree') in ('1', 'true'):
+        comments = Comment.load_threads(items)
+    else:
+        comments = Comment.to_dict_list(items)
+    
+    return api_response(200, '获取成功', dict(items=comments, **meta))
 
 
 @comments_bp.route('/posts/<int:post_id>/comments', methods=['POST'])
@@ -70,19 +67,30 @@ def create_comment(post_id):
     try:
         data = comment_schema.load(json_data)
         
+        # 回复必须属于同一篇文章，且不超过最大层级
+        parent_id = data.get('parent_id')
+        if parent_id is not None:
+            parent = db.session.get(Comment, parent_id)
+            if parent is None or parent.post_id != post_id:
+                return api_response(400, '回复的评论不存在'), 400
+            if parent.depth + 1 >= MAX_DEPTH:
+                return api_response(400, '回复层级过深'), 400
+        
         # 渲染Markdown
-        content_html = render_markdown(data['content'])
+        content_html = render_markdown(data['content'], 'comment')
         
         comment = Comment(
             content=data['content'],
             content_html=content_html,
             post_id=post_id,
             user_id=user_id,
-            parent_id=data.get('parent_id')
+            parent_id=parent_id
         )
         
         db.session.add(comment)
         db.session.commit()
+        # 文章列表和详情里带评论数
+        response_cache.invalidate('posts')
         
         return api_response(200, '评论成功', comment.to_dict())
         
@@ -98,16 +106,16 @@ def create_comment(post_id):
 def delete_comment(id):
     """删除评论（需要管理员或评论作者）"""
     user_id = int(get_jwt_identity())
-    user = db.session.get(User, user_id)
     comment = Comment.query.get_or_404(id)
     
     # 检查权限
-    if not user.is_admin and comment.user_id != user_id:
+    if comment.user_id != user_id and not is_admin():
         return api_response(403, '无权限操作'), 403
     
     try:
         db.session.delete(comment)
         db.session.commit()
+        response_cache.invalidate('posts')
         return api_response(200, '删除成功')
     except Exception as e:
         db.session.rollback()
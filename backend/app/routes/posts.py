@@ -3,15 +3,22 @@
 文章路由
 """
 
-from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, g
+from flask_jwt_extended import get_jwt_identity
 from marshmallow import ValidationError
-from markdown import markdown
-import bleach
 
 from app import db
-from app.models import Post, Category, Tag, User
+from app.models import Post, Tag
 from app.schemas import PostSchema
+from app.utils import search
+from app.utils.render import render_markdown
+from app.utils.auth import admin_required
+from app.utils.http_cache import conditional
+from app.utils.archives import archive_cache
+from app.utils.catalog import catalog_cache
+from app.utils.pagination import paginate, use_cursor, CursorError
+from app.utils.response_cache import response_cache
+from app.utils.view_counter import view_counter
 
 posts_bp = Blueprint('posts', __name__)
 post_schema = PostSchema()
@@ -22,23 +29,34 @@ def api_response(code=200, msg='操作成功', data=None):
     return {'code': code, 'msg': msg, 'data': data}
 
 
-def render_markdown(content):
-    """渲染Markdown为HTML"""
-    html = markdown(content, extensions=['extra', 'codehilite'])
-    allowed_tags = ['p', 'br', 'strong', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                   'ul', 'ol', 'li', 'blockquote', 'code', 'pre', 'a', 'img']
-    allowed_attrs = {'a': ['href', 'title'], 'img': ['src', 'alt', 'title']}
-    return bleach.clean(html, tags=allowed_tags, attributes=allowed_attrs)
+# 文章列表支持的排序字段，均有 (is_published, 字段) 复合索引
+POST_SORT_FIELDS = {
+    'published_at': Post.published_at,
+    'created_at': Post.created_at,
+    'views': Post.view_count
+}
+
+
+def _list_marks():
+    """文章列表水位：响应缓存 posts 标签的版本号（文章、评论、分类、标签的写接口会让它加一）"""
+    # 浏览量不改变水位，按浏览量排序时不做条件请求
+    if request.args.get('sort') == 'views':
+        return None
+    return response_cache.marks('posts')
 
 
 @posts_bp.route('/posts', methods=['GET'])
+@conditional(_list_marks)
+@response_cache.cached(tags=('posts',))
 def get_posts():
     """获取文章列表"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
     category_id = request.args.get('category_id', type=int)
     tag_id = request.args.get('tag_id', type=int)
     keyword = request.args.get('keyword', '')
+    sort = request.args.get('sort', 'published_at')
+    order = request.args.get('order', 'desc')
+    
+    sort_column = POST_SORT_FIELDS.get(sort, Post.published_at)
     
     query = Post.query.filter_by(is_published=True)
     
@@ -47,47 +65,80 @@ def get_posts():
     if tag_id:
         query = query.join(Post.tags).filter(Tag.id == tag_id)
     if keyword:
-        query = query.filter(
-            db.or_(
-                Post.title.ilike(f'%{keyword}%'),
-                Post.content.ilike(f'%{keyword}%')
-            )
-        )
-    
-    pagination = query.order_by(Post.published_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+        # 全文索引检索；未指定sort且按页码分页时按相关度排序，
+        # 游标分页只能按排序字段定位
+        ranked = 'sort' not in request.args and not use_cursor()
+        query = search.search_posts(query, keyword, ranked=ranked)
     
-    posts = [post.to_dict() for post in pagination.items]
+    try:
+        items, meta = paginate(
+            query, sort_column, Post.id,
+            descending=order != 'asc', default_per_page=10
+        )
+    except CursorError:
+        return api_response(400, '无效的游标'), 400
     
-    return api_response(200, '获取成功', {
-        'items': posts,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page
-    })
+    return api_response(200, '获取成功', dict(items=Post.to_dict_list(items), **meta))
+
+
+@posts_bp.route('/archives', methods=['GET'])
+@conditional(lambda: archive_cache.marks())
+def get_archives():
+    """获取文章归档（按年月分组）"""
+    return api_response(200, '获取成功', archive_cache.get())
+
+
+# slug -> 文章id：304和缓存命中时累加浏览量用，slug创建后不再修改
+_post_ids = {}
+
+
+def _count_cached_view(meta):
+    """文章详情命中响应缓存时仍累加浏览量"""
+    if meta:
+        _post_ids[meta['slug']] = meta['post_id']
+        view_counter.incr(meta['post_id'])
+
+
+def _count_not_modified_view(slug):
+    """文章详情返回304时仍累加浏览量（本进程没见过的slug才查一次库）"""
+    post_id = _post_ids.get(slug)
+    if post_id is None:
+        post_id = db.session.query(Post.id).filter_by(slug=slug).scalar()
+        if post_id is None:
+            return
+        _post_ids[slug] = post_id
+    view_counter.incr(post_id)
 
 
 @posts_bp.route('/posts/<slug>', methods=['GET'])
+@conditional(lambda slug: response_cache.marks('posts'), on_not_modified=_count_not_modified_view)
+@response_cache.cached(tags=('posts',), on_hit=_count_cached_view)
 def get_post(slug):
     """获取文章详情"""
     post = Post.query.filter_by(slug=slug).first_or_404()
+    g.cache_meta = {'post_id': post.id, 'slug': post.slug}
+    _post_ids[post.slug] = post.id
     
     # 增加浏览次数
     post.increment_view_count()
     
-    return api_response(200, '获取成功', post.to_dict(include_content=True))
+    # 详情会被缓存并带ETag，浏览量不让它们失效，不放进详情
+    return api_response(200, '获取成功', post.to_dict(include_content=True, include_views=False))
+
+
+@posts_bp.route('/posts/<int:id>/views', methods=['GET'])
+def get_post_views(id):
+    """获取文章浏览量（不缓存、不做条件请求，只读一列）"""
+    row = db.session.query(Post.view_count).filter_by(id=id).first_or_404()
+    view_count = (row.view_count or 0) + view_counter.pending(id)
+    return api_response(200, '获取成功', {'id': id, 'view_count': view_count})
 
 
 @posts_bp.route('/posts', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_post():
     """创建文章（需要管理员权限）"""
     user_id = int(get_jwt_identity())
-    user = db.session.get(User, user_id)
-    
-    if not user or not user.is_admin:
-        return api_response(403, '无权限操作'), 403
     
     json_data = request.get_json()
     if not json_data:
@@ -120,6 +171,7 @@ def create_post():
                     post.tags.append(tag)
             db.session.commit()
         
+        response_cache.invalidate('posts')
         return api_response(200, '创建成功', post.to_dict())
         
     except ValidationError as err:
@@ -130,15 +182,9 @@ def create_post():
 
 
 @posts_bp.route('/posts/<int:id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_post(id):
     """更新文章（需要管理员权限）"""
-    user_id = int(get_jwt_identity())
-    user = db.session.get(User, user_id)
-    
-    if not user or not user.is_admin:
-        return api_response(403, '无权限操作'), 403
-    
     post = Post.query.get_or_404(id)
     json_data = request.get_json()
     
@@ -168,6 +214,7 @@ def update_post(id):
                     post.tags.append(tag)
         
         db.session.commit()
+        response_cache.invalidate('posts')
         return api_response(200, '更新成功', post.to_dict())
         
     except ValidationError as err:
@@ -178,20 +225,16 @@ def update_post(id):
 
 
 @posts_bp.route('/posts/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_post(id):
     """删除文章（需要管理员权限）"""
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    
-    if not user or not user.is_admin:
-        return api_response(403, '无权限操作'), 403
-    
     post = Post.query.get_or_404(id)
     
     try:
         db.session.delete(post)
         db.session.commit()
+        _post_ids.pop(post.slug, None)
+        response_cache.invalidate('posts')
         return api_response(200, '删除成功')
     except Exception as e:
         db.session.rollback()
@@ -199,14 +242,14 @@ def delete_post(id):
 
 
 @posts_bp.route('/categories', methods=['GET'])
+@conditional(lambda: catalog_cache.get().marks('categories'))
 def get_categories():
-    """获取所有分类"""
-    categories = Category.query.all()
-    return api_response(200, '获取成功', [c.to_dict() for c in categories])
+    """获取所有分类（读目录快照，不查库）"""
+    return api_response(200, '获取成功', catalog_cache.get().categories)
 
 
 @posts_bp.route('/tags', methods=['GET'])
+@conditional(lambda: catalog_cache.get().marks('tags'))
 def get_tags():
-    """获取所有标签"""
-    tags = Tag.query.all()
-    return api_response(200, '获取成功', [t.to_dict() for t in tags])
+    """获取所有标签（读目录快照，不查库）"""
+    return api_response(200, '获取成功', catalog_cache.get().tags)
@@ -4,12 +4,13 @@
 """
 
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 
 from app import db
-from app.models import Tag, Category, User
+from app.models import Tag, Category
 from app.schemas import TagSchema, CategorySchema
+from app.utils.auth import admin_required
+from app.utils.response_cache import response_cache
 
 tags_bp = Blueprint('tags', __name__)
 
@@ -22,22 +23,12 @@ def api_response(code=200, msg='操作成功', data=None):
     return {'code': code, 'msg': msg, 'data': data}
 
 
-def check_admin():
-    """检查是否为管理员"""
-    user_id = int(get_jwt_identity())
-    user = db.session.get(User, user_id)
-    return user and user.is_admin
-
-
 # ========== 分类管理 ==========
 
 @tags_bp.route('/categories', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_category():
     """创建分类（管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     json_data = request.get_json()
     try:
         data = category_schema.load(json_data)
@@ -59,12 +50,9 @@ def create_category():
 
 
 @tags_bp.route('/categories/<int:id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_category(id):
     """更新分类（管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     category = Category.query.get_or_404(id)
     json_data = request.get_json()
     
@@ -81,6 +69,7 @@ def update_category(id):
             category.description = data['description']
         
         db.session.commit()
+        response_cache.invalidate('posts')
         return api_response(200, '更新成功', category.to_dict())
         
     except ValidationError as err:
@@ -91,12 +80,9 @@ def update_category(id):
 
 
 @tags_bp.route('/categories/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_category(id):
     """删除分类（管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     category = Category.query.get_or_404(id)
     
     try:
@@ -106,6 +92,7 @@ def delete_category(id):
         
         db.session.delete(category)
         db.session.commit()
+        response_cache.invalidate('posts')
         return api_response(200, '删除成功')
     except Exception as e:
         db.session.rollback()
@@ -115,12 +102,9 @@ def delete_category(id):
 # ========== 标签管理 ==========
 
 @tags_bp.route('/tags', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_tag():
     """创建标签（管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     json_data = request.get_json()
     try:
         data = tag_schema.load(json_data)
@@ -142,17 +126,15 @@ def create_tag():
 
 
 @tags_bp.route('/tags/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_tag(id):
     """删除标签（管理员）"""
-    if not check_admin():
-        return api_response(403, '无权限操作'), 403
-    
     tag = Tag.query.get_or_404(id)
     
     try:
         db.session.delete(tag)
         db.session.commit()
+        response_cache.invalidate('posts')
         return api_response(200, '删除成功')
     except Exception as e:
         db.session.rollback()
@@ -3,11 +3,11 @@
 测试技术资源路由
 """
 
-from flask import Blueprint, request
+from flask import Blueprint, request, abort, current_app
 
-from app import db
-from app.models import TestTechResource
 from app.schemas import TestTechResourceSchema
+from app.utils.http_cache import conditional
+from app.utils.tech_resources import tech_resource_cache
 
 tech_bp = Blueprint('tech', __name__)
 
@@ -20,48 +20,46 @@ def api_response(code=200, msg='操作成功', data=None):
     return {'code': code, 'msg': msg, 'data': data}
 
 
-@tech_bp.route('/test-tech-resources', methods=['GET'])
-def get_test_tech_resources():
-    """获取测试技术资源列表（公开）"""
+def json_body(body):
+    """直接返回快照里预编码好的JSON"""
+    return current_app.response_class(body.data, mimetype='application/json')
+
+
+def _list_body():
+    """按查询参数取列表响应体（分类精确匹配，is_recommended只认true/false）"""
     category = request.args.get('category')
     is_recommended = request.args.get('is_recommended', type=lambda x: x.lower() == 'true')
-    
-    query = TestTechResource.query
-    
-    if category:
-        query = query.filter_by(category=category)
-    if is_recommended is not None:
-        query = query.filter_by(is_recommended=is_recommended)
-    
-    # 按分类和排序号排序
-    resources = query.order_by(
-        TestTechResource.category,
-        TestTechResource.sort_order
-    ).all()
-    
-    # 按分类分组
-    result = {}
-    for resource in resources:
-        cat = resource.category
-        if cat not in result:
-            result[cat] = {
-                'category': cat,
-                'resources': []
-            }
-        result[cat]['resources'].append(resource.to_dict())
-    
-    return api_response(200, '获取成功', list(result.values()))
+    return tech_resource_cache.get().list_body(category, is_recommended)
+
+
+def _detail_body(id):
+    return tech_resource_cache.get().details.get(id)
+
+
+@tech_bp.route('/test-tech-resources', methods=['GET'])
+@conditional(lambda: (_list_body().digest, tech_resource_cache.get().updated_at))
+def get_test_tech_resources():
+    """获取测试技术资源列表（公开，按分类分组）"""
+    return json_body(_list_body())
 
 
 @tech_bp.route('/test-tech-resources/categories', methods=['GET'])
+@conditional(lambda: (tech_resource_cache.get().category_list.digest,))
 def get_categories():
     """获取所有分类（公开）"""
-    categories = db.session.query(TestTechResource.category).distinct().all()
-    return api_response(200, '获取成功', [c[0] for c in categories])
+    return json_body(tech_resource_cache.get().category_list)
+
+
+def _detail_marks(id):
+    body = _detail_body(id)
+    return (body.digest,) if body is not None else None
 
 
 @tech_bp.route('/test-tech-resources/<int:id>', methods=['GET'])
+@conditional(_detail_marks)
 def get_resource(id):
     """获取单个资源详情（公开）"""
-    resource = TestTechResource.query.get_or_404(id)
-    return api_response(200, '获取成功', resource.to_dict())
+    body = _detail_body(id)
+    if body is None:
+        abort(404)
+    return json_body(body)
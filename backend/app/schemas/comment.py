@@ -10,6 +10,7 @@ class CommentSchema(Schema):
     """评论序列化器"""
     id = fields.Integer(dump_only=True)
     content = fields.String(required=True)
+    parent_id = fields.Integer(load_only=True, allow_none=True)  # 回复的评论ID
     content_html = fields.String(dump_only=True)
     is_approved = fields.Boolean(dump_only=True)
     
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+文章归档
+
+按年月聚合已发布文章：GROUP BY 统计每月篇数，另一条只取
+id/slug/title/published_at 的轻量查询填充条目，两条查询都走
+(is_published, published_at) 索引。结果在进程内缓存，文章发布、
+撤回、删除或修改标题/slug/发布时间的事务提交后共享版本号加一，
+所有worker下次读取时重建。
+"""
+
+from sqlalchemy import extract, func, select
+
+from app import db
+from app.models import Post
+from app.utils.generations import GenerationCache, on_committed_change
+
+
+# 影响归档内容的文章字段
+_ARCHIVE_FIELDS = ('is_published', 'published_at', 'title', 'slug')
+
+
+def build_archives():
+    """查询数据库，生成按年月分组的归档数据"""
+    posts = Post.__table__
+    year = extract('year', posts.c.published_at).label('year')
+    month = extract('month', posts.c.published_at).label('month')
+    published = (posts.c.is_published == True, posts.c.published_at.isnot(None))
+
+    buckets = db.session.execute(
+        select(year, month, func.count(posts.c.id).label('count'))
+        .where(*published)
+        .group_by(year, month)
+        .order_by(year.desc(), month.desc())
+    ).all()
+    rows = db.session.execute(
+        select(posts.c.id, posts.c.slug, posts.c.title, posts.c.published_at)
+        .where(*published)
+        .order_by(posts.c.published_at.desc(), posts.c.id.desc())
+    ).all()
+
+    # 条目已按发布时间倒序，按桶的篇数依次切分即可
+    items = []
+    offset = 0
+    for bucket in buckets:
+        entries = rows[offset:offset + bucket.count]
+        offset += bucket.count
+        items.append({
+            'year': int(bucket.year),
+            'month': int(bucket.month),
+            'count': bucket.count,
+            'posts': [{
+                'id': row.id,
+                'slug': row.slug,
+                'title': row.title,
+                'published_at': row.published_at.isoformat()
+            } for row in entries]
+        })
+    return {'total': len(rows), 'items': items}
+
+
+class ArchiveCache(GenerationCache):
+    """归档数据的进程内缓存"""
+
+    name = 'archives'
+    ttl_config = 'ARCHIVES_CACHE_TTL'
+
+    def build(self):
+        return build_archives()
+
+
+archive_cache = ArchiveCache()
+
+
+@on_committed_change({Post: _ARCHIVE_FIELDS})
+def _invalidate_archives(changed):
+    archive_cache.invalidate()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+JWT权限工具
+
+Token里带上 is_admin / is_active / ver 声明，权限判断直接读声明，
+不再每个请求查一次users表。users.token_version 在管理员权限或启用状态
+变化时自增，校验Token时和进程内缓存的版本号比对，不一致即视为已吊销；
+修改提交后共享版本号 tokens 加一，所有worker清空进程内缓存，立即生效。
+"""
+
+import time
+import threading
+from functools import wraps
+
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+
+from app import db
+from app.models import User
+from app.utils.generations import generations, on_committed_change
+
+
+# 变化后需要让旧Token失效的用户字段
+_ROLE_FIELDS = ('is_admin', 'is_active')
+
+
+def create_user_token(user):
+    """签发带角色声明的访问Token（identity必须是字符串）"""
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={
+            'is_admin': bool(user.is_admin),
+            'is_active': bool(user.is_active),
+            'ver': user.token_version or 0
+        }
+    )
+
+
+class TokenVersionCache:
+    """用户Token版本号的进程内缓存"""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._generation = None
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """读取缓存配置"""
+        self.ttl = app.config.get('TOKEN_VERSION_CACHE_TTL', 30)
+        self.clear()
+
+    def get(self, user_id):
+        """返回用户当前的Token版本号，用户不存在或已禁用时返回None"""
+        now = time.monotonic()
+        generation = generations.get('tokens')
+        with self._lock:
+            # 任一worker提交了权限变化，整体丢弃
+            if generation is None or generation != self._generation:
+                self._versions.clear()
+                self._generation = generation
+            cached = self._versions.get(user_id)
+            if cached is not None and now - cached[1] < self.ttl:
+                self.hits += 1
+                return cached[0]
+
+        row = db.session.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+        version = None
+        if row is not None and row.is_active:
+            version = row.token_version or 0
+        with self._lock:
+            self.misses += 1
+            self._versions[user_id] = (version, now)
+        return version
+
+    def is_revoked(self, jwt_payload):
+        """Token版本号与用户当前版本不一致即视为已吊销"""
+        try:
+            user_id = int(jwt_payload['sub'])
+        except (KeyError, TypeError, ValueError):
+            return True
+        version = self.get(user_id)
+        return version is None or jwt_payload.get('ver', 0) != version
+
+    def discard(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._versions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+            self._generation = None
+
+    def stats(self):
+        """缓存统计"""
+        return {
+            'size': len(self._versions),
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+token_versions = TokenVersionCache()
+
+
+def is_admin():
+    """当前请求的用户是否为管理员（需在jwt_required之后调用）"""
+    claims = get_jwt()
+    if 'is_admin' in claims:
+        return bool(claims['is_admin']) and bool(claims.get('is_active', True))
+    # 升级前签发、不带角色声明的Token，回退到查库
+    user = db.session.get(User, int(get_jwt_identity()))
+    return bool(user and user.is_admin and user.is_active)
+
+
+def admin_required(fn):
+    """要求登录且为管理员，否则返回403"""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not is_admin():
+            return {'code': 403, 'msg': '无权限操作', 'data': None}, 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@event.listens_for(db.session, 'before_flush')
+def _bump_token_version(session, flush_context, instances):
+    """管理员权限或启用状态变化时自增版本号，使该用户已签发的Token失效"""
+    for obj in session.dirty:
+        if not isinstance(obj, User) or obj.id is None:
+            continue
+        if any(attributes.get_history(obj, key).has_changes() for key in _ROLE_FIELDS):
+            if not attributes.get_history(obj, 'token_version').has_changes():
+                obj.token_version = (obj.token_version or 0) + 1
+
+
+@on_committed_change({User: _ROLE_FIELDS})
+def _discard_token_versions(changed):
+    token_versions.discard(user_id for model, user_id in changed)
+    generations.bump('tokens')
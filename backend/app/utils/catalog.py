@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+分类/标签目录
+
+分类和标签（含已发布文章数）放在进程内快照里，侧边栏和筛选下拉稳定状态下不查库。
+文章数直接读冗余计数列，快照由一条 UNION ALL 查询重建；
+分类、标签增删改，或文章新增/删除/改变发布状态、分类、标签的事务提交后共享版本号加一，
+所有worker下次读取时重建。
+"""
+
+import hashlib
+
+from sqlalchemy import literal, select, union_all
+
+from app import db
+from app.models import Post, Category, Tag
+from app.utils.generations import GenerationCache, on_committed_change
+
+
+# 影响分类/标签文章数的文章字段
+_COUNTED_FIELDS = ('is_published', 'category_id', 'category', 'tags')
+
+
+def build_catalog():
+    """一条查询读出全部分类和标签"""
+    categories = Category.__table__
+    tags = Tag.__table__
+    rows = db.session.execute(union_all(
+        select(literal('category').label('kind'), categories.c.id, categories.c.name,
+               categories.c.slug, categories.c.description,
+               categories.c.published_post_count, categories.c.updated_at),
+        select(literal('tag').label('kind'), tags.c.id, tags.c.name,
+               tags.c.slug, literal(None).label('description'),
+               tags.c.published_post_count, tags.c.updated_at)
+    )).all()
+
+    result = {'categories': [], 'tags': []}
+    updated = []
+    for row in sorted(rows, key=lambda r: (r.kind, r.id)):
+        item = {
+            'id': row.id,
+            'name': row.name,
+            'slug': row.slug,
+            'post_count': row.published_post_count or 0
+        }
+        if row.kind == 'category':
+            item['description'] = row.description
+            result['categories'].append(item)
+        else:
+            result['tags'].append(item)
+        if row.updated_at is not None:
+            updated.append(row.updated_at)
+    return Catalog(result['categories'], result['tags'], max(updated, default=None))
+
+
+class Catalog:
+    """一份不可变的目录快照"""
+
+    def __init__(self, categories, tags, updated_at):
+        self.categories = categories
+        self.tags = tags
+        self.updated_at = updated_at
+        # 内容摘要作为ETag水位，各worker快照内容相同则ETag相同
+        self.digests = {
+            'categories': hashlib.sha1(repr(categories).encode('utf-8')).hexdigest(),
+            'tags': hashlib.sha1(repr(tags).encode('utf-8')).hexdigest()
+        }
+
+    def marks(self, kind):
+        """条件请求水位：内容摘要 + 最近修改时间"""
+        return (self.digests[kind], self.updated_at)
+
+
+class CatalogCache(GenerationCache):
+    """分类/标签目录的进程内缓存"""
+
+    name = 'catalog'
+    ttl_config = 'CATALOG_CACHE_TTL'
+
+    def build(self):
+        return build_catalog()
+
+
+catalog_cache = CatalogCache()
+
+
+@on_committed_change({Post: _COUNTED_FIELDS, Category: None, Tag: None})
+def _invalidate_catalog(changed):
+    catalog_cache.invalidate()
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+写后失效
+
+- `generations`：按名字（posts / archives / catalog / tech / tokens）保存的共享版本号，
+  写操作提交后加一，各worker读取时比较版本号即可知道进程内的数据是否过期，
+  也可直接作为ETag的水位。版本号的存放位置由 GENERATION_STORE 配置：
+  file（默认，同机多worker共享目录，读一次stat）/ redis（多机部署）/ local（仅本进程）。
+- `on_committed_change`：事务提交后，本次事务新增/删除了关注的模型，或改动了关注的字段时调用回调；
+  回滚的事务不触发。归档、分类/标签目录、测试技术资源快照、Token版本号缓存都用它感知写操作。
+- `GenerationCache`：按共享版本号失效的进程内缓存，任一worker提交修改后所有worker下次读取时重建；
+  另有 ttl 兜底，数据库被应用之外修改时最多滞后 ttl 秒。
+"""
+
+import os
+import time
+import uuid
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+
+from app import db
+
+
+class LocalStore:
+    """进程内版本号（单进程或测试）"""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, names):
+        return tuple(self._versions.get(name, 0) for name in names)
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+
+class FileStore:
+    """
+    目录中每个名字一个文件，版本号即文件字节数
+
+    每次加一以O_APPEND追加1字节，多进程并发也不会丢失；读取只需一次stat。
+    目录被清空后版本号从0重新开始，epoch 随之变化，旧的ETag不会误判为未修改。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.epoch = self._epoch()
+
+    def _epoch(self):
+        path = os.path.join(self.directory, '.epoch')
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            with open(path) as f:
+                return f.read().strip()
+        with os.fdopen(fd, 'w') as f:
+            epoch = uuid.uuid4().hex[:12]
+            f.write(epoch)
+        return epoch
+
+    def get(self, names):
+        versions = []
+        for name in names:
+            try:
+                versions.append(os.stat(os.path.join(self.directory, name)).st_size)
+            except OSError:
+                versions.append(0)
+        return tuple(versions)
+
+    def bump(self, names):
+        for name in names:
+            fd = os.open(os.path.join(self.directory, name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, b'.')
+            finally:
+                os.close(fd)
+
+
+class RedisStore:
+    """兼容Redis协议的服务，多机部署共享"""
+
+    def __init__(self, url, prefix='gen:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.client.setnx(prefix + '.epoch', uuid.uuid4().hex[:12])
+        self.epoch = self.client.get(prefix + '.epoch').decode()
+
+    def get(self, names):
+        if not names:
+            return ()
+        values = self.client.mget([self.prefix + name for name in names])
+        return tuple(int(value or 0) for value in values)
+
+    def bump(self, names):
+        pipe = self.client.pipeline()
+        for name in names:
+            pipe.incr(self.prefix + name)
+        pipe.execute()
+
+
+class Generations:
+    """共享版本号"""
+
+    def __init__(self):
+        self.store = LocalStore()
+        # 统计计数
+        self.bumps = 0
+        self.errors = 0
+
+    def init_app(self, app):
+        """按配置选择版本号存放位置"""
+        name = app.config.get('GENERATION_STORE', 'file')
+        if name == 'file':
+            self.store = FileStore(app.config['GENERATION_DIR'])
+        elif name == 'redis':
+            self.store = RedisStore(app.config['GENERATION_URL'])
+        elif name == 'local':
+            self.store = LocalStore()
+        else:
+            raise ValueError(f'未知的版本号存储: {name}')
+
+    @property
+    def epoch(self):
+        return self.store.epoch
+
+    def get(self, *names):
+        """各名字当前的版本号元组；存储不可用时返回None，调用方按未知版本处理"""
+        try:
+            return self.store.get(names)
+        except Exception as e:
+            self.errors += 1
+            print(f"读取版本号失败: {e}")
+            return None
+
+    def bump(self, *names):
+        """各名字的版本号加一"""
+        try:
+            self.store.bump(names)
+            self.bumps += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"版本号递增失败: {e}")
+
+    def marks(self, *names):
+        """条件请求水位：epoch + 各版本号；存储不可用时返回None（不做条件请求）"""
+        versions = self.get(*names)
+        if versions is None:
+            return None
+        return (self.epoch,) + versions
+
+    def stats(self):
+        """运行统计"""
+        return {
+            'store': type(self.store).__name__,
+            'bumps': self.bumps,
+            'errors': self.errors
+        }
+
+
+generations = Generations()
+
+
+_CHANGES_KEY = '_committed_changes'
+
+# [(关注的模型及字段, 回调)]
+_watchers = []
+
+
+def on_committed_change(watched):
+    """
+    装饰器：注册提交后的回调
+
+    Args:
+        watched: {模型类: 字段元组}，字段为None表示该模型的任何修改都算；新增和删除总是算
+
+    被装饰的函数参数为本次事务改动对象的 (模型类, 主键) 集合。
+    """
+    def decorator(fn):
+        _watchers.append((watched, fn))
+        return fn
+    return decorator
+
+
+def _is_change(obj, fields, persisted):
+    if not persisted or fields is None:
+        return True
+    return any(attributes.get_history(obj, key).has_changes() for key in fields)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """flush后记录各回调关注的改动（此时属性历史还在）"""
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    candidates = [(obj, False) for obj in list(session.new) + list(session.deleted)]
+    candidates += [(obj, True) for obj in session.dirty]
+    for index, (watched, fn) in enumerate(_watchers):
+        for obj, persisted in candidates:
+            for model, fields in watched.items():
+                if isinstance(obj, model) and _is_change(obj, fields, persisted):
+                    changes.setdefault(index, set()).add((model, obj.id))
+                    break
+
+
+@event.listens_for(db.session, 'after_commit')
+def _run_callbacks(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes:
+        return
+    for index, changed in changes.items():
+        _watchers[index][1](changed)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
+
+
+class GenerationCache:
+    """
+    按共享版本号失效的进程内缓存
+
+    子类设置 name（版本号名字）并实现 build() 生成数据；revalidate(data) 可在ttl到期时
+    做一次廉价检查，返回True则继续使用旧数据而不重建。
+    """
+
+    # 共享版本号的名字
+    name = None
+    # ttl 对应的配置项
+    ttl_config = None
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._built_at = 0.0
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """读取缓存配置，丢弃已有数据"""
+        if self.ttl_config:
+            self.ttl = app.config.get(self.ttl_config, self.ttl)
+        with self._lock:
+            self._data = None
+            self._version = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def revalidate(self, data):
+        return False
+
+    def get(self):
+        """返回缓存数据，版本号变化或过期时重建"""
+        # 先读版本号再重建：重建期间有新的提交，版本号随之变化，下次读取会再重建
+        versions = generations.get(self.name)
+        version = versions[0] if versions is not None else None
+        with self._lock:
+            data = self._data if version is not None and self._version == version else None
+            if data is not None and time.monotonic() - self._built_at < self.ttl:
+                self.hits += 1
+                return data
+
+        if data is not None and self.revalidate(data):
+            with self._lock:
+                self.hits += 1
+                if self._version == version:
+                    self._built_at = time.monotonic()
+            return data
+
+        data = self.build()
+        with self._lock:
+            self.misses += 1
+            self._data = data
+            self._version = version
+            self._built_at = time.monotonic()
+        return data
+
+    def invalidate(self):
+        """共享版本号加一，所有worker下次访问时重建"""
+        with self._lock:
+            self._data = None
+        generations.bump(self.name)
+
+    def marks(self):
+        """条件请求水位：共享版本号，读取不查库"""
+        return generations.marks(self.name)
+
+    @property
+    def version(self):
+        versions = generations.get(self.name)
+        return versions[0] if versions is not None else None
+
+    def stats(self):
+        """缓存统计"""
+        return {
+            'cached': self._data is not None,
+            'version': self._version,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP条件请求（ETag / Last-Modified / 304）
+
+公开接口的响应由水位决定，水位和请求URL一起算出弱ETag：
+- 文章列表/详情、归档：写操作提交后递增的共享版本号（app.utils.generations），不查库；
+- 分类、标签、测试技术资源：进程内快照的内容摘要 + 最近修改时间，
+  带时间的水位同时给出 Last-Modified。
+客户端带来的 If-None-Match / If-Modified-Since 匹配时直接返回304，
+不执行视图、不查询数据、不序列化。
+
+浏览量不改变水位：文章详情不含浏览量，由 /api/posts/<id>/views 单独获取；
+列表里的浏览量只是参考，可能停留在上次文章/评论写入时的值；按浏览量排序的列表不参与条件请求。
+
+装饰器放在 `response_cache.cached` 外层：先判断304，未命中再查响应缓存。
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, make_response, current_app
+from sqlalchemy import select, func
+
+from app import db
+from app.utils.response_cache import normalized_key
+
+
+def table_marks(*models):
+    """
+    一次查询取出各表的 (行数, 最大updated_at)
+
+    行数用于感知删除，最大updated_at感知新增和修改；
+    用于发现绕过应用直接改库的修改（见测试技术资源快照）。
+    """
+    columns = []
+    for model in models:
+        columns.append(select(func.count()).select_from(model).scalar_subquery())
+        columns.append(select(func.max(model.updated_at)).scalar_subquery())
+    return tuple(db.session.execute(select(*columns)).one())
+
+
+def _as_utc(value):
+    """数据库里的时间统一按UTC处理（SQLite读出来不带时区）"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def last_modified_of(marks):
+    """水位中最新的时间，精确到秒（HTTP日期没有毫秒）"""
+    times = [_as_utc(v) for v in marks if isinstance(v, datetime)]
+    if not times:
+        return None
+    return max(times).replace(microsecond=0)
+
+
+def weak_etag(marks):
+    """URL（含规范化查询参数）+ 水位的摘要"""
+    raw = '|'.join([
+        normalized_key(request.path, request.args),
+        'auth' if 'Authorization' in request.headers else 'anon'
+    ] + [str(v) for v in marks])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def _cache_control(response):
+    if 'Authorization' in request.headers:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        max_age = current_app.config.get('HTTP_CACHE_MAX_AGE', 0)
+        shared_max_age = current_app.config.get('HTTP_CACHE_SHARED_MAX_AGE', 0)
+        # 浏览器每次都带ETag回来验证；反向代理（nginx proxy_cache）可按s-maxage缓存
+        response.headers['Cache-Control'] = (
+            f'public, max-age={max_age}, s-maxage={shared_max_age}, must-revalidate'
+        )
+    response.vary.add('Authorization')
+
+
+def _not_modified(etag, last_modified):
+    """RFC 7232：有If-None-Match时只比较ETag，否则才看If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(watermark, on_not_modified=None):
+    """
+    为GET接口加上ETag/Last-Modified，条件命中时返回304
+
+    Args:
+        watermark: 参数与视图相同，返回水位元组；返回None表示本次不做条件请求
+                   （如资源不存在，交给视图返回404）
+        on_not_modified: 返回304时的回调，参数与视图相同
+                         （例如文章详情仍需累加浏览量）
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return fn(*args, **kwargs)
+
+            marks = watermark(*args, **kwargs)
+            if marks is None:
+                return fn(*args, **kwargs)
+            etag = weak_etag(marks)
+            last_modified = last_modified_of(marks)
+
+            if _not_modified(etag, last_modified):
+                if on_not_modified is not None:
+                    on_not_modified(*args, **kwargs)
+                response = make_response('', 304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            _cache_control(response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+API日志策略
+
+决定一个请求要不要写原始日志、要不要记录请求/响应内容：
+- 排除路径（健康检查、静态文件）和方法（CORS预检）完全不记录
+- 按 (方法, 路由模板, 状态码) 匹配采样规则，例如5xx全部记录、成功的GET只记1%
+- 请求/响应内容默认只在出错时或白名单路由上记录
+- 请求体流式编码，达到长度上限即停止；响应体本身已是JSON文本，直接截取
+
+未被采样的请求仍计入预聚合统计，统计数据不受采样影响。
+"""
+
+import json
+import random
+from fnmatch import fnmatchcase
+
+
+def truncated_json(obj, limit):
+    """JSON编码到limit个字符为止，不编码超出部分"""
+    parts = []
+    size = 0
+    for chunk in json.JSONEncoder(ensure_ascii=False).iterencode(obj):
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return ''.join(parts)[:limit]
+
+
+def _status_matches(pattern, status_code):
+    if pattern in ('*', None):
+        return True
+    pattern = str(pattern)
+    if pattern.endswith('xx'):
+        return str(status_code // 100) == pattern[0]
+    return str(status_code) == pattern
+
+
+class LogPolicy:
+    """API日志采样与内容记录策略"""
+
+    def __init__(self):
+        self.exclude_paths = ()
+        self.exclude_methods = ()
+        self.rules = []
+        self.capture = 'errors'
+        self.capture_routes = ()
+        self.redact_fields = frozenset()
+        self.payload_limit = 1000
+        self._rates = {}
+
+    def init_app(self, app):
+        """读取配置"""
+        self.exclude_paths = tuple(app.config.get('API_LOG_EXCLUDE_PATHS', ()))
+        self.exclude_methods = tuple(m.upper() for m in app.config.get('API_LOG_EXCLUDE_METHODS', ()))
+        self.rules = list(app.config.get('API_LOG_SAMPLING', []))
+        self.capture = app.config.get('API_LOG_CAPTURE_PAYLOADS', 'errors')
+        self.capture_routes = tuple(app.config.get('API_LOG_CAPTURE_ROUTES', ()))
+        self.redact_fields = frozenset(f.lower() for f in app.config.get('API_LOG_REDACT_FIELDS', ()))
+        self.payload_limit = app.config.get('API_LOG_PAYLOAD_LIMIT', 1000)
+        self._rates = {}
+
+    def excluded(self, method, path):
+        """是否完全不记录"""
+        return method in self.exclude_methods or path.startswith(self.exclude_paths)
+
+    def sample_rate(self, method, route, status_code):
+        """按规则顺序匹配第一条，未匹配时全部记录；结果按键缓存"""
+        key = (method, route, status_code)
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = 1.0
+            for rule_method, rule_route, rule_status, rule_rate in self.rules:
+                if rule_method not in ('*', method):
+                    continue
+                if not fnmatchcase(route or '', rule_route):
+                    continue
+                if not _status_matches(rule_status, status_code):
+                    continue
+                rate = float(rule_rate)
+                break
+            self._rates[key] = rate
+        return rate
+
+    def sampled(self, method, route, status_code):
+        """本次请求是否写入原始日志"""
+        rate = self.sample_rate(method, route, status_code)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+    def capture_payload(self, route, status_code):
+        """是否记录请求/响应内容"""
+        if self.capture == 'all':
+            return True
+        if self.capture == 'errors' and status_code >= 400:
+            return True
+        return any(fnmatchcase(route or '', pattern) for pattern in self.capture_routes)
+
+    def _redact(self, obj):
+        if isinstance(obj, dict):
+            return {
+                key: '***' if str(key).lower() in self.redact_fields else self._redact(value)
+                for key, value in obj.items()
+            }
+        if isinstance(obj, list):
+            return [self._redact(value) for value in obj]
+        return obj
+
+    def request_payload(self, request):
+        """请求体（JSON），敏感字段打码后编码到长度上限"""
+        if not request.is_json:
+            return None
+        data = request.get_json(silent=True)
+        if data is None:
+            return None
+        if self.redact_fields:
+            data = self._redact(data)
+        return truncated_json(data, self.payload_limit)
+
+    def response_payload(self, response):
+        """响应体（JSON），直接截取已编码的文本"""
+        if not response.is_json or response.is_streamed:
+            return None
+        raw = response.get_data()
+        # UTF-8每个字符最多4字节，多取一些再按字符截断
+        return raw[:self.payload_limit * 4].decode('utf-8', 'ignore')[:self.payload_limit]
+
+
+log_policy = LogPolicy()
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+API日志保留与归档
+
+原始日志只保留 API_LOG_RETENTION_DAYS 天（统计数据在预聚合表里长期保留）。
+过期日志按id顺序分批读出，追加写入按月分文件的 gzip NDJSON 归档
+（每批一个gzip成员，`zcat` / `gzip.open` 可直接顺序读取），写盘后再分批删除，
+不会出现一次大事务锁住整张表的情况。
+
+MySQL 可用 `flask partition-api-logs` 把表改为按月 RANGE 分区，
+之后整月过期的分区归档后直接 DROP PARTITION；SQLite 等其他数据库使用分批删除。
+"""
+
+import os
+import json
+import gzip
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
+
+from app import db
+
+
+def _month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def _next_month(dt):
+    if dt.month == 12:
+        return datetime(dt.year + 1, 1, 1)
+    return datetime(dt.year, dt.month + 1, 1)
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class LogRetention:
+    """API日志过期清理"""
+
+    TABLE = 'api_logs'
+
+    def __init__(self):
+        self.retention_days = 30
+        self.archive_dir = None
+        self.chunk_size = 5000
+
+    def init_app(self, app):
+        """读取配置"""
+        self.retention_days = app.config.get('API_LOG_RETENTION_DAYS', 30)
+        self.archive_dir = app.config.get('API_LOG_ARCHIVE_DIR')
+        self.chunk_size = app.config.get('API_LOG_PURGE_CHUNK', 5000)
+
+    # ---------- 归档 ----------
+
+    def _archive_path(self, month):
+        return os.path.join(self.archive_dir, f'{self.TABLE}-{month}.ndjson.gz')
+
+    def _archive_chunk(self, rows):
+        """把一批日志按月份追加写入归档文件，返回写入的文件列表"""
+        by_month = {}
+        for row in rows:
+            month = row['created_at'].strftime('%Y-%m') if row['created_at'] else 'unknown'
+            by_month.setdefault(month, []).append(row)
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        paths = []
+        for month, month_rows in by_month.items():
+            path = self._archive_path(month)
+            # 追加一个新的gzip成员；中断重跑可能产生重复行，读取时按id去重即可
+            with gzip.open(path, 'ab') as f:
+                for row in month_rows:
+                    line = json.dumps({k: _serialize(v) for k, v in row.items()}, ensure_ascii=False)
+                    f.write(line.encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileobj.fileno())
+            paths.append(path)
+        return paths
+
+    # ---------- MySQL分区 ----------
+
+    def _is_mysql(self):
+        return db.engine.dialect.name in ('mysql', 'mariadb')
+
+    def partitions(self):
+        """
+        当前的月分区列表 [(分区名, 上界)]，上界为None表示MAXVALUE；
+        非MySQL或未分区时返回空列表
+        """
+        if not self._is_mysql():
+            return []
+        rows = db.session.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {'table': self.TABLE}).all()
+        result = []
+        for (name,) in rows:
+            if name == 'pmax':
+                result.append((name, None))
+            else:
+                # 分区 pYYYYMM 存放该月数据，上界为下月1日
+                result.append((name, _next_month(datetime.strptime(name[1:], '%Y%m'))))
+        return result
+
+    @staticmethod
+    def _partition_sql(month):
+        upper = _next_month(month).strftime('%Y-%m-%d')
+        return f"PARTITION p{month.strftime('%Y%m')} VALUES LESS THAN (TO_DAYS('{upper}'))"
+
+    def init_partitions(self, months_ahead=3):
+        """
+        把api_logs转换为按月RANGE分区（仅MySQL，一次性操作，会锁表重建）
+
+        MySQL分区表要求分区列包含在主键中，且不支持外键，
+        因此主键改为 (id, created_at) 并去掉 user_id 外键。
+        """
+        if not self._is_mysql():
+            raise RuntimeError('只有MySQL支持分区，其他数据库使用分批删除')
+        if self.partitions():
+            return False
+
+        first = db.session.execute(text(f'SELECT MIN(created_at) FROM {self.TABLE}')).scalar()
+        now = datetime.utcnow()
+        month = _month_start(first or now)
+        last = _month_start(now + timedelta(days=31 * months_ahead))
+        parts = []
+        while month <= last:
+            parts.append(self._partition_sql(month))
+            month = _next_month(month)
+        parts.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+
+        foreign_keys = db.session.execute(text(
+            "SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+            "AND REFERENCED_TABLE_NAME IS NOT NULL"
+        ), {'table': self.TABLE}).scalars().all()
+        for name in foreign_keys:
+            db.session.execute(text(f'ALTER TABLE {self.TABLE} DROP FOREIGN KEY `{name}`'))
+        db.session.execute(text(f'UPDATE {self.TABLE} SET created_at = NOW() WHERE created_at IS NULL'))
+        db.session.execute(text(
+            f'ALTER TABLE {self.TABLE} MODIFY created_at DATETIME NOT NULL, '
+            f'DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)'
+        ))
+        db.session.execute(text(
+            f'ALTER TABLE {self.TABLE} PARTITION BY RANGE (TO_DAYS(created_at)) ({", ".join(parts)})'
+        ))
+        db.session.commit()
+        return True
+
+    def ensure_partitions(self, months_ahead=3):
+        """提前创建未来几个月的分区，返回新建的分区数"""
+        partitions = self.partitions()
+        if not partitions:
+            return 0
+        bounded = [upper for _, upper in partitions if upper is not None]
+        month = max(bounded) if bounded else _month_start(datetime.utcnow())
+        last = _month_start(datetime.utcnow() + timedelta(days=31 * months_ahead))
+        parts = []
+        while month <= last:
+            parts.append(self._partition_sql(month))
+            month = _next_month(month)
+        if not parts:
+            return 0
+        parts.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+        db.session.execute(text(
+            f'ALTER TABLE {self.TABLE} REORGANIZE PARTITION pmax INTO ({", ".join(parts)})'
+        ))
+        db.session.commit()
+        return len(parts) - 1
+
+    # ---------- 清理 ----------
+
+    def purge(self, days=None, archive=True, dry_run=False, echo=None):
+        """
+        归档并删除过期日志
+
+        Args:
+            days: 保留天数，默认取配置
+            archive: 删除前是否写入归档文件
+            dry_run: 只统计，不写文件、不删除
+            echo: 进度输出函数
+
+        Returns:
+            统计字典
+        """
+        from app.models import APILog
+
+        table = APILog.__table__
+        days = self.retention_days if days is None else days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        if archive and not self.archive_dir:
+            raise RuntimeError('未配置 API_LOG_ARCHIVE_DIR，可使用 --no-archive 直接删除')
+
+        # 整月都已过期的分区直接DROP，其余行分批删除
+        droppable = [(name, upper) for name, upper in self.partitions()
+                     if upper is not None and upper <= cutoff]
+        drop_before = max((upper for _, upper in droppable), default=None)
+
+        result = {'cutoff': cutoff.isoformat(), 'archived': 0, 'deleted': 0,
+                  'dropped_partitions': [], 'files': set()}
+        if dry_run:
+            result['expired'] = db.session.query(APILog.id).filter(APILog.created_at < cutoff).count()
+            result['dropped_partitions'] = [name for name, _ in droppable]
+            result['files'] = []
+            return result
+
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table).where(table.c.created_at < cutoff, table.c.id > last_id)
+                .order_by(table.c.id).limit(self.chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            if archive:
+                result['files'].update(self._archive_chunk(rows))
+                result['archived'] += len(rows)
+
+            ids = [row['id'] for row in rows
+                   if drop_before is None or row['created_at'] >= drop_before]
+            if ids:
+                result['deleted'] += db.session.execute(
+                    table.delete().where(table.c.id.in_(ids))
+                ).rowcount
+            # 每批单独提交，缩短锁持有时间
+            db.session.commit()
+            if echo:
+                echo(f'已处理到 id={last_id}，归档 {result["archived"]} 条，删除 {result["deleted"]} 条')
+
+        for name, _ in droppable:
+            db.session.execute(text(f'ALTER TABLE {self.TABLE} DROP PARTITION {name}'))
+            result['dropped_partitions'].append(name)
+        db.session.commit()
+
+        self.ensure_partitions()
+        result['files'] = sorted(result['files'])
+        return result
+
+
+log_retention = LogRetention()
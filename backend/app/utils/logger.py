@@ -1,70 +1,264 @@
 # -*- coding: utf-8 -*-
 """
 日志工具模块
+
+请求线程只负责把日志记录放进有界队列，由后台写入线程批量插入数据库，
+日志写入不再占用请求耗时，也不再和业务请求共用同一个数据库会话。
+每批日志写入后同时累加到预聚合表（见 app.utils.rollup）。
+哪些请求写原始日志、是否记录请求/响应内容由 app.utils.log_policy 决定。
 """
 
+import os
 import time
-import json
+import queue
+import atexit
+import threading
+from datetime import datetime
+
 from flask import request, g
 from app.models.log import APILog
+from app.utils.rollup import log_rollup
+from app.utils.log_policy import log_policy
+from app.utils.sql_profiler import sql_profiler
 from app import db
 
+# 只用于预聚合、不写入原始日志表的字段
+_ROLLUP_ONLY_FIELDS = ('route', 'sampled')
+
+# 放进队列唤醒写入线程，让它立即发现停止信号
+_WAKEUP = object()
+
+
+class APILogWriter:
+    """API日志后台批量写入器"""
+
+    def __init__(self):
+        self.app = None
+        self.async_mode = True
+        self.batch_size = 200
+        self.flush_interval = 1.0
+        self._queue = queue.Queue(maxsize=10000)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+        # 统计计数
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def init_app(self, app):
+        """读取配置并绑定应用"""
+        self.app = app
+        self.async_mode = app.config.get('API_LOG_ASYNC', True)
+        self.batch_size = app.config.get('API_LOG_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('API_LOG_FLUSH_INTERVAL', 1.0)
+        self._queue = queue.Queue(maxsize=app.config.get('API_LOG_QUEUE_SIZE', 10000))
+        self._stopping.clear()
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def _count(self, name, n=1):
+        """累加统计计数（请求线程和写入线程并发调用）"""
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def enqueue(self, record):
+        """放入一条日志记录，队列已满时直接丢弃并计数"""
+        if not self.async_mode:
+            self._write([record])
+            return True
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _ensure_worker(self):
+        """按进程启动写入线程（gunicorn fork之后线程不会被继承）"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='api-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """写入线程主循环：攒够batch_size条或超过flush_interval秒就写一次"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is not _WAKEUP:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+            if self._stopping.is_set() and self._queue.empty():
+                if batch:
+                    self._write(batch)
+                return
+
+    def _write(self, batch):
+        """使用executemany批量插入，并更新预聚合统计"""
+        # 未被采样的请求只计入预聚合统计
+        rows = [
+            {key: value for key, value in record.items() if key not in _ROLLUP_ONLY_FIELDS}
+            for record in batch if record.get('sampled', True)
+        ]
+        try:
+            with self.app.app_context():
+                if rows:
+                    with db.engine.begin() as conn:
+                        conn.execute(APILog.__table__.insert(), rows)
+                self._count('written', len(rows))
+                self._count('batches')
+                log_rollup.record(batch)
+        except Exception as e:
+            # 日志写入失败不影响正常请求
+            self._count('failed', len(batch))
+            print(f"日志记录失败: {e}")
+
+    def flush(self):
+        """同步写出队列中剩余的记录"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _WAKEUP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def shutdown(self, timeout=5.0):
+        """进程退出时停止写入线程并写出剩余记录"""
+        if self.app is None:
+            return
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self._queue.put_nowait(_WAKEUP)
+            except queue.Full:
+                # 队列满说明写入线程正忙，不会阻塞在等待上
+                pass
+            thread.join(timeout)
+            if thread.is_alive():
+                # 写入线程仍在写，它会在退出前写完队列；这里再取就成了两个消费者并发写
+                print(f"日志写入线程 {timeout} 秒内未退出，剩余 {self._queue.qsize()} 条由其继续写入")
+                return
+        self.flush()
+
+    def stats(self):
+        """写入器运行统计"""
+        return {
+            'queue_size': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches
+        }
+
+
+log_writer = APILogWriter()
+
 
 class APILogger:
     """API日志记录器"""
-    
+
+    @staticmethod
+    def init_app(app):
+        """注册请求钩子并初始化后台写入器"""
+        log_writer.init_app(app)
+        log_rollup.init_app(app)
+        log_policy.init_app(app)
+        app.before_request(APILogger.before_request)
+        app.after_request(APILogger.after_request)
+
     @staticmethod
     def before_request():
         """请求前处理"""
         g.start_time = time.time()
-    
+
     @staticmethod
     def after_request(response):
         """请求后处理"""
         try:
+            if log_policy.excluded(request.method, request.path):
+                return response
+
             # 计算响应时间
             response_time = time.time() - g.get('start_time', time.time())
-            
-            # 获取当前用户ID
-            user_id = None
-            if hasattr(g, 'user_id'):
-                user_id = g.user_id
-            
-            # 获取请求数据
-            request_data = None
-            if request.is_json:
-                try:
-                    request_data = json.dumps(request.get_json(), ensure_ascii=False)
-                except:
-                    pass
-            
-            # 获取响应数据
-            response_data = None
-            if response.is_json:
-                try:
-                    response_data = json.dumps(response.get_json(), ensure_ascii=False)
-                except:
-                    pass
-            
-            # 创建日志记录
-            log = APILog(
-                method=request.method,
-                path=request.path,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string if request.user_agent else None,
-                user_id=user_id,
-                status_code=response.status_code,
-                response_time=round(response_time, 4),
-                request_data=request_data[:1000] if request_data else None,  # 限制长度
-                response_data=response_data[:1000] if response_data else None
-            )
-            
-            db.session.add(log)
-            db.session.commit()
-            
+            route = request.url_rule.rule if request.url_rule else None
+            status_code = response.status_code
+
+            # 预聚合统计需要的字段，每个请求都记录
+            record = {
+                'method': request.method,
+                'route': route,
+                'status_code': status_code,
+                'response_time': round(response_time, 4),
+                'created_at': datetime.utcnow(),
+                'sampled': log_policy.sampled(request.method, route, status_code)
+            }
+
+            if record['sampled']:
+                # 获取当前用户ID
+                user_id = None
+                if hasattr(g, 'user_id'):
+                    user_id = g.user_id
+
+                # 请求/响应内容只在出错或白名单路由时记录
+                request_data = response_data = None
+                if log_policy.capture_payload(route, status_code):
+                    request_data = log_policy.request_payload(request)
+                    response_data = log_policy.response_payload(response)
+
+                user_agent = request.user_agent.string if request.user_agent else None
+                sql_stats = sql_profiler.current()
+                record.update({
+                    'db_query_count': sql_stats.count if sql_stats else None,
+                    'db_time': round(sql_stats.duration, 4) if sql_stats else None,
+                    'path': request.path,
+                    'ip_address': request.remote_addr,
+                    'user_agent': user_agent[:500] if user_agent else None,
+                    'user_id': user_id,
+                    'request_data': request_data,
+                    'response_data': response_data
+                })
+
+            # 交给后台线程写入
+            log_writer.enqueue(record)
+
         except Exception as e:
             # 日志记录失败不影响正常请求
-            db.session.rollback()
             print(f"日志记录失败: {e}")
-        
+
         return response
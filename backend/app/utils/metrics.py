@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标（Prometheus文本格式）
+
+进程内的计数器、仪表和固定分桶直方图，/metrics 输出 Prometheus 文本格式，
+容量规划不必再对 api_logs 跑SQL。
+
+多worker部署时设置 METRICS_DIR：每个worker把数值写进自己的内存映射文件
+（<METRICS_DIR>/<pid>.db），抓取时由处理请求的那个worker读取目录下全部文件汇总：
+- 计数器、直方图累加所有文件，worker重启后已退出进程的计数仍然保留；
+- 仪表和从缓存统计同步来的计数只汇总存活进程，避免已退出worker的旧值残留。
+目录需在启动worker前清空（Dockerfile已处理）。未设置 METRICS_DIR 时只统计当前进程。
+
+请求级指标在 after_request 中记录；缓存命中、队列长度等读取各组件的 stats()，
+每个worker最多每 METRICS_SAMPLE_INTERVAL 秒同步一次，抓取时当前worker再同步一次。
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import threading
+
+from flask import Response, g, request
+
+from app.utils.sql_profiler import sql_profiler
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HEADER = struct.Struct('<Q')
+_KEY_LEN = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+def _encode_entry(key):
+    """条目布局：键长(4字节) + 键 + 补齐到8字节对齐 + 数值(8字节)，返回 (条目前缀, 数值偏移)"""
+    data = key.encode('utf-8')
+    head = _KEY_LEN.pack(len(data)) + data
+    head += b' ' * (-len(head) % 8)
+    return head, len(head)
+
+
+def _read_entries(data):
+    """解析一个数据文件的内容，返回 [(键, 数值, 数值偏移)]"""
+    if len(data) < _HEADER.size:
+        return []
+    used = _HEADER.unpack_from(data, 0)[0]
+    pos = _HEADER.size
+    entries = []
+    while pos < used:
+        length = _KEY_LEN.unpack_from(data, pos)[0]
+        key = data[pos + 4:pos + 4 + length].decode('utf-8')
+        value_pos = pos + 4 + length
+        value_pos += -value_pos % 8
+        entries.append((key, _VALUE.unpack_from(data, value_pos)[0], value_pos))
+        pos = value_pos + _VALUE.size
+    return entries
+
+
+class DictStore:
+    """单进程存储"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = float(value)
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class MmapStore:
+    """单个worker的内存映射数据文件，只有本进程写入"""
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self.INITIAL_SIZE:
+            self._file.truncate(self.INITIAL_SIZE)
+            size = self.INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0]
+        if self._used == 0:
+            # 新文件（或同pid的旧文件被清空过）
+            self._used = _HEADER.size
+            _HEADER.pack_into(self._map, 0, self._used)
+        self._positions = {key: pos for key, _, pos in _read_entries(self._map)}
+
+    def _position(self, key):
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+        head, offset = _encode_entry(key)
+        needed = self._used + len(head) + _VALUE.size
+        if needed > len(self._map):
+            capacity = len(self._map)
+            while capacity < needed:
+                capacity *= 2
+            self._map.close()
+            self._file.truncate(capacity)
+            self._map = mmap.mmap(self._file.fileno(), capacity)
+        # 先写键和初始值，最后更新已用长度，读取方不会看到写了一半的条目
+        self._map[self._used:self._used + len(head)] = head
+        pos = self._used + offset
+        _VALUE.pack_into(self._map, pos, 0.0)
+        self._used = needed
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = pos
+        return pos
+
+    def inc(self, key, amount):
+        with self._lock:
+            pos = self._position(key)
+            _VALUE.pack_into(self._map, pos, _VALUE.unpack_from(self._map, pos)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            _VALUE.pack_into(self._map, self._position(key), float(value))
+
+    def items(self):
+        with self._lock:
+            return [(key, value) for key, value, _ in _read_entries(self._map)]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """指标基类：按标签值缓存子项，子项记住自己的存储键"""
+
+    type = None
+    # 多进程汇总方式：all 累加所有进程文件，live 只汇总存活进程
+    mode = 'all'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} 需要标签 {self.labelnames}')
+            child = self._children[values] = self._child(list(zip(self.labelnames, values)))
+        return child
+
+    def _key(self, sample, labels):
+        return json.dumps([sample, labels], ensure_ascii=False, separators=(',', ':'))
+
+    def _child(self, labels):
+        raise NotImplementedError
+
+
+class _ValueChild:
+    def __init__(self, registry, key):
+        self._registry = registry
+        self._key = key
+
+    def inc(self, amount=1):
+        self._registry.store().inc(self._key, amount)
+
+    def set(self, value):
+        self._registry.store().set(self._key, value)
+
+
+class Counter(_Metric):
+    """计数器；live=True 用于同步组件自带的进程内计数（用 set 写入当前总数）"""
+
+    type = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames=(), live=False):
+        super().__init__(registry, name, documentation, labelnames)
+        if live:
+            self.mode = 'live'
+
+    def _child(self, labels):
+        return _ValueChild(self.registry, self._key(self.name, labels))
+
+
+class Gauge(_Metric):
+    """仪表（当前值），多进程时汇总存活worker"""
+
+    type = 'gauge'
+    mode = 'live'
+
+    def _child(self, labels):
+        return _ValueChild(self.registry, self._key(self.name, labels))
+
+
+class _HistogramChild:
+    def __init__(self, registry, metric, labels):
+        self._registry = registry
+        self._buckets = metric.buckets
+        # 各桶只记落在本桶的次数，输出时再累加成Prometheus要求的累计值
+        self._bucket_keys = [
+            metric._key(metric.name + '_bucket', labels + [('le', _format_value(b))])
+            for b in self._buckets + (float('inf'),)
+        ]
+        self._sum_key = metric._key(metric.name + '_sum', labels)
+        self._count_key = metric._key(metric.name + '_count', labels)
+
+    def observe(self, value):
+        index = len(self._buckets)
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                index = i
+                break
+        store = self._registry.store()
+        store.inc(self._bucket_keys[index], 1)
+        store.inc(self._sum_key, value)
+        store.inc(self._count_key, 1)
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(float(b) for b in buckets)
+
+    def _child(self, labels):
+        return _HistogramChild(self.registry, self, labels)
+
+
+class MetricsRegistry:
+    """指标注册表与 /metrics 接口"""
+
+    def __init__(self):
+        self.enabled = True
+        self.directory = None
+        self.sample_interval = 5.0
+        self.token = None
+        self._metrics = {}
+        self._collectors = []
+        self._store = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._sampled_at = 0.0
+
+    def init_app(self, app):
+        """读取配置，注册请求钩子和 /metrics 路由"""
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.directory = app.config.get('METRICS_DIR')
+        self.sample_interval = app.config.get('METRICS_SAMPLE_INTERVAL', 5.0)
+        self.token = app.config.get('METRICS_TOKEN')
+        self._store = None
+        if not self.enabled:
+            return
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', metrics_view)
+
+    # ---- 定义指标 ----
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'指标 {metric.name} 已存在')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), live=False):
+        return self._register(Counter(self, name, documentation, labelnames, live=live))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def collector(self, func):
+        """注册同步函数，采样时调用，用于把组件的 stats() 写进指标"""
+        self._collectors.append(func)
+        return func
+
+    # ---- 存储 ----
+
+    def store(self):
+        """当前进程的存储；fork出的子进程换用自己的文件"""
+        pid = os.getpid()
+        if self._store is None or self._pid != pid:
+            with self._lock:
+                if self._store is None or self._pid != pid:
+                    if self.directory:
+                        self._store = MmapStore(os.path.join(self.directory, f'{pid}.db'))
+                    else:
+                        self._store = DictStore()
+                    self._pid = pid
+        return self._store
+
+    def sample(self, force=False):
+        """调用各同步函数，未到采样间隔时跳过"""
+        now = time.monotonic()
+        if not force and now - self._sampled_at < self.sample_interval:
+            return
+        self._sampled_at = now
+        for func in self._collectors:
+            try:
+                func()
+            except Exception as e:
+                print(f"指标采样失败 {func.__name__}: {e}")
+
+    def _sources(self):
+        """[(是否存活, [(键, 数值)])]"""
+        if not self.directory:
+            return [(True, self.store().items())]
+        self.store()
+        sources = []
+        for filename in os.listdir(self.directory):
+            name, ext = os.path.splitext(filename)
+            if ext != '.db' or not name.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            pid = int(name)
+            alive = pid == os.getpid() or _pid_alive(pid)
+            sources.append((alive, [(key, value) for key, value, _ in _read_entries(data)]))
+        return sources
+
+    def collect(self):
+        """汇总所有进程的数值：{指标名: {(样本名, 标签): 数值}}"""
+        totals = {}
+        for alive, items in self._sources():
+            for key, value in items:
+                sample, labels = json.loads(key)
+                metric = self._sample_metric(sample)
+                if metric is None or (metric.mode == 'live' and not alive):
+                    continue
+                samples = totals.setdefault(metric.name, {})
+                labels = tuple(tuple(pair) for pair in labels)
+                samples[(sample, labels)] = samples.get((sample, labels), 0.0) + value
+        return totals
+
+    def _sample_metric(self, sample):
+        metric = self._metrics.get(sample)
+        if metric is None:
+            for suffix in ('_bucket', '_sum', '_count'):
+                if sample.endswith(suffix):
+                    metric = self._metrics.get(sample[:-len(suffix)])
+                    break
+        return metric
+
+    def render(self):
+        """生成Prometheus文本格式"""
+        totals = self.collect()
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            samples = totals.get(name)
+            if not samples:
+                continue
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            if metric.type == 'histogram':
+                lines.extend(_render_histogram(metric, samples))
+            else:
+                for (sample, labels), value in sorted(samples.items()):
+                    lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(metric, samples):
+    """桶计数累加成累计值，按标签组输出全部 _bucket 以及 _sum/_count"""
+    name = metric.name
+    groups = {}
+    for (sample, labels), value in samples.items():
+        if sample == name + '_bucket':
+            base = tuple(pair for pair in labels if pair[0] != 'le')
+            bound = float(dict(labels)['le'])
+            groups.setdefault(base, {}).setdefault('buckets', {})[bound] = value
+        else:
+            groups.setdefault(labels, {})[sample[len(name) + 1:]] = value
+
+    lines = []
+    for base in sorted(groups):
+        group = groups[base]
+        buckets = group.get('buckets', {})
+        cumulative = 0.0
+        for bound in metric.buckets + (float('inf'),):
+            cumulative += buckets.get(bound, 0.0)
+            labels = base + (('le', _format_value(bound)),)
+            lines.append(f'{name}_bucket{_format_labels(labels)} {_format_value(cumulative)}')
+        lines.append(f'{name}_sum{_format_labels(base)} {_format_value(group.get("sum", 0.0))}')
+        lines.append(f'{name}_count{_format_labels(base)} {_format_value(group.get("count", 0.0))}')
+    return lines
+
+
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter(
+    'http_requests_total', 'HTTP请求数', ('endpoint', 'method', 'status'))
+REQUEST_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', 'HTTP请求处理耗时', ('endpoint', 'method', 'status_class'))
+REQUEST_DB_TIME = metrics.histogram(
+    'http_request_db_seconds', '单个请求的SQL总耗时', ('endpoint',))
+REQUEST_DB_QUERIES = metrics.histogram(
+    'http_request_db_queries', '单个请求执行的SQL条数', ('endpoint',), buckets=QUERY_COUNT_BUCKETS)
+CACHE_HITS = metrics.counter(
+    'cache_hits_total', '进程内缓存命中次数', ('cache',), live=True)
+CACHE_MISSES = metrics.counter(
+    'cache_misses_total', '进程内缓存未命中（重建）次数', ('cache',), live=True)
+API_LOG_QUEUE = metrics.gauge(
+    'api_log_queue_size', 'API日志写入队列中等待的记录数')
+API_LOG_DROPPED = metrics.counter(
+    'api_log_dropped_total', '队列满被丢弃的API日志数', live=True)
+VIEW_COUNT_PENDING = metrics.gauge(
+    'view_count_pending', '尚未落库的浏览量')
+
+
+@metrics.collector
+def _sample_components():
+    from app.utils.archives import archive_cache
+    from app.utils.auth import token_versions
+    from app.utils.catalog import catalog_cache
+    from app.utils.logger import log_writer
+    from app.utils.render import renderer
+    from app.utils.response_cache import response_cache
+    from app.utils.tech_resources import tech_resource_cache
+    from app.utils.view_counter import view_counter
+
+    caches = {
+        'response': (response_cache.hits, response_cache.misses),
+        'catalog': (catalog_cache.hits, catalog_cache.misses),
+        'archives': (archive_cache.hits, archive_cache.misses),
+        'tech_resources': (tech_resource_cache.hits, tech_resource_cache.misses),
+        'markdown': (renderer.hits + renderer.disk_hits, renderer.misses),
+        'token_versions': (token_versions.hits, token_versions.misses),
+    }
+    for name, (hits, misses) in caches.items():
+        CACHE_HITS.labels(name).set(hits)
+        CACHE_MISSES.labels(name).set(misses)
+
+    writer = log_writer.stats()
+    API_LOG_QUEUE.labels().set(writer['queue_size'])
+    API_LOG_DROPPED.labels().set(writer['dropped'])
+    VIEW_COUNT_PENDING.labels().set(view_counter.stats()['pending_views'])
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    """记录请求数、耗时和SQL统计"""
+    start = g.pop('_metrics_start', None)
+    if start is None or request.endpoint == 'metrics':
+        return response
+    try:
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'none'
+        status = response.status_code
+        REQUESTS.labels(endpoint, request.method, status).inc()
+        REQUEST_LATENCY.labels(endpoint, request.method, f'{status // 100}xx').observe(elapsed)
+        sql_stats = sql_profiler.current()
+        if sql_stats is not None:
+            REQUEST_DB_TIME.labels(endpoint).observe(sql_stats.duration)
+            REQUEST_DB_QUERIES.labels(endpoint).observe(sql_stats.count)
+        metrics.sample()
+    except Exception as e:
+        # 指标记录失败不影响正常请求
+        print(f"指标记录失败: {e}")
+    return response
+
+
+def metrics_view():
+    """Prometheus抓取接口；配置了 METRICS_TOKEN 时需带 Bearer Token"""
+    if metrics.token and request.headers.get('Authorization') != f'Bearer {metrics.token}':
+        return {'code': 401, 'msg': '未授权', 'data': None}, 401
+    metrics.sample(force=True)
+    return Response(metrics.render(), mimetype=None, content_type=CONTENT_TYPE)
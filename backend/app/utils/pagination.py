@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+分页工具
+
+默认仍是页码分页（OFFSET + COUNT）；请求带上 `cursor` 参数时切换为游标分页：
+游标是 (排序字段值, id) 的不透明编码，下一页用
+`(sort < v) OR (sort = v AND id < id_v)` 这样的条件在索引上定位，
+翻到多深都只读一页的数据。`with_total=false` 可省去 COUNT(*)。
+每页数量上限 MAX_PER_PAGE，防止一次请求拉取整张表。
+
+    GET /api/posts?cursor=              第一页
+    GET /api/posts?cursor=<next_cursor> 下一页
+"""
+
+import json
+import base64
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import and_, or_
+
+
+MAX_PER_PAGE = 100
+
+class CursorError(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(values):
+    """把排序键编码为URL安全的字符串"""
+    encoded = []
+    for value in values:
+        if isinstance(value, datetime):
+            encoded.append({'dt': value.isoformat()})
+        else:
+            encoded.append(value)
+    raw = json.dumps(encoded, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，失败时抛出CursorError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        decoded = []
+        for value in values:
+            if isinstance(value, dict):
+                decoded.append(datetime.fromisoformat(value['dt']))
+            else:
+                decoded.append(value)
+        if len(decoded) != 2:
+            raise ValueError('cursor length')
+        return decoded
+    except Exception as e:
+        raise CursorError(str(e))
+
+
+def _flag(name, default=True):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no')
+
+
+def use_cursor():
+    """本次请求是否使用游标分页"""
+    return 'cursor' in request.args
+
+
+def paginate(query, sort_column, id_column, descending=True, default_per_page=20):
+    """
+    按请求参数分页，返回 (当前页对象列表, 分页信息字典)
+
+    Args:
+        query: 已加好过滤条件、尚未排序的查询
+        sort_column: 排序字段
+        id_column: 主键字段，排序字段相同时用于确定顺序
+        descending: 是否倒序
+        default_per_page: 默认每页数量
+    """
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    if per_page < 1:
+        per_page = default_per_page
+    per_page = min(per_page, MAX_PER_PAGE)
+    with_total = _flag('with_total')
+
+    if not use_cursor():
+        page = request.args.get('page', 1, type=int)
+        order = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+        pagination = query.order_by(*order).paginate(
+            page=page, per_page=per_page, error_out=False, count=with_total
+        )
+        return pagination.items, {
+            'total': pagination.total,
+            'pages': pagination.pages if with_total else None,
+            'current_page': page
+        }
+
+    meta = {}
+    if with_total:
+        meta['total'] = query.order_by(None).count()
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                sort_column < last_value,
+                and_(sort_column == last_value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, id_column > last_id)
+            ))
+
+    order = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, sort_column.key), getattr(last, id_column.key)])
+
+    meta.update({'next_cursor': next_cursor, 'has_more': has_more})
+    return items, meta
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown渲染服务
+
+Markdown → HTML（Pygments代码高亮）→ bleach清洗 是应用里最耗CPU的操作，
+这里统一渲染配置，并按内容哈希缓存渲染结果：
+- 内存LRU（进程内）
+- 可选磁盘缓存（MARKDOWN_CACHE_DIR，多个worker共享）
+
+缓存键包含渲染配置版本（扩展列表、标签/属性白名单、依赖库版本），
+修改白名单或扩展后旧缓存自然失效。
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+# 渲染配置
+PROFILES = {
+    # 文章正文
+    'post': {
+        'extensions': ['extra', 'codehilite'],
+        'tags': ['p', 'br', 'strong', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                 'ul', 'ol', 'li', 'blockquote', 'code', 'pre', 'a', 'img'],
+        'attributes': {'a': ['href', 'title'], 'img': ['src', 'alt', 'title']}
+    },
+    # 评论
+    'comment': {
+        'extensions': ['extra'],
+        'tags': ['p', 'br', 'strong', 'em', 'u', 'code', 'pre', 'a'],
+        'attributes': {'a': ['href', 'title']}
+    }
+}
+
+
+def _profile_version(profile):
+    """渲染配置指纹，任何影响输出的配置变化都会改变它"""
+    import markdown
+    import bleach
+
+    config = dict(PROFILES[profile])
+    config['markdown'] = markdown.__version__
+    config['bleach'] = bleach.__version__
+    try:
+        import pygments
+        config['pygments'] = pygments.__version__
+    except ImportError:
+        config['pygments'] = None
+    raw = json.dumps(config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def _render(content, profile):
+    """实际执行渲染（不走缓存）"""
+    from markdown import markdown
+    import bleach
+
+    config = PROFILES[profile]
+    html = markdown(content, extensions=config['extensions'])
+    return bleach.clean(html, tags=config['tags'], attributes=config['attributes'])
+
+
+class MarkdownRenderer:
+    """带缓存的Markdown渲染器"""
+
+    def __init__(self, maxsize=1024, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = {}
+        # 统计计数
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """读取缓存配置"""
+        self.maxsize = app.config.get('MARKDOWN_CACHE_SIZE', 1024)
+        self.cache_dir = app.config.get('MARKDOWN_CACHE_DIR')
+
+    def version(self, profile):
+        if profile not in self._versions:
+            self._versions[profile] = _profile_version(profile)
+        return self._versions[profile]
+
+    def cache_key(self, content, profile):
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return f'{profile}-{self.version(profile)}-{digest}'
+
+    def _disk_path(self, key):
+        profile, version, digest = key.split('-')
+        return os.path.join(self.cache_dir, f'{profile}-{version}', digest[:2], digest + '.html')
+
+    def _disk_get(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _disk_set(self, key, html):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再原子替换，避免并发worker读到半个文件
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Markdown缓存写入失败: {e}")
+
+    def _memory_set(self, key, html):
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def render(self, content, profile='post'):
+        """渲染Markdown，命中缓存时直接返回"""
+        if not content:
+            return ''
+        key = self.cache_key(content, profile)
+
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return html
+
+        html = self._disk_get(key)
+        if html is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            html = _render(content, profile)
+            self._disk_set(key, html)
+        self._memory_set(key, html)
+        return html
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """缓存统计"""
+        return {
+            'size': len(self._cache),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses
+        }
+
+
+def _render_post(content):
+    """进程池工作函数（需为模块级函数才能被pickle）"""
+    return _render(content or '', 'post')
+
+
+def render_many(contents, pool, workers=1):
+    """
+    使用进程池并行渲染一批文章正文，结果顺序与输入一致
+    
+    Args:
+        contents: Markdown文本列表
+        pool: concurrent.futures.ProcessPoolExecutor
+        workers: 进程池大小，用于计算每次派发给子进程的任务数
+    """
+    chunksize = max(1, len(contents) // (workers * 4))
+    return list(pool.map(_render_post, contents, chunksize=chunksize))
+
+
+renderer = MarkdownRenderer()
+
+
+def render_markdown(content, profile='post'):
+    """渲染Markdown为安全的HTML"""
+    return renderer.render(content, profile)
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+公开接口响应缓存
+
+匿名GET请求按「路径 + 规范化后的查询参数」缓存整个JSON响应，命中时不访问数据库。
+每个缓存条目带若干标签（posts / categories / tags / tech），写接口提交后
+调用 `response_cache.invalidate(...)` 让对应标签的版本号加一，
+条目读取时发现所属标签版本变化即视为失效（不需要逐个删除键）。
+标签版本号存放在共享版本号（app.utils.generations）里，失效对所有worker立即可见。
+
+缓存后端可替换：
+- memory：进程内LRU（默认）
+- disk：目录共享，过期文件定期清理，文件数不超过 RESPONSE_CACHE_SIZE
+- redis：任何兼容Redis协议的服务（需安装redis包），多机部署共享
+- null：不缓存
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+from functools import wraps
+from collections import OrderedDict
+
+from flask import request, make_response, g
+
+from app.utils.generations import generations
+
+
+class CacheEntry:
+    """缓存条目：响应内容 + 写入时各标签的版本号"""
+
+    __slots__ = ('body', 'status', 'mimetype', 'tag_versions', 'meta')
+
+    def __init__(self, body, status, mimetype, tag_versions, meta):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.tag_versions = tag_versions
+        self.meta = meta
+
+
+class NullBackend:
+    """不缓存"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryBackend(NullBackend):
+    """进程内LRU"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DiskBackend(NullBackend):
+    """
+    目录缓存，多个worker共享同一目录
+
+    文件的修改时间设为条目的过期时间：读到过期条目时直接删除，
+    写入时每隔 sweep_interval 秒清理一次目录，删掉已过期的文件，
+    剩余文件超过 maxsize 时按过期时间从早到晚删除，目录大小有上限。
+    """
+
+    def __init__(self, directory, maxsize=1024, sweep_interval=60):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+        self._swept_at = 0.0
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _write(self, path, data, expires_at):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.utime(tmp, (expires_at, expires_at))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            # 其他worker可能已经删掉
+            pass
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value, expires_at = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at < time.time():
+            self._remove(path)
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        expires_at = time.time() + ttl
+        try:
+            self._write(self._path(key), pickle.dumps((value, expires_at)), expires_at)
+        except OSError as e:
+            print(f"响应缓存写入失败: {e}")
+        self._maybe_sweep()
+
+    def _entries(self):
+        """[(过期时间, 路径)]"""
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        return entries
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._swept_at < self.sweep_interval or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._swept_at = now
+            self.sweep()
+        except OSError as e:
+            print(f"响应缓存清理失败: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self):
+        """删除过期文件（含写入中断留下的临时文件），超出上限时再删最早过期的，返回删除数"""
+        now = time.time()
+        live = []
+        removed = 0
+        for expires_at, path in self._entries():
+            # 临时文件的修改时间是创建时间，留一个周期给正在写入的worker
+            if path.endswith('.tmp'):
+                expires_at += self.sweep_interval
+            if expires_at < now:
+                self._remove(path)
+                removed += 1
+            elif not path.endswith('.tmp'):
+                live.append((expires_at, path))
+        if len(live) > self.maxsize:
+            live.sort()
+            for expires_at, path in live[:len(live) - self.maxsize]:
+                self._remove(path)
+                removed += 1
+        return removed
+
+    def clear(self):
+        for expires_at, path in self._entries():
+            self._remove(path)
+
+
+class RedisBackend(NullBackend):
+    """兼容Redis协议的缓存服务"""
+
+    def __init__(self, url, prefix='resp:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def _generation_names(tags):
+    """标签在共享版本号里的名字，与其他缓存的名字区分开"""
+    return tuple(f'response.{tag}' for tag in tags)
+
+
+def normalized_key(path, args):
+    """路径 + 排序后的非空查询参数"""
+    items = sorted((k, v) for k, values in args.lists() for v in values if v != '')
+    query = '&'.join(f'{k}={v}' for k, v in items)
+    return f'{path}?{query}' if query else path
+
+
+class ResponseCache:
+    """公开接口响应缓存"""
+
+    def __init__(self):
+        self.backend = NullBackend()
+        self.default_ttl = 60
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        """按配置创建缓存后端"""
+        name = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+        self.default_ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+        if name == 'memory':
+            self.backend = MemoryBackend(app.config.get('RESPONSE_CACHE_SIZE', 1024))
+        elif name == 'disk':
+            self.backend = DiskBackend(app.config['RESPONSE_CACHE_DIR'],
+                                       maxsize=app.config.get('RESPONSE_CACHE_SIZE', 1024))
+        elif name == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_URL'])
+        elif name in ('null', 'none', None):
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f'未知的响应缓存后端: {name}')
+
+    def invalidate(self, *tags):
+        """使带有这些标签的缓存条目全部失效"""
+        generations.bump(*_generation_names(tags))
+        self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def marks(self, *tags):
+        """条件请求水位：各标签的共享版本号，写接口失效缓存时随之变化，读取不查库"""
+        return generations.marks(*_generation_names(tags))
+
+    def cached(self, tags, ttl=None, on_hit=None):
+        """
+        缓存匿名GET请求的200响应
+
+        Args:
+            tags: 条目所属标签，任一标签失效即失效
+            ttl: 过期秒数，默认取 RESPONSE_CACHE_TTL
+            on_hit: 命中缓存时的回调，参数为视图写入 g.cache_meta 的数据
+                    （例如文章详情命中缓存时仍需累加浏览量）
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                # 带Token的请求可能看到不同内容，不走缓存
+                if request.method != 'GET' or 'Authorization' in request.headers:
+                    return fn(*args, **kwargs)
+
+                key = normalized_key(request.path, request.args)
+                versions = generations.marks(*_generation_names(tags))
+                # 读不到版本号时无法判断条目是否失效，直接执行视图
+                if versions is None:
+                    return fn(*args, **kwargs)
+                try:
+                    entry = self.backend.get(key)
+                except Exception as e:
+                    print(f"响应缓存读取失败: {e}")
+                    return fn(*args, **kwargs)
+
+                if entry is not None and entry.tag_versions == versions:
+                    self.hits += 1
+                    if on_hit is not None:
+                        on_hit(entry.meta)
+                    response = make_response(entry.body, entry.status)
+                    response.mimetype = entry.mimetype
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self.misses += 1
+                g.cache_meta = None
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    entry = CacheEntry(
+                        body=response.get_data(),
+                        status=response.status_code,
+                        mimetype=response.mimetype,
+                        tag_versions=versions,
+                        meta=g.get('cache_meta')
+                    )
+                    try:
+                        self.backend.set(key, entry, ttl or self.default_ttl)
+                    except Exception as e:
+                        print(f"响应缓存写入失败: {e}")
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """缓存统计"""
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations
+        }
+
+
+response_cache = ResponseCache()
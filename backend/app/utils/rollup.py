@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+"""
+API日志预聚合
+
+日志写入线程每写一批原始日志，就把这批记录按 (粒度, 桶起始时间, 方法,
+路由模板, 状态码类别) 累加进 api_log_rollups：次数、延迟总和/最小/最大值，
+以及一个可合并的延迟草图，用于估算 p50/p95/p99。
+
+统计接口按时间范围把区间拆成「天 + 两端的小时 + 两端的分钟」，
+只读几百行预聚合数据，不再扫描原始日志表。
+"""
+
+import json
+import math
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, bindparam, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+
+GRANULARITIES = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+
+# 未匹配到路由（404等）的请求统一归到一个模板下，避免随机路径撑大聚合表
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def bucket_start(ts, granularity):
+    """时间戳所在桶的起始时间"""
+    if granularity == 'minute':
+        return ts.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def status_class(status_code):
+    """状态码类别：2xx/3xx/4xx/5xx"""
+    if not status_code:
+        return 'other'
+    return f'{status_code // 100}xx'
+
+
+class LatencySketch:
+    """
+    延迟分布草图
+
+    按对数分桶计数（DDSketch思路），任意分位数的相对误差不超过 RELATIVE_ACCURACY，
+    两个草图逐桶相加即可合并，适合跨分钟/小时/天汇总。
+    """
+
+    RELATIVE_ACCURACY = 0.02
+    MIN_VALUE = 1e-5  # 10微秒以下归入同一个桶
+
+    _gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _log_gamma = math.log(_gamma)
+
+    def __init__(self, bins=None):
+        self.bins = dict(bins or {})
+
+    @property
+    def count(self):
+        return sum(self.bins.values())
+
+    def _index(self, value):
+        return math.ceil(math.log(max(value, self.MIN_VALUE)) / self._log_gamma)
+
+    def _value(self, index):
+        # 桶 (gamma^(k-1), gamma^k] 的代表值，保证相对误差在精度内
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def add(self, value, n=1):
+        if value is None:
+            return
+        index = self._index(value)
+        self.bins[index] = self.bins.get(index, 0) + n
+
+    def merge(self, other):
+        for index, n in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + n
+        return self
+
+    def quantile(self, q):
+        """估算分位数，q取值0~1；草图为空时返回None"""
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.bins))
+
+    def to_json(self):
+        return json.dumps({str(k): v for k, v in sorted(self.bins.items())}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, raw):
+        if not raw:
+            return cls()
+        return cls({int(k): v for k, v in json.loads(raw).items()})
+
+
+class RollupBucket:
+    """单个聚合桶的累计值"""
+
+    __slots__ = ('count', 'latency_sum', 'latency_min', 'latency_max', 'sketch')
+
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.latency_min = None
+        self.latency_max = None
+        self.sketch = LatencySketch()
+
+    def add(self, latency):
+        self.count += 1
+        if latency is None:
+            return
+        self.latency_sum += latency
+        self.latency_min = latency if self.latency_min is None else min(self.latency_min, latency)
+        self.latency_max = latency if self.latency_max is None else max(self.latency_max, latency)
+        self.sketch.add(latency)
+
+    def merge(self, other):
+        self.count += other.count
+        self.latency_sum += other.latency_sum
+        if other.latency_min is not None:
+            self.latency_min = other.latency_min if self.latency_min is None else min(self.latency_min, other.latency_min)
+        if other.latency_max is not None:
+            self.latency_max = other.latency_max if self.latency_max is None else max(self.latency_max, other.latency_max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @classmethod
+    def from_row(cls, row):
+        bucket = cls()
+        bucket.count = row.count
+        bucket.latency_sum = row.latency_sum or 0.0
+        bucket.latency_min = row.latency_min
+        bucket.latency_max = row.latency_max
+        bucket.sketch = LatencySketch.from_json(row.latency_sketch)
+        return bucket
+
+    def to_dict(self):
+        avg = self.latency_sum / self.count if self.count else 0
+        return {
+            'count': self.count,
+            'avg': round(avg, 4),
+            'min': self.latency_min,
+            'max': self.latency_max,
+            'p50': _round(self.sketch.quantile(0.5)),
+            'p95': _round(self.sketch.quantile(0.95)),
+            'p99': _round(self.sketch.quantile(0.99))
+        }
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+def aggregate(records):
+    """
+    把一批日志记录聚合到各粒度的桶
+
+    Returns:
+        {(granularity, bucket_start, method, route, status_class): RollupBucket}
+    """
+    buckets = {}
+    for record in records:
+        created_at = record.get('created_at') or datetime.utcnow()
+        method = record.get('method') or ''
+        route = record.get('route') or UNMATCHED_ROUTE
+        klass = status_class(record.get('status_code'))
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(created_at, granularity), method, route[:200], klass)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = RollupBucket()
+            bucket.add(record.get('response_time'))
+    return buckets
+
+
+def split_range(start, end):
+    """
+    把 [start, end) 拆成尽量粗的桶区间
+
+    Returns:
+        [(granularity, segment_start, segment_end)]
+    """
+    start = bucket_start(start, 'minute')
+    # 结束时间向上取整到分钟，包含当前尚未结束的这一分钟
+    if bucket_start(end, 'minute') < end:
+        end = bucket_start(end, 'minute') + GRANULARITIES['minute']
+    if end <= start:
+        return []
+    segments = []
+    cursor = start
+    # 头部：分钟补齐到整点，小时补齐到零点
+    for granularity, coarser in (('minute', 'hour'), ('hour', 'day')):
+        step = GRANULARITIES[coarser]
+        aligned = bucket_start(cursor, coarser)
+        if aligned < cursor:
+            aligned += step
+        stop = min(aligned, end)
+        if cursor < stop:
+            segments.append((granularity, cursor, stop))
+            cursor = stop
+    # 中间整天，尾部依次用小时、分钟补齐
+    for granularity in ('day', 'hour', 'minute'):
+        step = GRANULARITIES[granularity]
+        whole = cursor + ((end - cursor) // step) * step
+        if cursor < whole:
+            segments.append((granularity, cursor, whole))
+            cursor = whole
+    return segments
+
+
+class LogRollup:
+    """日志预聚合的写入与查询"""
+
+    MAX_RETRIES = 3
+
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.retention = {}
+        self.prune_interval = 3600
+        self._last_prune = 0.0
+        # 统计计数
+        self.batches = 0
+        self.failed = 0
+        self.conflicts = 0
+
+    def init_app(self, app):
+        """读取配置并绑定应用"""
+        self.app = app
+        self.enabled = app.config.get('API_LOG_ROLLUP', True)
+        # 分钟/小时粒度只保留一段时间，天粒度永久保留
+        self.retention = {
+            'minute': timedelta(days=app.config.get('API_LOG_ROLLUP_MINUTE_DAYS', 2)),
+            'hour': timedelta(days=app.config.get('API_LOG_ROLLUP_HOUR_DAYS', 90))
+        }
+
+    @staticmethod
+    def _table():
+        from app.models import APILogRollup
+        return APILogRollup.__table__
+
+    def apply(self, conn, buckets):
+        """把聚合结果累加进预聚合表（需在事务中调用）"""
+        if not buckets:
+            return
+        table = self._table()
+        key_columns = (table.c.granularity, table.c.bucket_start, table.c.method,
+                       table.c.route, table.c.status_class)
+        keys = list(buckets)
+        existing = {}
+        # 分批查询已存在的桶，避免IN列表过长
+        for i in range(0, len(keys), 200):
+            rows = conn.execute(
+                select(table).where(tuple_(*key_columns).in_(keys[i:i + 200])).with_for_update()
+            )
+            for row in rows:
+                key = (row.granularity, row.bucket_start, row.method, row.route, row.status_class)
+                existing[key] = row
+
+        inserts, updates = [], []
+        for key, bucket in buckets.items():
+            row = existing.get(key)
+            if row is not None:
+                merged = RollupBucket.from_row(row).merge(bucket)
+                updates.append({
+                    'row_id': row.id,
+                    'count': merged.count,
+                    'latency_sum': merged.latency_sum,
+                    'latency_min': merged.latency_min,
+                    'latency_max': merged.latency_max,
+                    'latency_sketch': merged.sketch.to_json()
+                })
+            else:
+                granularity, start, method, route, klass = key
+                inserts.append({
+                    'granularity': granularity,
+                    'bucket_start': start,
+                    'method': method,
+                    'route': route,
+                    'status_class': klass,
+                    'count': bucket.count,
+                    'latency_sum': bucket.latency_sum,
+                    'latency_min': bucket.latency_min,
+                    'latency_max': bucket.latency_max,
+                    'latency_sketch': bucket.sketch.to_json()
+                })
+
+        if updates:
+            conn.execute(
+                table.update().where(table.c.id == bindparam('row_id')).values(
+                    count=bindparam('count'),
+                    latency_sum=bindparam('latency_sum'),
+                    latency_min=bindparam('latency_min'),
+                    latency_max=bindparam('latency_max'),
+                    latency_sketch=bindparam('latency_sketch')
+                ),
+                updates
+            )
+        if inserts:
+            conn.execute(table.insert(), inserts)
+
+    def record(self, records):
+        """聚合一批日志记录并写入（日志写入线程调用，需在应用上下文中）"""
+        if not self.enabled or not records:
+            return
+        buckets = aggregate(records)
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                with db.engine.begin() as conn:
+                    self.apply(conn, buckets)
+                self.batches += 1
+                break
+            except IntegrityError:
+                # 其他进程刚插入了同一个桶，重读后再合并
+                self.conflicts += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"日志聚合写入失败: {e}")
+                return
+        else:
+            self.failed += 1
+            print("日志聚合写入失败: 多次冲突")
+            return
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        try:
+            self.prune()
+        except Exception as e:
+            print(f"日志聚合清理失败: {e}")
+
+    def prune(self, now=None):
+        """删除超出保留期的分钟/小时桶，返回删除行数"""
+        table = self._table()
+        now = now or datetime.utcnow()
+        deleted = 0
+        with db.engine.begin() as conn:
+            for granularity, keep in self.retention.items():
+                deleted += conn.execute(
+                    table.delete().where(
+                        table.c.granularity == granularity,
+                        table.c.bucket_start < now - keep
+                    )
+                ).rowcount
+        return deleted
+
+    def query(self, start, end, group_by=('method', 'route', 'status_class')):
+        """
+        汇总 [start, end) 范围内的预聚合数据
+
+        Args:
+            start: 起始时间(UTC)，为None时从最早的天桶开始
+            end: 结束时间(UTC)
+            group_by: 分组维度，取 method/route/status_class 的子集
+
+        Returns:
+            {分组键元组: RollupBucket}
+        """
+        table = self._table()
+        if start is None:
+            first = db.session.execute(
+                select(table.c.bucket_start).where(table.c.granularity == 'day')
+                .order_by(table.c.bucket_start).limit(1)
+            ).scalar()
+            if first is None:
+                return {}
+            start = first
+        segments = split_range(start, end)
+        if not segments:
+            return {}
+
+        conditions = [
+            and_(
+                table.c.granularity == granularity,
+                table.c.bucket_start >= seg_start,
+                table.c.bucket_start < seg_end
+            )
+            for granularity, seg_start, seg_end in segments
+        ]
+        rows = db.session.execute(select(table).where(or_(*conditions)))
+
+        result = {}
+        for row in rows:
+            key = tuple(getattr(row, column) for column in group_by)
+            bucket = RollupBucket.from_row(row)
+            if key in result:
+                result[key].merge(bucket)
+            else:
+                result[key] = bucket
+        return result
+
+    def rebuild(self, chunk_size=5000, since=None):
+        """
+        根据原始日志重建预聚合表
+
+        原始日志只记录了实际路径，这里用应用的URL规则反查路由模板。
+        """
+        from werkzeug.exceptions import HTTPException
+        from app.models import APILog
+
+        logs = APILog.__table__
+        table = self._table()
+        adapter = self.app.url_map.bind('localhost')
+
+        def route_of(path, method):
+            try:
+                rule, _ = adapter.match(path, method=method, return_rule=True)
+                return rule.rule
+            except HTTPException:
+                # 404/405以及需要重定向的路径，与线上记录时一致
+                return UNMATCHED_ROUTE
+
+        # 从整天开始重建，保证天桶完整
+        if since is not None:
+            since = bucket_start(since, 'day')
+        with db.engine.begin() as conn:
+            delete = table.delete()
+            if since is not None:
+                delete = delete.where(table.c.bucket_start >= since)
+            conn.execute(delete)
+
+        columns = (logs.c.id, logs.c.method, logs.c.path, logs.c.status_code,
+                   logs.c.response_time, logs.c.created_at)
+        last_id = 0
+        total = 0
+        while True:
+            query = select(*columns).where(logs.c.id > last_id)
+            if since is not None:
+                query = query.where(logs.c.created_at >= since)
+            rows = db.session.execute(query.order_by(logs.c.id).limit(chunk_size)).all()
+            if not rows:
+                break
+            records = [{
+                'method': row.method,
+                'route': route_of(row.path, row.method),
+                'status_code': row.status_code,
+                'response_time': row.response_time,
+                'created_at': row.created_at
+            } for row in rows]
+            with db.engine.begin() as conn:
+                self.apply(conn, aggregate(records))
+            last_id = rows[-1].id
+            total += len(rows)
+        db.session.commit()
+        return total
+
+    def stats(self):
+        """运行统计"""
+        return {
+            'enabled': self.enabled,
+            'batches': self.batches,
+            'failed': self.failed,
+            'conflicts': self.conflicts
+        }
+
+
+log_rollup = LogRollup()
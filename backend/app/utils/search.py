@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+文章全文搜索模块
+
+可插拔的搜索后端：
+- sqlite: SQLite FTS5虚拟表（开发/测试环境）
+- mysql:  MySQL FULLTEXT索引 + ngram分词（生产环境）
+- memory: 纯Python倒排索引（兜底）
+
+中文按二元组（bigram）切分，英文/数字按单词切分，结果按BM25相关度排序，标题权重更高。
+"""
+
+import re
+import math
+import time
+import bisect
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, text, case, select, table, literal_column, false
+from sqlalchemy.orm import attributes
+
+from app import db
+from app.models import Post
+from app.utils.generations import generations, on_committed_change
+
+
+# 标题相对正文的权重
+TITLE_WEIGHT = 5.0
+
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_CJK_RUN = re.compile(f'[{_CJK}]+')
+_TOKEN = re.compile(f'[{_CJK}]+|[a-z0-9]+')
+
+
+def tokenize(text_):
+    """
+    文档分词
+    中文连续片段切为二元组，并补上片段最后一个字的单字词，
+    这样单字查询可以用前缀匹配命中所有出现位置
+    """
+    if not text_:
+        return []
+    tokens = []
+    for run in _TOKEN.findall(text_.lower()):
+        if _CJK_RUN.fullmatch(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_terms(keyword):
+    """
+    查询分词，返回 (词, 是否前缀匹配) 列表
+    单个汉字和英文单词按前缀匹配，保持与原先模糊搜索接近的召回
+    """
+    terms = []
+    for run in _TOKEN.findall((keyword or '').lower()):
+        if _CJK_RUN.fullmatch(run):
+            if len(run) == 1:
+                terms.append((run, True))
+            else:
+                terms.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+        else:
+            terms.append((run, True))
+    # 去重并保持顺序
+    unique = []
+    for term in terms:
+        if term not in unique:
+            unique.append(term)
+    return unique
+
+
+class SearchBackend:
+    """搜索后端基类"""
+    name = 'base'
+
+    def ensure_schema(self):
+        """创建索引所需的表/索引"""
+
+    def index_posts(self, conn, posts):
+        """在当前事务中写入/更新文章索引"""
+
+    def remove_posts(self, conn, post_ids):
+        """在当前事务中删除文章索引"""
+
+    def rebuild(self):
+        """根据posts表全量重建索引，返回索引文章数"""
+        return 0
+
+    def apply(self, query, keyword, ranked=True):
+        """给文章查询加上关键词过滤，ranked为True时按相关度排序"""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """SQLite FTS5 后端，索引与文章写入处于同一事务"""
+    name = 'sqlite'
+    table = 'posts_fts'
+
+    def ensure_schema(self):
+        exists = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {'name': self.table}).first()
+        if exists:
+            return
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE {self.table} USING fts5(title, content, tokenize = 'unicode61')"
+        ))
+        db.session.commit()
+        self.rebuild()
+
+    def index_posts(self, conn, posts):
+        self.remove_posts(conn, [p.id for p in posts])
+        conn.execute(text(
+            f"INSERT INTO {self.table} (rowid, title, content) VALUES (:id, :title, :content)"
+        ), [{
+            'id': p.id,
+            'title': ' '.join(tokenize(p.title)),
+            'content': ' '.join(tokenize(p.content))
+        } for p in posts])
+
+    def remove_posts(self, conn, post_ids):
+        if post_ids:
+            conn.execute(text(f"DELETE FROM {self.table} WHERE rowid = :id"),
+                         [{'id': pid} for pid in post_ids])
+
+    def rebuild(self):
+        conn = db.session.connection()
+        conn.execute(text(f"DELETE FROM {self.table}"))
+        count = 0
+        last_id = 0
+        while True:
+            chunk = Post.query.filter(Post.id > last_id).order_by(Post.id).limit(500).all()
+            if not chunk:
+                break
+            self.index_posts(conn, chunk)
+            count += len(chunk)
+            last_id = chunk[-1].id
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def _match_expression(terms):
+        parts = []
+        for term, prefix in terms:
+            quoted = '"' + term.replace('"', '""') + '"'
+            parts.append(quoted + '*' if prefix else quoted)
+        return ' AND '.join(parts)
+
+    def apply(self, query, keyword, ranked=True):
+        terms = query_terms(keyword)
+        if not terms:
+            return query.filter(false())
+        matches = select(
+            literal_column('rowid').label('post_id'),
+            literal_column(f'bm25({self.table}, {TITLE_WEIGHT}, 1.0)').label('score')
+        ).select_from(table(self.table)).where(
+            literal_column(self.table).op('MATCH')(self._match_expression(terms))
+        ).subquery()
+        query = query.join(matches, matches.c.post_id == Post.id)
+        # bm25() 越小越相关
+        return query.order_by(matches.c.score.asc()) if ranked else query
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """MySQL FULLTEXT 后端，索引由数据库自动维护（ngram分词，ngram_token_size 默认为2）"""
+    name = 'mysql'
+
+    INDEXES = {
+        'ft_posts_title': 'title',
+        'ft_posts_title_content': 'title, content',
+    }
+
+    def ensure_schema(self):
+        existing = {row[0] for row in db.session.execute(text(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'posts'"
+        ))}
+        for name, columns in self.INDEXES.items():
+            if name not in existing:
+                db.session.execute(text(
+                    f"ALTER TABLE posts ADD FULLTEXT INDEX {name} ({columns}) WITH PARSER ngram"
+                ))
+        db.session.commit()
+
+    @staticmethod
+    def _boolean_expression(terms):
+        # 布尔模式下 +词 表示必须包含，单字/英文词使用前缀通配
+        return ' '.join('+' + term + ('*' if prefix else '') for term, prefix in terms)
+
+    def apply(self, query, keyword, ranked=True):
+        terms = query_terms(keyword)
+        if not terms:
+            return query.filter(false())
+        match = text('MATCH (posts.title, posts.content) AGAINST (:ft_kw IN BOOLEAN MODE)')
+        score = text(
+            f'({TITLE_WEIGHT} * MATCH (posts.title) AGAINST (:ft_kw IN BOOLEAN MODE) + '
+            'MATCH (posts.title, posts.content) AGAINST (:ft_kw IN BOOLEAN MODE)) DESC'
+        )
+        query = query.filter(match)
+        if ranked:
+            query = query.order_by(score)
+        return query.params(ft_kw=self._boolean_expression(terms))
+
+
+class MemorySearchBackend(SearchBackend):
+    """
+    纯Python倒排索引后端
+    每个进程各自维护索引。文章标题/正文的修改、新增、删除提交后共享版本号 search 加一，
+    搜索时发现版本号变化（或距上次比对超过 sync_interval 秒，兜底绕过应用的改库）
+    才用 (id, updated_at) 比对posts表，只重新索引有变化的文章；稳定状态下搜索不扫描posts表
+    """
+    name = 'memory'
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, sync_interval=300):
+        self.sync_interval = sync_interval
+        self._generation = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._versions = {}       # post_id -> updated_at
+        self._docs = {}           # post_id -> {'title': {term: tf}, 'content': {term: tf}, 'len': {...}}
+        self._postings = {}       # term -> set(post_id)
+        self._vocabulary = []     # 有序词表，用于前缀匹配
+        self._total_len = {'title': 0, 'content': 0}
+
+    def _add(self, post_id, title, content):
+        doc = {'len': {}}
+        for field, value in (('title', title), ('content', content)):
+            freqs = {}
+            for token in tokenize(value):
+                freqs[token] = freqs.get(token, 0) + 1
+            doc[field] = freqs
+            doc['len'][field] = sum(freqs.values())
+            self._total_len[field] += doc['len'][field]
+            for token in freqs:
+                if token not in self._postings:
+                    self._postings[token] = set()
+                    bisect.insort(self._vocabulary, token)
+                self._postings[token].add(post_id)
+        self._docs[post_id] = doc
+
+    def _remove(self, post_id):
+        doc = self._docs.pop(post_id, None)
+        if doc is None:
+            return
+        for field in ('title', 'content'):
+            self._total_len[field] -= doc['len'][field]
+            for token in doc[field]:
+                ids = self._postings.get(token)
+                if ids is not None:
+                    ids.discard(post_id)
+                    if not ids:
+                        del self._postings[token]
+                        idx = bisect.bisect_left(self._vocabulary, token)
+                        del self._vocabulary[idx]
+
+    def _maybe_sync(self):
+        """版本号变化或到了兜底间隔才比对posts表"""
+        versions = generations.get('search')
+        generation = versions[0] if versions is not None else None
+        if (generation is not None and generation == self._generation
+                and time.monotonic() - self._synced_at < self.sync_interval):
+            return
+        self._sync()
+        self._generation = generation
+        self._synced_at = time.monotonic()
+
+    def _sync(self):
+        """与posts表比对版本，增量更新索引"""
+        current = dict(db.session.query(Post.id, Post.updated_at).all())
+        stale = [pid for pid, ver in current.items() if self._versions.get(pid, object()) != ver]
+        removed = [pid for pid in self._versions if pid not in current]
+        if not stale and not removed:
+            return
+        rows = []
+        for i in range(0, len(stale), 500):
+            rows.extend(db.session.query(Post.id, Post.title, Post.content).filter(
+                Post.id.in_(stale[i:i + 500])
+            ).all())
+        for pid in removed:
+            self._remove(pid)
+            self._versions.pop(pid, None)
+        for pid, title, content in rows:
+            self._remove(pid)
+            self._add(pid, title, content)
+            self._versions[pid] = current[pid]
+
+    def rebuild(self):
+        with self._lock:
+            self.__init__(self.sync_interval)
+            self._maybe_sync()
+            return len(self._docs)
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term] if term in self._postings else []
+        start = bisect.bisect_left(self._vocabulary, term)
+        words = []
+        for word in self._vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            words.append(word)
+        return words
+
+    def search(self, keyword):
+        """返回按相关度降序排列的 [(post_id, score)]"""
+        terms = query_terms(keyword)
+        if not terms:
+            return []
+        with self._lock:
+            self._maybe_sync()
+            n_docs = len(self._docs) or 1
+            avg_len = {f: (self._total_len[f] / n_docs) or 1 for f in ('title', 'content')}
+            candidates = None
+            expanded = []
+            for term, prefix in terms:
+                words = self._expand(term, prefix)
+                ids = set()
+                for word in words:
+                    ids |= self._postings[word]
+                candidates = ids if candidates is None else candidates & ids
+                expanded.append(words)
+            if not candidates:
+                return []
+            scores = {}
+            for words in expanded:
+                for word in words:
+                    ids = self._postings[word]
+                    idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                    for pid in ids & candidates:
+                        doc = self._docs[pid]
+                        score = 0.0
+                        for field, weight in (('title', TITLE_WEIGHT), ('content', 1.0)):
+                            tf = doc[field].get(word, 0)
+                            if tf:
+                                norm = self.k1 * (1 - self.b + self.b * doc['len'][field] / avg_len[field])
+                                score += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+                        scores[pid] = scores.get(pid, 0.0) + score
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def apply(self, query, keyword, ranked=True):
+        matches = self.search(keyword)
+        if not matches:
+            return query.filter(false())
+        ids = [pid for pid, _ in matches]
+        query = query.filter(Post.id.in_(ids))
+        if not ranked:
+            return query
+        return query.order_by(case({pid: idx for idx, pid in enumerate(ids)}, value=Post.id))
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'mysql': MySQLFulltextBackend,
+    'memory': MemorySearchBackend,
+}
+
+
+def _sqlite_has_fts5():
+    try:
+        return bool(db.session.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+    except Exception:
+        return False
+
+
+def init_app(app):
+    """根据配置和数据库类型选择搜索后端"""
+    name = app.config.get('SEARCH_BACKEND', 'auto')
+    with app.app_context():
+        if name == 'auto':
+            dialect = db.engine.dialect.name
+            if dialect == 'sqlite' and _sqlite_has_fts5():
+                name = 'sqlite'
+            elif dialect == 'mysql':
+                name = 'mysql'
+            else:
+                name = 'memory'
+        backend = BACKENDS[name]()
+        if name == 'memory':
+            backend.sync_interval = app.config.get('SEARCH_SYNC_INTERVAL', backend.sync_interval)
+        app.extensions['search'] = backend
+
+
+def get_backend():
+    """当前应用的搜索后端"""
+    return current_app.extensions['search']
+
+
+def search_posts(query, keyword, ranked=True):
+    """给文章查询加上关键词过滤，ranked为True时结果按相关度排序"""
+    return get_backend().apply(query, keyword, ranked)
+
+
+@on_committed_change({Post: ('title', 'content')})
+def _bump_search_generation(changed):
+    """内存索引据此得知需要重新比对"""
+    generations.bump('search')
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """文章新增/修改/删除时在同一事务中同步索引"""
+    if not has_app_context():
+        return
+    backend = current_app.extensions.get('search')
+    if backend is None or backend.name != 'sqlite':
+        return
+    changed = [obj for obj in session.new if isinstance(obj, Post)]
+    for obj in session.dirty:
+        if not isinstance(obj, Post) or obj in session.deleted:
+            continue
+        if any(attributes.get_history(obj, key).has_changes() for key in ('title', 'content')):
+            changed.append(obj)
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Post)]
+    if not changed and not removed:
+        return
+    conn = session.connection()
+    backend.remove_posts(conn, removed)
+    if changed:
+        backend.index_posts(conn, changed)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+请求级SQL统计
+
+挂在SQLAlchemy引擎的 before_cursor_execute / after_cursor_execute 事件上，
+按请求累计语句条数、数据库耗时和归一化后的语句指纹：
+- 响应头 Server-Timing 带上 db 耗时和条数，浏览器开发者工具里直接可见；
+- API日志记录 db_query_count / db_time；
+- 同一条归一化语句在一个请求里执行超过 SQL_N_PLUS_ONE_THRESHOLD 次，
+  多半是循环里逐条查询（N+1），开启 SQL_N_PLUS_ONE_WARN 时输出警告日志。
+
+后台线程（日志写入、浏览量落库等）没有请求上下文，不计入统计。
+"""
+
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+_PARAM_RE = re.compile(r'%s|%\(\w+\)s|:\w+')
+
+
+def fingerprint(statement):
+    """归一化SQL：字面量和参数占位统一为?，IN列表折叠，空白合并"""
+    sql = _STRING_RE.sub('?', statement)
+    sql = _PARAM_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """一个请求内的SQL统计"""
+
+    __slots__ = ('count', 'duration', 'fingerprints', 'closed')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        # 请求结束后（如同步写日志）执行的语句不再计入
+        self.closed = False
+
+    def add(self, statement, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """执行次数超过阈值的语句 [(指纹, 次数)]，按次数倒序"""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > threshold]
+
+
+class SQLProfiler:
+    """请求级SQL统计中间件"""
+
+    def __init__(self):
+        self.enabled = True
+        self.threshold = 5
+        self.warn = False
+        self._engines = set()
+
+    def init_app(self, app):
+        """读取配置，监听引擎事件并注册请求钩子"""
+        self.enabled = app.config.get('SQL_PROFILE', True)
+        self.threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        self.warn = app.config.get('SQL_N_PLUS_ONE_WARN', False)
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            engine = db.engine
+        if id(engine) not in self._engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._engines.add(id(engine))
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    @staticmethod
+    def current():
+        """当前请求的统计，未开启或不在请求中时返回None"""
+        if not has_request_context():
+            return None
+        return g.get('_sql_stats')
+
+    def before_request(self):
+        g._sql_stats = QueryStats()
+
+    def after_request(self, response):
+        """写Server-Timing响应头，检查N+1"""
+        stats = g.get('_sql_stats')
+        if stats is None:
+            return response
+        stats.closed = True
+
+        response.headers.add(
+            'Server-Timing', f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+        )
+        if self.warn:
+            repeated = stats.repeated(self.threshold)
+            if repeated:
+                details = '\n'.join(f'  x{n}: {sql[:300]}' for sql, n in repeated)
+                current_app.logger.warning(
+                    f'疑似N+1查询 {request.method} {request.path}'
+                    f'（共{stats.count}条SQL）:\n{details}'
+                )
+        return response
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_sql_profile_start', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_sql_profile_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        stats = SQLProfiler.current()
+        if stats is not None and not stats.closed:
+            stats.add(statement, elapsed)
+
+
+sql_profiler = SQLProfiler()
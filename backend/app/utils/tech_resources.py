@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+测试技术资源快照
+
+测试技术资源基本是静态参考数据，整张表加载一次后在内存里按分类分组，
+并为每种筛选组合（分类 × 是否推荐）、分类列表和单个资源预先编码好JSON响应体，
+请求只做字典查找，内容摘要即ETag。
+
+应用内提交的资源修改使共享版本号加一，所有worker立即重建；
+绕过应用直接改库的修改由定期水位检查发现：
+每隔 TECH_RESOURCES_CHECK_INTERVAL 秒比对一次「行数 + 最大updated_at」，变化了才重新加载。
+"""
+
+import hashlib
+
+from flask import current_app
+
+from app.models import TestTechResource
+from app.utils.generations import GenerationCache, on_committed_change
+from app.utils.http_cache import table_marks
+
+
+class Body:
+    """预编码的JSON响应体"""
+
+    __slots__ = ('data', 'digest')
+
+    def __init__(self, payload):
+        self.data = current_app.json.dumps(payload).encode('utf-8')
+        self.digest = hashlib.sha1(self.data).hexdigest()
+
+
+def _response(data):
+    return {'code': 200, 'msg': '获取成功', 'data': data}
+
+
+class TechResourceSnapshot:
+    """一份不可变的资源快照"""
+
+    def __init__(self, resources, watermark):
+        self.watermark = watermark
+        # 与原接口一致：按分类、排序号排序后分组
+        resources = sorted(resources, key=lambda r: (r.category, r.sort_order or 0, r.id))
+        dicts = {r.id: r.to_dict() for r in resources}
+        self.updated_at = max((r.updated_at for r in resources if r.updated_at), default=None)
+        self.categories = list(dict.fromkeys(r.category for r in resources))
+
+        self.lists = {}
+        for category in [None] + self.categories:
+            for recommended in (None, True, False):
+                groups = {}
+                for r in resources:
+                    if category is not None and r.category != category:
+                        continue
+                    if recommended is not None and bool(r.is_recommended) != recommended:
+                        continue
+                    groups.setdefault(r.category, {'category': r.category, 'resources': []})
+                    groups[r.category]['resources'].append(dicts[r.id])
+                self.lists[(category, recommended)] = Body(_response(list(groups.values())))
+        self.empty_list = Body(_response([]))
+        self.category_list = Body(_response(self.categories))
+        self.details = {rid: Body(_response(d)) for rid, d in dicts.items()}
+
+    def list_body(self, category=None, recommended=None):
+        """按筛选条件取列表响应体，未知分类返回空列表"""
+        return self.lists.get((category or None, recommended), self.empty_list)
+
+
+class TechResourceCache(GenerationCache):
+    """测试技术资源快照的进程内缓存，ttl 即水位检查间隔"""
+
+    name = 'tech_resources'
+    ttl_config = 'TECH_RESOURCES_CHECK_INTERVAL'
+
+    def __init__(self, ttl=60):
+        super().__init__(ttl)
+
+    def build(self):
+        watermark = table_marks(TestTechResource)
+        return TechResourceSnapshot(TestTechResource.query.all(), watermark)
+
+    def revalidate(self, snapshot):
+        """到了检查时间：水位没变就继续用，不重新加载"""
+        return table_marks(TestTechResource) == snapshot.watermark
+
+
+tech_resource_cache = TechResourceCache()
+
+
+@on_committed_change({TestTechResource: None})
+def _invalidate_tech_resources(changed):
+    tech_resource_cache.invalidate()
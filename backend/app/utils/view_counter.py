@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+文章浏览量写缓冲
+
+浏览时只在进程内累加，后台线程按固定间隔把各文章的增量合并成一次
+executemany 的 `UPDATE posts SET view_count = view_count + n`，
+读接口返回“已落库的值 + 未落库的增量”，热门文章不再因每次浏览加行锁写库。
+"""
+
+import os
+import atexit
+import threading
+
+from sqlalchemy import bindparam
+
+from app import db
+
+
+class ViewCounter:
+    """文章浏览量累加器"""
+
+    def __init__(self):
+        self.app = None
+        self.buffered = True
+        self.flush_interval = 5.0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._inflight = {}
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+        # 统计计数
+        self.flushed_views = 0
+        self.flushes = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        """读取配置并绑定应用"""
+        self.app = app
+        self.buffered = app.config.get('VIEW_COUNT_BUFFERED', True)
+        self.flush_interval = app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 5.0)
+        self._stopping.clear()
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def incr(self, post_id, n=1):
+        """记录一次浏览"""
+        if not self.buffered:
+            self._write({post_id: n}, db.session)
+            db.session.commit()
+            return
+
+        self._ensure_worker()
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + n
+
+    def pending(self, post_id):
+        """尚未落库的浏览增量"""
+        return self._pending.get(post_id, 0) + self._inflight.get(post_id, 0)
+
+    def _ensure_worker(self):
+        """按进程启动刷新线程（gunicorn fork之后线程不会被继承）"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # fork前父进程未落库的增量由父进程负责
+                self._pending = {}
+                self._inflight = {}
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='view-count-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    @staticmethod
+    def _write(deltas, executor):
+        from app.models import Post
+
+        table = Post.__table__
+        # 浏览不算内容修改，显式保留updated_at，避免触发onupdate
+        stmt = table.update().where(table.c.id == bindparam('post_id')).values(
+            view_count=table.c.view_count + bindparam('delta'),
+            updated_at=table.c.updated_at
+        )
+        executor.execute(stmt, [{'post_id': pid, 'delta': n} for pid, n in deltas.items()])
+
+    def flush(self):
+        """把累计的增量一次性写入数据库"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            deltas, self._pending = self._pending, {}
+            self._inflight = deltas
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    self._write(deltas, conn)
+            self.flushed_views += sum(deltas.values())
+            self.flushes += 1
+            return len(deltas)
+        except Exception as e:
+            # 写入失败时把增量放回，下次再试
+            self.failed += 1
+            with self._lock:
+                for pid, n in deltas.items():
+                    self._pending[pid] = self._pending.get(pid, 0) + n
+            print(f"浏览量写入失败: {e}")
+            return 0
+        finally:
+            self._inflight = {}
+
+    def shutdown(self, timeout=5.0):
+        """进程退出时停止刷新线程并写出剩余增量"""
+        if self.app is None:
+            return
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """运行统计"""
+        return {
+            'pending_posts': len(self._pending),
+            'pending_views': sum(self._pending.values()),
+            'flushed_views': self.flushed_views,
+            'flushes': self.flushes,
+            'failed': self.failed
+        }
+
+
+view_counter = ViewCounter()
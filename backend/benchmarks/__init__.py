@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+后端API压测
+
+按规模生成合成数据集（corpus），对公开和管理接口的典型请求（scenarios）
+用 Flask test client 或真实 gunicorn 进程（drivers）测吞吐量和延迟分位，
+结果写成JSON并与保存的基线对比（report）。在 backend 目录下运行 `python -m benchmarks --help`。
+"""
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+压测命令行
+
+    python -m benchmarks seed --scale small            # 生成数据集
+    python -m benchmarks run --scale small             # test client 顺序压测全部场景
+    python -m benchmarks run --driver http -w 4 -c 16  # 启动 gunicorn 并发压测
+    python -m benchmarks run --only posts --save-baseline
+    python -m benchmarks compare results/a.json baselines/client-small.json
+
+run 的结果写入 benchmarks/results/，存在对应基线（baselines/<驱动>-<规模>[-nocache].json）时自动对比，
+有回归则退出码为1，可直接用在CI里。
+"""
+
+import os
+import sys
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 与基线不一致时结果不可直接比较的压测参数
+_SETTINGS = ('driver', 'database', 'response_cache', 'workers', 'concurrency')
+
+
+def _configure_env(args):
+    """在导入应用之前设置环境变量（配置类在导入时读取）"""
+    if args.database_url:
+        os.environ['BENCH_DATABASE_URL'] = args.database_url
+    if getattr(args, 'no_cache', False):
+        os.environ['RESPONSE_CACHE_BACKEND'] = 'null'
+
+
+def _reset_database(app):
+    """清空压测库：SQLite直接删文件，其他数据库删表"""
+    from sqlalchemy import text
+    from app import db
+
+    with app.app_context():
+        url = db.engine.url
+        if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+            db.engine.dispose()
+            if os.path.exists(url.database):
+                os.remove(url.database)
+            return
+        db.drop_all()
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP TABLE IF EXISTS alembic_version'))
+
+
+def prepare(args):
+    """创建应用、建表，库为空（或指定 --reseed）时生成数据集，返回 (app, 取值上下文, 数据量)"""
+    from app import create_app, db, init_db
+    from app.models import User
+    from benchmarks.corpus import SCALES, seed_corpus, load_context, dataset_size
+
+    app = create_app('benchmark')
+    if args.reseed:
+        _reset_database(app)
+    init_db(app)
+    with app.app_context():
+        if db.session.query(User.id).first() is None:
+            counts = dict(SCALES[args.scale])
+            print(f'生成 {args.scale} 规模数据集: {counts}')
+            seed_corpus(counts, seed=args.seed)
+        context = load_context()
+        size = dataset_size()
+        db.session.remove()
+    return app, context, size
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_scenarios(driver, scenarios, context, args):
+    from benchmarks.corpus import ADMIN_USERNAME, ADMIN_PASSWORD
+    from benchmarks.report import summarize
+
+    token = driver.login(ADMIN_USERNAME, ADMIN_PASSWORD)
+    results = {}
+    for scenario in scenarios:
+        headers = {'Authorization': f'Bearer {token}'} if scenario.admin else {}
+        urls = [scenario.url(context, i) for i in range(args.warmup + args.requests)]
+        if scenario.revalidate:
+            status, response_headers = driver.get(urls[0], headers=headers)
+            if response_headers.get('ETag'):
+                headers['If-None-Match'] = response_headers['ETag']
+        if args.warmup:
+            driver.run(urls[:args.warmup], headers)
+        samples, elapsed = driver.run(urls[args.warmup:], headers)
+        results[scenario.name] = summary = summarize(samples, elapsed)
+        print(f'  {scenario.name:<28}{summary["throughput_rps"]:>9.1f} req/s  '
+              f'p95 {summary["p95_ms"]:.2f}ms  SQL {summary["db_queries"]}')
+    return results
+
+
+def run(args):
+    from benchmarks import report
+    from benchmarks.drivers import ClientDriver, HTTPDriver, GunicornServer
+    from benchmarks.scenarios import select
+
+    app, context, size = prepare(args)
+    scenarios = select(args.only)
+    if not scenarios:
+        print(f'没有匹配 {args.only} 的场景')
+        return 2
+
+    meta = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'driver': args.driver,
+        'scale': args.scale,
+        'dataset': size,
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'response_cache': not args.no_cache,
+        'requests': args.requests,
+        'warmup': args.warmup,
+    }
+    print(f'压测 {len(scenarios)} 个场景，驱动 {args.driver}，每个场景 {args.requests} 次请求（预热 {args.warmup} 次）')
+
+    if args.driver == 'client':
+        scenario_results = _run_scenarios(ClientDriver(app), scenarios, context, args)
+    else:
+        meta.update(workers=args.workers, concurrency=args.concurrency)
+        env = {'BENCH_DATABASE_URL': app.config['SQLALCHEMY_DATABASE_URI']}
+        if args.no_cache:
+            env['RESPONSE_CACHE_BACKEND'] = 'null'
+        with GunicornServer(workers=args.workers, env=env) as server:
+            driver = HTTPDriver(server.base_url, concurrency=args.concurrency)
+            scenario_results = _run_scenarios(driver, scenarios, context, args)
+
+    results = {'meta': meta, 'scenarios': scenario_results}
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f'{datetime.utcnow():%Y%m%d-%H%M%S}-{args.driver}-{args.scale}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report.save(results, output)
+    print(f'结果已写入 {output}')
+
+    suffix = '-nocache' if args.no_cache else ''
+    baseline_path = args.baseline or os.path.join(
+        BENCH_DIR, 'baselines', f'{args.driver}-{args.scale}{suffix}.json')
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        report.save(results, baseline_path)
+        print(f'已保存为基线 {baseline_path}')
+        print(report.format_table(results))
+        return 0
+    if os.path.exists(baseline_path):
+        return _compare(results, report.load(baseline_path), args.threshold, baseline_path)
+    print(report.format_table(results))
+    return 0
+
+
+def _compare(results, baseline, threshold, baseline_path):
+    from benchmarks import report
+
+    rows, regressions = report.compare(results, baseline, threshold)
+    print(f'\n对比基线 {baseline_path}（{baseline["meta"].get("git_revision")}，阈值 {threshold:.0%}）')
+    print(report.format_table(results, rows))
+    if baseline['meta'].get('dataset') != results['meta'].get('dataset'):
+        print('⚠️ 数据集规模与基线不同，延迟对比仅供参考')
+    for key in _SETTINGS:
+        if baseline['meta'].get(key) != results['meta'].get(key):
+            print(f'⚠️ {key} 与基线不同: {baseline["meta"].get(key)} → {results["meta"].get(key)}')
+    if regressions:
+        print(f'\n❌ {len(regressions)} 个场景回归:')
+        for line in regressions:
+            print(f'  {line}')
+        return 1
+    print('\n✅ 没有回归')
+    return 0
+
+
+def seed(args):
+    prepare(args)
+    print('数据集已就绪')
+    return 0
+
+
+def compare(args):
+    from benchmarks import report
+
+    return _compare(report.load(args.results), report.load(args.baseline), args.threshold, args.baseline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='后端API压测')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_dataset_options(p):
+        p.add_argument('--scale', default='small', choices=['tiny', 'small', 'medium', 'large'],
+                       help='数据集规模（库为空时按此生成）')
+        p.add_argument('--seed', type=int, default=42, help='随机种子')
+        p.add_argument('--reseed', action='store_true', help='清空压测库后重新生成数据集')
+        p.add_argument('--database-url', help='压测库地址，默认 benchmarks/bench.db')
+
+    p = sub.add_parser('seed', help='生成数据集')
+    add_dataset_options(p)
+    p.set_defaults(func=seed)
+
+    p = sub.add_parser('run', help='执行压测')
+    add_dataset_options(p)
+    p.add_argument('--driver', default='client', choices=['client', 'http'],
+                   help='client: Flask test client；http: 启动gunicorn并发请求')
+    p.add_argument('-n', '--requests', type=int, default=200, help='每个场景的请求数')
+    p.add_argument('--warmup', type=int, default=20, help='每个场景的预热请求数（不计入结果）')
+    p.add_argument('-w', '--workers', type=int, default=4, help='gunicorn worker数（http驱动）')
+    p.add_argument('-c', '--concurrency', type=int, default=8, help='并发线程数（http驱动）')
+    p.add_argument('--only', nargs='*', help='只跑名称包含这些关键字的场景')
+    p.add_argument('--no-cache', action='store_true', help='关闭响应缓存，测数据库路径')
+    p.add_argument('-o', '--output', help='结果文件路径')
+    p.add_argument('--baseline', help='基线文件，默认 baselines/<驱动>-<规模>[-nocache].json')
+    p.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    p.add_argument('--threshold', type=float, default=0.2, help='回归阈值（相对变化）')
+    p.set_defaults(func=run)
+
+    p = sub.add_parser('compare', help='对比两个结果文件')
+    p.add_argument('results', help='本次结果')
+    p.add_argument('baseline', help='基线结果')
+    p.add_argument('--threshold', type=float, default=0.2, help='回归阈值（相对变化）')
+    p.set_defaults(func=compare, database_url=None)
+
+    args = parser.parse_args(argv)
+    _configure_env(args)
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
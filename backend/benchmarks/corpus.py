@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+合成数据集
+
+按规模生成用户、分类、标签、文章（接近真实的Markdown正文）、楼中楼评论、API日志和登录日志。
+数据用Core批量插入（显式ID），冗余计数、评论路径、全文索引、日志预聚合
+再用项目自带的重建函数补齐，与线上数据的状态一致。随机种子固定，同一规模每次生成的数据相同。
+"""
+
+import random
+from itertools import accumulate
+from datetime import datetime, timedelta
+
+from app import db
+from app.utils.render import render_markdown
+
+
+# 各规模的数据量
+SCALES = {
+    'tiny': dict(users=10, categories=5, tags=20, posts=100, comments=400,
+                 api_logs=5000, login_logs=200),
+    'small': dict(users=50, categories=8, tags=40, posts=1000, comments=5000,
+                  api_logs=50000, login_logs=2000),
+    'medium': dict(users=200, categories=15, tags=100, posts=5000, comments=30000,
+                   api_logs=300000, login_logs=10000),
+    'large': dict(users=1000, categories=30, tags=300, posts=20000, comments=150000,
+                  api_logs=2000000, login_logs=50000),
+}
+
+ADMIN_USERNAME = 'bench_admin'
+ADMIN_PASSWORD = 'bench-admin-123'
+
+_WORDS = (
+    'Flask', 'SQLAlchemy', '索引', '缓存', '事务', '连接池', '查询计划', '接口', '分页', '异步',
+    '队列', 'Redis', 'MySQL', 'Vue', '组件', '路由', '中间件', '部署', '容器', '日志',
+    '性能', '延迟', '吞吐量', '测试', '断言', '回归', '并发', '锁', '线程', '进程',
+    'gunicorn', 'nginx', '反向代理', '压缩', '序列化', '校验', '权限', 'Token', '会话', '迁移',
+)
+_SENTENCE_TAILS = ('。', '。', '。', '？', '！')
+_CODE_SNIPPETS = (
+    ('python', 'def handler(request):\n    items = Post.query.filter_by(is_published=True).all()\n'
+               '    return {"items": [p.to_dict() for p in items]}'),
+    ('javascript', 'const res = await fetch("/api/posts?page=1")\n'
+                   'const { data } = await res.json()\nconsole.log(data.items.length)'),
+    ('sql', 'SELECT id, title FROM posts\nWHERE is_published = 1\nORDER BY published_at DESC\nLIMIT 10;'),
+    ('bash', 'pip install -r requirements.txt\nflask init-db\ngunicorn -w 4 run:app'),
+)
+_API_PATHS = (
+    ('GET', '/api/posts'), ('GET', '/api/posts/{slug}'), ('GET', '/api/categories'),
+    ('GET', '/api/tags'), ('GET', '/api/archives'), ('GET', '/api/posts/{id}/comments'),
+    ('POST', '/api/posts/{id}/comments'), ('POST', '/api/auth/login'), ('GET', '/api/auth/me'),
+    ('GET', '/api/test-tech-resources'), ('GET', '/api/admin/logs'), ('PUT', '/api/posts/{id}'),
+)
+_STATUS_CODES = (200,) * 90 + (201,) * 3 + (304,) * 3 + (400, 401, 404, 500)
+_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+)
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 18))]
+    if rng.random() < 0.3:
+        i = rng.randrange(len(words))
+        words[i] = f'`{words[i]}`'
+    if rng.random() < 0.1:
+        words.append('[参考文档](https://example.com/docs)')
+    # 中文词直接相连，英文词前后留空格
+    text = ''.join(f' {w} ' if w.isascii() else w for w in words)
+    return ' '.join(text.split()) + rng.choice(_SENTENCE_TAILS)
+
+
+def _paragraph(rng):
+    return ''.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def markdown_document(rng):
+    """生成一篇带标题、段落、列表、代码块和引用的Markdown正文"""
+    parts = [_paragraph(rng)]
+    for section in range(rng.randint(2, 6)):
+        parts.append(f'## {section + 1}. {rng.choice(_WORDS)}与{rng.choice(_WORDS)}')
+        parts.append(_paragraph(rng))
+        kind = rng.random()
+        if kind < 0.35:
+            lang, code = rng.choice(_CODE_SNIPPETS)
+            parts.append(f'```{lang}\n{code}\n```')
+        elif kind < 0.6:
+            parts.append('\n'.join(f'- {_sentence(rng)}' for _ in range(rng.randint(2, 5))))
+        elif kind < 0.7:
+            parts.append(f'> {_sentence(rng)}')
+        elif kind < 0.8:
+            parts.append('| 指标 | 优化前 | 优化后 |\n| --- | --- | --- |\n'
+                         f'| p95 | {rng.randint(80, 400)}ms | {rng.randint(10, 79)}ms |')
+        parts.append(_paragraph(rng))
+    return '\n\n'.join(parts)
+
+
+def _insert(table, rows, chunk_size=5000):
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(table.insert(), rows[start:start + chunk_size])
+
+
+def seed_corpus(counts, seed=42, log=print):
+    """
+    向空库写入合成数据（需在应用上下文中调用），返回压测用的取值上下文
+
+    Args:
+        counts: 各表数据量，见 SCALES
+        seed: 随机种子
+        log: 进度输出函数
+    """
+    from app.models import User, Post, Category, Tag, Comment, APILog, LoginLog
+    from app.models.post import post_tags
+    from app.models.counters import recount_all
+    from app.models.comment import rebuild_comment_paths
+    from app.utils import search
+    from app.utils.rollup import log_rollup
+
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    # 用户：密码哈希很慢，所有用户共用一个
+    admin = User(username=ADMIN_USERNAME, email='bench_admin@example.com')
+    admin.set_password(ADMIN_PASSWORD)
+    users = [dict(id=1, username=ADMIN_USERNAME, email='bench_admin@example.com',
+                  password_hash=admin.password_hash, is_admin=True, is_active=True,
+                  token_version=0, created_at=now - timedelta(days=400), last_seen=now)]
+    for i in range(2, counts['users'] + 1):
+        users.append(dict(id=i, username=f'user{i}', email=f'user{i}@example.com',
+                          password_hash=admin.password_hash, is_admin=False, is_active=True,
+                          token_version=0, created_at=now - timedelta(days=rng.randint(0, 400)),
+                          last_seen=now - timedelta(hours=rng.randint(0, 2000))))
+    _insert(User.__table__, users)
+
+    categories = [dict(id=i, name=f'分类{i}', slug=f'category-{i}', description=_sentence(rng)[:200],
+                       published_post_count=0, created_at=now, updated_at=now)
+                  for i in range(1, counts['categories'] + 1)]
+    _insert(Category.__table__, categories)
+    tags = [dict(id=i, name=f'标签{i}', slug=f'tag-{i}', published_post_count=0,
+                 created_at=now, updated_at=now)
+            for i in range(1, counts['tags'] + 1)]
+    _insert(Tag.__table__, tags)
+    log(f'用户 {len(users)}，分类 {len(categories)}，标签 {len(tags)}')
+
+    # 文章：正文逐篇渲染，与发文接口写入的内容一致
+    posts, links = [], []
+    for i in range(1, counts['posts'] + 1):
+        content = markdown_document(rng)
+        created = now - timedelta(days=rng.uniform(0, 3 * 365))
+        published = rng.random() < 0.9
+        posts.append(dict(
+            id=i, title=f'{rng.choice(_WORDS)}实践笔记（{i}）', slug=f'bench-post-{i}',
+            summary=content.split('\n\n')[0][:200], content=content,
+            content_html=render_markdown(content),
+            user_id=rng.randint(1, max(1, counts['users'] // 5)),
+            category_id=rng.randint(1, counts['categories']),
+            is_published=published, view_count=int(rng.paretovariate(1.2) * 10),
+            comment_count=0, created_at=created, updated_at=created,
+            published_at=created + timedelta(hours=1) if published else None
+        ))
+        for tag_id in rng.sample(range(1, counts['tags'] + 1), min(counts['tags'], rng.randint(1, 5))):
+            links.append(dict(post_id=i, tag_id=tag_id))
+        if len(posts) >= 1000:
+            _insert(Post.__table__, posts)
+            posts = []
+    _insert(Post.__table__, posts)
+    _insert(post_tags, links)
+    db.session.commit()
+    log(f'文章 {counts["posts"]}，文章标签 {len(links)}')
+
+    # 评论：热门文章评论多，约四成是回复
+    published_ids = [row[0] for row in db.session.query(Post.id).filter_by(is_published=True)]
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(published_ids))))
+    comments, by_post = [], {}
+    for i in range(1, counts['comments'] + 1):
+        post_id = rng.choices(published_ids, cum_weights=cum_weights)[0]
+        existing = by_post.setdefault(post_id, [])
+        parent_id = rng.choice(existing) if existing and rng.random() < 0.4 else None
+        content = _sentence(rng)
+        comments.append(dict(
+            id=i, content=content, content_html=render_markdown(content, 'comment'),
+            post_id=post_id, user_id=rng.randint(1, counts['users']), parent_id=parent_id,
+            is_approved=rng.random() < 0.97,
+            created_at=now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)), updated_at=now
+        ))
+        existing.append(i)
+    _insert(Comment.__table__, comments)
+    db.session.commit()
+    log(f'评论 {len(comments)}')
+
+    # 日志
+    logs = []
+    for i in range(counts['api_logs']):
+        method, path = rng.choice(_API_PATHS)
+        status = rng.choice(_STATUS_CODES)
+        logs.append(dict(
+            method=method, path=path.format(slug=f'bench-post-{rng.randint(1, counts["posts"])}',
+                                            id=rng.randint(1, counts['posts'])),
+            ip_address=f'10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+            user_agent=rng.choice(_USER_AGENTS),
+            user_id=rng.randint(1, counts['users']) if rng.random() < 0.3 else None,
+            status_code=status, response_time=round(rng.lognormvariate(-3.5, 0.8), 4),
+            db_query_count=rng.randint(1, 12), db_time=round(rng.lognormvariate(-6, 0.7), 5),
+            created_at=now - timedelta(seconds=rng.randint(0, 30 * 86400))
+        ))
+        if len(logs) >= 20000:
+            _insert(APILog.__table__, logs)
+            logs = []
+    _insert(APILog.__table__, logs)
+    _insert(LoginLog.__table__, [dict(
+        user_id=rng.randint(1, counts['users']), ip_address=f'10.1.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+        user_agent=rng.choice(_USER_AGENTS), login_type='password',
+        login_status='success' if rng.random() < 0.9 else 'failed',
+        created_at=now - timedelta(seconds=rng.randint(0, 90 * 86400))
+    ) for _ in range(counts['login_logs'])])
+    db.session.commit()
+    log(f'API日志 {counts["api_logs"]}，登录日志 {counts["login_logs"]}')
+
+    # 冗余数据用项目自带的重建函数补齐
+    recount_all()
+    rebuild_comment_paths()
+    search.get_backend().rebuild()
+    log_rollup.rebuild()
+    log('计数、评论路径、全文索引、日志预聚合已重建')
+    return load_context()
+
+
+def load_context(sample_size=50):
+    """从库里取压测要轮流访问的参数（文章slug、ID、分类、标签等）"""
+    from app.models import User, Post, Category, Tag, TestTechResource
+
+    def ids(query):
+        return [row[0] for row in query.limit(sample_size)]
+
+    published = Post.query.filter_by(is_published=True)
+    return {
+        'slug': ids(db.session.query(Post.slug).filter_by(is_published=True).order_by(Post.id)),
+        'post_id': ids(published.with_entities(Post.id).order_by(Post.comment_count.desc(), Post.id)),
+        'category_id': ids(db.session.query(Category.id).order_by(Category.id)),
+        'tag_id': ids(db.session.query(Tag.id).order_by(Tag.published_post_count.desc(), Tag.id)),
+        'user_id': ids(db.session.query(User.id).order_by(User.id)),
+        'resource_id': ids(db.session.query(TestTechResource.id).order_by(TestTechResource.id)),
+        'page': list(range(1, 11)),
+        'keyword': ['Flask', '索引', '缓存', 'gunicorn', '性能'],
+    }
+
+
+def dataset_size():
+    """
+    当前库中用户、文章、评论的行数，写进结果便于确认对比的是同一数据集
+    （压测请求本身会写API日志和登录日志，这两张表不计入）
+    """
+    from sqlalchemy import func
+    from app.models import User, Post, Comment
+
+    return {
+        name: db.session.query(func.count(model.id)).scalar()
+        for name, model in (('users', User), ('posts', Post), ('comments', Comment))
+    }
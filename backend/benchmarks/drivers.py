@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+请求驱动
+
+- ClientDriver：进程内用 Flask test client 顺序发请求，没有网络和WSGI服务器开销，
+  结果稳定，适合对比单个接口的代码改动；
+- HTTPDriver：对真实的 gunicorn 进程（GunicornServer 启动）用多线程并发发请求，
+  包含多worker、序列化和网络开销，适合看整体吞吐（需要 requests 和 gunicorn）。
+
+两者都返回每个请求的 (耗时秒, 状态码, SQL条数)，SQL条数取自 Server-Timing 响应头。
+"""
+
+import os
+import re
+import sys
+import time
+import socket
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def _query_count(headers):
+    match = _QUERIES_RE.search(headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else None
+
+
+class ClientDriver:
+    """Flask test client 驱动（单线程顺序请求）"""
+
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+
+    def login(self, username, password):
+        response = self.client.post('/api/auth/login', json={'username': username, 'password': password})
+        if response.status_code != 200:
+            raise RuntimeError(f'登录失败: {response.status_code} {response.get_data(as_text=True)[:200]}')
+        return response.get_json()['data']['token']
+
+    def get(self, url, headers=None):
+        response = self.client.get(url, headers=headers)
+        return response.status_code, response.headers
+
+    def run(self, urls, headers):
+        """顺序请求，返回 (样本列表, 总耗时秒)"""
+        samples = []
+        started = time.perf_counter()
+        for url in urls:
+            t0 = time.perf_counter()
+            response = self.client.get(url, headers=headers)
+            elapsed = time.perf_counter() - t0
+            samples.append((elapsed, response.status_code, _query_count(response.headers)))
+        return samples, time.perf_counter() - started
+
+
+class HTTPDriver:
+    """并发HTTP驱动，每个线程一个 requests.Session（保持连接）"""
+
+    name = 'http'
+
+    def __init__(self, base_url, concurrency=8, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        import requests
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def login(self, username, password):
+        response = self._session().post(f'{self.base_url}/api/auth/login',
+                                        json={'username': username, 'password': password},
+                                        timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f'登录失败: {response.status_code} {response.text[:200]}')
+        return response.json()['data']['token']
+
+    def get(self, url, headers=None):
+        response = self._session().get(self.base_url + url, headers=headers, timeout=self.timeout)
+        return response.status_code, response.headers
+
+    def _request(self, url, headers):
+        import requests
+
+        t0 = time.perf_counter()
+        try:
+            response = self._session().get(self.base_url + url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            return time.perf_counter() - t0, 0, None
+        # 读完响应体才算一次完整请求
+        response.content
+        return time.perf_counter() - t0, response.status_code, _query_count(response.headers)
+
+    def run(self, urls, headers):
+        """concurrency 个线程并发请求，返回 (样本列表, 总耗时秒)"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            samples = list(pool.map(lambda url: self._request(url, headers), urls))
+        return samples, time.perf_counter() - started
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class GunicornServer:
+    """启动一个 gunicorn 进程跑 benchmark 配置，用作 HTTPDriver 的目标"""
+
+    def __init__(self, workers=4, port=None, env=None, startup_timeout=30):
+        self.workers = workers
+        self.port = port or _free_port()
+        self.env = env or {}
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        import requests
+
+        env = dict(os.environ, **self.env)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-w', str(self.workers),
+             '-b', f'127.0.0.1:{self.port}', '--log-level', 'warning',
+             "app:create_app('benchmark')"],
+            cwd=BACKEND_DIR, env=env
+        )
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn 启动失败，退出码 {self.process.returncode}（是否已安装gunicorn？）')
+            try:
+                requests.get(f'{self.base_url}/api/categories', timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f'gunicorn 在 {self.startup_timeout} 秒内未就绪')
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+结果统计与基线对比
+
+每个场景输出吞吐量、p50/p95/p99等延迟分位（毫秒）、错误数和每请求SQL条数（中位数）。
+与基线对比时：p95 变慢或吞吐下降超过阈值、或SQL条数增加，都算回归。
+SQL条数与机器无关，是最稳定的回归信号；延迟受机器和负载影响，阈值不宜设得太小。
+"""
+
+import json
+
+
+def percentile(sorted_values, p):
+    """线性插值分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def summarize(samples, elapsed):
+    """
+    汇总一个场景的样本
+
+    Args:
+        samples: [(耗时秒, 状态码, SQL条数)]
+        elapsed: 发完全部请求的总耗时（秒）
+    """
+    latencies = sorted(s[0] * 1000 for s in samples)
+    errors = sum(1 for s in samples if not s[1] or s[1] >= 400)
+    queries = sorted(s[2] for s in samples if s[2] is not None)
+
+    def ms(value):
+        return round(value, 3) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed > 0 else None,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]) if latencies else None,
+        'db_queries': queries[len(queries) // 2] if queries else None,
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    与基线逐场景对比，返回 (对比行列表, 回归描述列表)
+
+    Args:
+        results: 本次结果（run 输出的JSON）
+        baseline: 基线结果
+        threshold: 允许的相对变化，0.2 表示 p95 慢20%以内、吞吐降20%以内不算回归
+    """
+    rows, regressions = [], []
+    for name, current in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            rows.append((name, current, None, '新场景'))
+            continue
+        notes = []
+        if current['p95_ms'] and base['p95_ms'] and current['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            notes.append(f'p95 {base["p95_ms"]}ms → {current["p95_ms"]}ms')
+        if (current['throughput_rps'] and base['throughput_rps']
+                and current['throughput_rps'] < base['throughput_rps'] * (1 - threshold)):
+            notes.append(f'吞吐 {base["throughput_rps"]} → {current["throughput_rps"]} req/s')
+        if (current['db_queries'] is not None and base['db_queries'] is not None
+                and current['db_queries'] > base['db_queries']):
+            notes.append(f'SQL {base["db_queries"]} → {current["db_queries"]} 条')
+        if current['errors'] > base['errors']:
+            notes.append(f'错误 {base["errors"]} → {current["errors"]}')
+        if notes:
+            regressions.append(f'{name}: ' + '；'.join(notes))
+        rows.append((name, current, base, '；'.join(notes) or 'OK'))
+    return rows, regressions
+
+
+def _ratio(current, base, key):
+    if not base or not base.get(key) or current.get(key) is None:
+        return ''
+    return f'{(current[key] / base[key] - 1) * 100:+.0f}%'
+
+
+def format_table(results, rows=None):
+    """终端输出的结果表"""
+    header = f'{"场景":<28}{"req/s":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"SQL":>5}{"错误":>6}'
+    if rows is not None:
+        header += f'{"Δp95":>8}{"Δreq/s":>8}  结论'
+    lines = [header]
+    if rows is None:
+        rows = [(name, current, None, None) for name, current in results['scenarios'].items()]
+    for name, current, base, note in rows:
+        line = (f'{name:<28}{current["throughput_rps"] or 0:>9.1f}{current["p50_ms"] or 0:>9.2f}'
+                f'{current["p95_ms"] or 0:>9.2f}{current["p99_ms"] or 0:>9.2f}'
+                f'{current["db_queries"] if current["db_queries"] is not None else "-":>5}{current["errors"]:>6}')
+        if note is not None:
+            line += f'{_ratio(current, base, "p95_ms"):>8}{_ratio(current, base, "throughput_rps"):>8}  {note}'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
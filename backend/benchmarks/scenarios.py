@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+压测场景
+
+每个场景是一个接口的一种典型请求，路径里的 {slug}、{post_id} 等占位符
+按请求序号轮流取自数据集（见 corpus.load_context），避免所有请求落在同一条数据上。
+"""
+
+
+class Scenario:
+    """一个压测场景"""
+
+    def __init__(self, name, path, admin=False, revalidate=False):
+        """
+        Args:
+            name: 场景名，结果和基线按它对应
+            path: 路径模板
+            admin: 是否带管理员Token
+            revalidate: 是否带上首个响应的ETag发条件请求（测304路径）
+        """
+        self.name = name
+        self.path = path
+        self.admin = admin
+        self.revalidate = revalidate
+
+    def url(self, context, index):
+        values = {}
+        for key, choices in context.items():
+            if isinstance(choices, list) and choices and '{%s}' % key in self.path:
+                values[key] = choices[index % len(choices)]
+        return self.path.format(**values)
+
+
+SCENARIOS = [
+    # 公开接口
+    Scenario('posts_list', '/api/posts'),
+    Scenario('posts_list_page', '/api/posts?page={page}'),
+    Scenario('posts_list_cursor', '/api/posts?cursor=&per_page=20'),
+    Scenario('posts_by_views', '/api/posts?sort=views'),
+    Scenario('posts_by_category', '/api/posts?category_id={category_id}'),
+    Scenario('posts_by_tag', '/api/posts?tag_id={tag_id}'),
+    Scenario('posts_search', '/api/posts?keyword={keyword}'),
+    Scenario('posts_list_304', '/api/posts', revalidate=True),
+    Scenario('post_detail', '/api/posts/{slug}'),
+    Scenario('comments_flat', '/api/posts/{post_id}/comments'),
+    Scenario('comments_tree', '/api/posts/{post_id}/comments?tree=1'),
+    Scenario('archives', '/api/archives'),
+    Scenario('categories', '/api/categories'),
+    Scenario('tags', '/api/tags'),
+    Scenario('tech_resources', '/api/test-tech-resources'),
+    Scenario('tech_resource_categories', '/api/test-tech-resources/categories'),
+    Scenario('tech_resource_detail', '/api/test-tech-resources/{resource_id}'),
+    # 需要登录 / 管理员
+    Scenario('auth_me', '/api/auth/me', admin=True),
+    Scenario('admin_logs', '/api/admin/logs', admin=True),
+    Scenario('admin_logs_by_status', '/api/admin/logs?status_code=500', admin=True),
+    Scenario('admin_logs_by_user', '/api/admin/logs?user_id={user_id}', admin=True),
+    Scenario('admin_log_stats', '/api/admin/logs/stats', admin=True),
+    Scenario('admin_users', '/api/admin/users', admin=True),
+    Scenario('admin_user_stats', '/api/admin/users/stats', admin=True),
+]
+
+
+def select(patterns=None):
+    """按名称前缀或子串筛选场景，未指定时返回全部"""
+    if not patterns:
+        return list(SCENARIOS)
+    return [s for s in SCENARIOS if any(p in s.name for p in patterns)]
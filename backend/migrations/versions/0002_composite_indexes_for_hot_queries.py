@@ -0,0 +1,40 @@
+"""热点查询的复合索引
+
+- 评论列表：文章下已审核的根评论按时间分页
+- 分类页：已发布文章按分类、发布时间分页
+- 管理后台日志：按状态码或用户筛选后按时间倒序
+- 用户统计：按作者统计文章数、评论数
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 04:52:56.360478
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_comments_post_parent_approved_created', 'comments',
+                    ['post_id', 'parent_id', 'is_approved', 'created_at'])
+    op.create_index('ix_comments_user_id', 'comments', ['user_id'])
+    op.create_index('ix_posts_published_category_published_at', 'posts',
+                    ['is_published', 'category_id', 'published_at'])
+    op.create_index('ix_posts_user_id', 'posts', ['user_id'])
+    op.create_index('ix_api_logs_status_created', 'api_logs', ['status_code', 'created_at'])
+    op.create_index('ix_api_logs_user_created', 'api_logs', ['user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_api_logs_user_created', table_name='api_logs')
+    op.drop_index('ix_api_logs_status_created', table_name='api_logs')
+    op.drop_index('ix_posts_user_id', table_name='posts')
+    op.drop_index('ix_posts_published_category_published_at', table_name='posts')
+    op.drop_index('ix_comments_user_id', table_name='comments')
+    op.drop_index('ix_comments_post_parent_approved_created', table_name='comments')
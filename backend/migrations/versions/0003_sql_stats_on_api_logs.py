@@ -0,0 +1,28 @@
+"""API日志记录请求的SQL条数和耗时
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 05:20:11.402317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('api_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('db_query_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('db_time', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('api_logs', schema=None) as batch_op:
+        batch_op.drop_column('db_time')
+        batch_op.drop_column('db_query_count')
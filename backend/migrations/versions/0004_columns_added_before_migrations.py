@@ -0,0 +1,98 @@
+"""补齐引入迁移之前新增的列、表和索引
+
+- 冗余计数：posts.comment_count，categories/tags.published_post_count
+- 分类/标签目录的修改时间：categories/tags.updated_at
+- Token吊销：users.token_version
+- 日志预聚合：api_log_rollups
+- 楼中楼物化路径：comments.root_id/path
+- 列表排序、登录记录、日志清理用到的索引
+
+这些对象在引入迁移之前直接写进了模型，用当时版本建出的开发库已经有了，
+因此逐个检查，已存在的跳过。分类/标签的修改时间在这里回填；
+计数、评论路径和预聚合需要应用代码重建，flask init-db 从更早版本升级时会自动执行，
+直接用 flask db upgrade 升级的请随后执行 flask recount、flask rebuild-comment-paths
+和 flask rebuild-log-rollups。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:12:40.118263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def columns():
+    """(表, 列)；每次新建Column对象，一个Column只能属于一张表"""
+    return [
+        ('posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False)),
+        ('categories', sa.Column('published_post_count', sa.Integer(), server_default='0', nullable=False)),
+        ('categories', sa.Column('updated_at', sa.DateTime(), nullable=True)),
+        ('tags', sa.Column('published_post_count', sa.Integer(), server_default='0', nullable=False)),
+        ('tags', sa.Column('updated_at', sa.DateTime(), nullable=True)),
+        ('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False)),
+        ('comments', sa.Column('root_id', sa.Integer(), nullable=True)),
+        ('comments', sa.Column('path', sa.String(length=660), nullable=True)),
+    ]
+
+
+# (表, 索引名, 列)
+INDEXES = [
+    ('posts', 'ix_posts_published_created_at', ['is_published', 'created_at']),
+    ('posts', 'ix_posts_published_published_at', ['is_published', 'published_at']),
+    ('posts', 'ix_posts_published_view_count', ['is_published', 'view_count']),
+    ('posts', 'ix_posts_updated_at', ['updated_at']),
+    ('comments', 'ix_comments_root_path', ['root_id', 'path']),
+    ('login_logs', 'ix_login_logs_user_status_created', ['user_id', 'login_status', 'created_at']),
+    ('api_logs', 'ix_api_logs_created_at', ['created_at']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table, column in columns():
+        if column.name not in {c['name'] for c in inspector.get_columns(table)}:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.add_column(column)
+
+    for table, name, index_columns in INDEXES:
+        if name not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, index_columns, unique=False)
+
+    if not inspector.has_table('api_log_rollups'):
+        op.create_table('api_log_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('method', sa.String(length=10), nullable=False),
+        sa.Column('route', sa.String(length=200), nullable=False),
+        sa.Column('status_class', sa.String(length=5), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('latency_sum', sa.Float(), nullable=False),
+        sa.Column('latency_min', sa.Float(), nullable=True),
+        sa.Column('latency_max', sa.Float(), nullable=True),
+        sa.Column('latency_sketch', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket_start', 'method', 'route', 'status_class', name='uq_api_log_rollups_bucket')
+        )
+
+    # 目录快照用最近修改时间做条件请求水位，已有分类/标签以创建时间为准
+    for table in ('categories', 'tags'):
+        op.execute(f'UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL')
+
+
+def downgrade():
+    op.drop_table('api_log_rollups')
+    for table, name, index_columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table, column in reversed(columns()):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column(column.name)
@@ -4,12 +4,11 @@ from urllib.parse import urlparse
 
 import requests
 from bs4 import BeautifulSoup
-from markdown import markdown as md_to_html
-import bleach
 
 from app import create_app, db
 from app.models import User, Post, Category, Tag
 from app.models.post import now_utc
+from app.utils.render import render_markdown
 
 
 DEFAULT_URLS = [
@@ -92,11 +91,7 @@ def extract_title_and_content(url: str):
     host = urlparse(url).netloc
     src = f"\n\n> 来源：[{host}]({url})"
     content_md = (content_md + src).strip()
-    allowed_tags = ['p', 'br', 'strong', 'em', 'h1', 'h2', 'h3', 'h4',
-                    'ul', 'ol', 'li', 'blockquote', 'code', 'pre', 'a']
-    allowed_attrs = {'a': ['href', 'title']}
-    content_html = bleach.clean(md_to_html(content_md, extensions=['extra', 'codehilite']),
-                                tags=allowed_tags, attributes=allowed_attrs)
+    content_html = render_markdown(content_md)
     return title or host, content_md, content_html
 
 
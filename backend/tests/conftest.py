@@ -2,7 +2,7 @@ import os
 import sys
 import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from app import create_app, db
+from app import create_app, db, init_db
 from app.models import User
 
 
@@ -10,8 +10,9 @@ from app.models import User
 def app():
     os.environ["FLASK_CONFIG"] = "testing"
     application = create_app("testing")
+    # 与部署一致：按迁移脚本建表并创建全文索引
+    init_db(application, seed=False)
     with application.app_context():
-        db.create_all()
         yield application
         db.session.remove()
         db.drop_all()
@@ -37,3 +38,54 @@ def admin_token(app, client):
     assert r.status_code == 200
     data = r.get_json()
     return data["data"]["token"]
+
+
+def login(client, username, password):
+    r = client.post("/api/auth/login", json={"username": username, "password": password})
+    assert r.status_code == 200
+    return r.get_json()["data"]["token"]
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def comment(client, token, post_id, content, parent_id=None):
+    """通过接口发表评论，返回评论id"""
+    r = client.post(f"/api/posts/{post_id}/comments", json={"content": content, "parent_id": parent_id},
+                    headers=auth(token))
+    assert r.status_code == 200
+    return r.get_json()["data"]["id"]
+
+
+@pytest.fixture()
+def make_user(app, client):
+    """创建用户并登录，返回 (用户id, token)"""
+    def factory(username, is_admin=False):
+        with app.app_context():
+            u = User(username=username, email=f"{username}@test.com", is_admin=is_admin, is_active=True)
+            u.set_password("secret123")
+            db.session.add(u)
+            db.session.commit()
+            user_id = u.id
+        return user_id, login(client, username, "secret123")
+    return factory
+
+
+@pytest.fixture()
+def make_post(client, admin_token):
+    """通过接口发布一篇文章，返回文章字典"""
+    def factory(title, content=None):
+        data = {"title": title, "content": content or f"{title}正文", "is_published": True}
+        r = client.post("/api/posts", json=data, headers=auth(admin_token))
+        assert r.status_code == 200
+        return r.get_json()["data"]
+    return factory
+
+
+@pytest.fixture()
+def memory_cache(monkeypatch):
+    """测试配置不缓存响应，需要验证缓存行为时换成内存后端"""
+    from app.utils.response_cache import response_cache, MemoryBackend
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend())
+    return response_cache
@@ -0,0 +1,35 @@
+"""
+Token吊销测试
+
+权限或启用状态变化后，users.token_version 自增，之前签发的Token立即失效。
+"""
+from app import db
+from app.models import User
+
+from conftest import auth, login
+
+
+def test_demoted_admin_token_is_rejected(app, client, admin_token, make_user):
+    user_id, token = make_user("demoted_admin", is_admin=True)
+    assert client.get("/api/admin/users", headers=auth(token)).status_code == 200
+
+    r = client.put(f"/api/admin/users/{user_id}/toggle-admin", headers=auth(admin_token))
+    assert r.get_json()["data"]["is_admin"] is False
+
+    # 旧Token已吊销
+    assert client.get("/api/admin/users", headers=auth(token)).status_code == 401
+    # 重新登录拿到的是普通用户Token
+    token = login(client, "demoted_admin", "secret123")
+    assert client.get("/api/auth/me", headers=auth(token)).status_code == 200
+    assert client.get("/api/admin/users", headers=auth(token)).status_code == 403
+
+
+def test_disabled_user_token_is_rejected(app, client, make_user):
+    user_id, token = make_user("disabled_user")
+    assert client.get("/api/auth/me", headers=auth(token)).status_code == 200
+
+    with app.app_context():
+        db.session.get(User, user_id).is_active = False
+        db.session.commit()
+
+    assert client.get("/api/auth/me", headers=auth(token)).status_code == 401
@@ -0,0 +1,45 @@
+"""
+命令行工具测试
+"""
+from app import db
+from app.models import Post
+
+
+def test_rerender_posts_invalidates_post_etags(app, client, make_post, tmp_path):
+    post = make_post("重新渲染")
+    url = f"/api/posts/{post['slug']}"
+    with app.app_context():
+        db.session.get(Post, post["id"]).content_html = "<p>旧的渲染结果</p>"
+        db.session.commit()
+    etag = client.get(url).headers["ETag"]
+
+    result = app.test_cli_runner().invoke(args=[
+        "rerender-posts", "--workers", "1", "--checkpoint", str(tmp_path / "checkpoint")
+    ])
+    assert result.exit_code == 0, result.output
+
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert "旧的渲染结果" not in r.get_json()["data"]["content_html"]
+
+
+def test_recount_invalidates_counts(app, client, make_post, memory_cache):
+    post = make_post("重新计数")
+    url = f"/api/posts/{post['slug']}"
+    with app.app_context():
+        before = db.session.get(Post, post["id"]).updated_at
+        # 绕过会话事件写入错误的计数
+        db.session.execute(Post.__table__.update().where(Post.__table__.c.id == post["id"])
+                           .values(comment_count=7, updated_at=Post.__table__.c.updated_at))
+        db.session.commit()
+    assert client.get(url).get_json()["data"]["comment_count"] == 7
+    etag = client.get(url).headers["ETag"]
+
+    result = app.test_cli_runner().invoke(args=["recount"])
+    assert result.exit_code == 0, result.output
+
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.get_json()["data"]["comment_count"] == 0
+    with app.app_context():
+        assert db.session.get(Post, post["id"]).updated_at == before
@@ -0,0 +1,29 @@
+"""
+评论测试：楼中楼树形返回
+"""
+from app import db
+from app.models import Comment
+
+from conftest import comment
+
+
+def test_tree_skips_unapproved_subtrees(app, client, make_post, make_user):
+    post = make_post("楼中楼文章")
+    user_id, token = make_user("tree_user")
+
+    root = comment(client, token, post["id"], "一楼")
+    hidden = comment(client, token, post["id"], "待审核", parent_id=root)
+    comment(client, token, post["id"], "待审核下的回复", parent_id=hidden)
+    visible = comment(client, token, post["id"], "已审核", parent_id=root)
+    nested = comment(client, token, post["id"], "已审核下的回复", parent_id=visible)
+    with app.app_context():
+        db.session.get(Comment, hidden).is_approved = False
+        db.session.commit()
+
+    r = client.get(f"/api/posts/{post['id']}/comments?tree=1")
+    assert r.status_code == 200
+    [thread] = r.get_json()["data"]["items"]
+    assert thread["id"] == root
+    assert [reply["id"] for reply in thread["replies"]] == [visible]
+    assert [reply["id"] for reply in thread["replies"][0]["replies"]] == [nested]
+    assert thread["replies"][0]["replies"][0]["depth"] == 2
@@ -0,0 +1,39 @@
+"""
+冗余计数测试
+"""
+from app import db
+from app.models import Post
+
+from conftest import auth, comment
+
+
+def comment_count(app, post_id):
+    with app.app_context():
+        return db.session.get(Post, post_id).comment_count
+
+
+def test_comment_count_follows_create_and_delete(app, client, make_post, make_user):
+    post = make_post("计数文章")
+    user_id, token = make_user("counter_user")
+
+    root = comment(client, token, post["id"], "一楼")
+    comment(client, token, post["id"], "回复", parent_id=root)
+    leaf = comment(client, token, post["id"], "二楼")
+    assert comment_count(app, post["id"]) == 3
+    assert client.get(f"/api/posts/{post['slug']}").get_json()["data"]["comment_count"] == 3
+
+    assert client.delete(f"/api/comments/{leaf}", headers=auth(token)).status_code == 200
+    assert comment_count(app, post["id"]) == 2
+    assert client.get(f"/api/posts/{post['slug']}").get_json()["data"]["comment_count"] == 2
+
+
+def test_comment_keeps_post_updated_at(app, client, make_post, make_user):
+    post = make_post("评论不改修改时间")
+    user_id, token = make_user("updated_at_user")
+    with app.app_context():
+        before = db.session.get(Post, post["id"]).updated_at
+
+    leaf = comment(client, token, post["id"], "评论")
+    client.delete(f"/api/comments/{leaf}", headers=auth(token))
+    with app.app_context():
+        assert db.session.get(Post, post["id"]).updated_at == before
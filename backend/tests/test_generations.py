@@ -0,0 +1,41 @@
+"""
+共享版本号测试
+
+两个 FileStore 指向同一目录即模拟同机的两个worker。
+"""
+from app.utils.generations import FileStore, GenerationCache, generations
+
+
+def test_file_store_is_shared_between_workers(tmp_path):
+    worker_a = FileStore(str(tmp_path))
+    worker_b = FileStore(str(tmp_path))
+    assert worker_a.epoch == worker_b.epoch
+    assert worker_b.get(('catalog', 'archives')) == (0, 0)
+
+    worker_a.bump(('catalog',))
+    worker_a.bump(('catalog', 'archives'))
+    assert worker_b.get(('catalog', 'archives')) == (2, 1)
+
+
+class CountingCache(GenerationCache):
+    name = 'counting'
+
+    def __init__(self):
+        super().__init__(ttl=300)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return self.builds
+
+
+def test_cache_rebuilds_after_other_worker_bumps(tmp_path, monkeypatch):
+    monkeypatch.setattr(generations, 'store', FileStore(str(tmp_path)))
+    cache = CountingCache()
+    assert cache.get() == 1
+    assert cache.get() == 1
+
+    # 另一个worker提交了修改
+    FileStore(str(tmp_path)).bump(('counting',))
+    assert cache.get() == 2
+    assert cache.get() == 2
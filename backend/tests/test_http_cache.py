@@ -0,0 +1,43 @@
+"""
+条件请求测试
+"""
+from conftest import auth
+
+
+def test_if_none_match_returns_304(client, make_post, make_user):
+    post = make_post("条件请求")
+    for url in ("/api/posts", f"/api/posts/{post['slug']}", "/api/archives", "/api/categories"):
+        r = client.get(url)
+        etag = r.headers["ETag"]
+        assert etag.startswith('W/')
+
+        r = client.get(url, headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.get_data() == b""
+
+    # 评论让 posts 版本号加一，旧ETag不再匹配
+    r = client.get("/api/posts")
+    etag = r.headers["ETag"]
+    user_id, token = make_user("etag_commenter")
+    client.post(f"/api/posts/{post['id']}/comments", json={"content": "评论"}, headers=auth(token))
+    r = client.get("/api/posts", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_post_detail_leaves_view_count_to_views_endpoint(client, make_post):
+    post = make_post("浏览量单独获取")
+    r = client.get(f"/api/posts/{post['slug']}")
+    assert "view_count" not in r.get_json()["data"]
+    etag = r.headers["ETag"]
+
+    # 浏览不让ETag失效，304同样计数，浏览量从单独的接口读到最新值
+    for _ in range(3):
+        r = client.get(f"/api/posts/{post['slug']}", headers={"If-None-Match": etag})
+        assert r.status_code == 304
+    r = client.get(f"/api/posts/{post['id']}/views")
+    assert r.status_code == 200
+    assert r.get_json()["data"] == {"id": post["id"], "view_count": 4}
+    assert "ETag" not in r.headers
+
+    assert client.get("/api/posts/999999/views").status_code == 404
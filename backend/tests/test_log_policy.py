@@ -0,0 +1,144 @@
+"""
+API日志策略测试：采样规则、内容记录、截断与打码
+"""
+import json
+from types import SimpleNamespace
+
+from flask import jsonify, request
+from sqlalchemy import func, select
+
+from app import db
+from app.models import APILog, APILogRollup
+from app.utils.log_policy import LogPolicy, log_policy, truncated_json
+
+
+def make_policy(**config):
+    policy = LogPolicy()
+    policy.init_app(SimpleNamespace(config=config))
+    return policy
+
+
+def test_sampling_rules_match_first_rule_in_order():
+    policy = make_policy(API_LOG_SAMPLING=[
+        ('*', '*', '5xx', 1.0),
+        ('GET', '/api/posts*', '2xx', 0.25),
+        ('GET', '*', 200, 0.0),
+        ('POST', '*', '*', 0.5),
+    ])
+    assert policy.sample_rate('GET', '/api/posts', 500) == 1.0
+    assert policy.sample_rate('POST', '/api/posts', 503) == 1.0
+    assert policy.sample_rate('GET', '/api/posts/<slug>', 200) == 0.25
+    assert policy.sample_rate('GET', '/api/categories', 200) == 0.0
+    assert policy.sample_rate('POST', '/api/auth/login', 401) == 0.5
+    # 状态码精确匹配，未匹配任何规则时全部记录
+    assert policy.sample_rate('GET', '/api/categories', 204) == 1.0
+    assert policy.sample_rate('DELETE', None, 404) == 1.0
+
+
+def test_sampled_honours_zero_and_full_rates(monkeypatch):
+    policy = make_policy(API_LOG_SAMPLING=[('GET', '*', '2xx', 0.0), ('GET', '*', '3xx', 0.5)])
+    monkeypatch.setattr('app.utils.log_policy.random.random', lambda: 0.4)
+    assert not policy.sampled('GET', '/api/posts', 200)
+    assert policy.sampled('GET', '/api/posts', 304)
+    assert policy.sampled('GET', '/api/posts', 404)
+    monkeypatch.setattr('app.utils.log_policy.random.random', lambda: 0.6)
+    assert not policy.sampled('GET', '/api/posts', 304)
+
+
+def test_excluded_paths_and_methods():
+    policy = make_policy(API_LOG_EXCLUDE_PATHS=['/health', '/static/'], API_LOG_EXCLUDE_METHODS=['options'])
+    assert policy.excluded('GET', '/health')
+    assert policy.excluded('GET', '/static/app.js')
+    assert policy.excluded('OPTIONS', '/api/posts')
+    assert not policy.excluded('GET', '/api/posts')
+
+
+def test_capture_payload_modes():
+    errors = make_policy(API_LOG_CAPTURE_PAYLOADS='errors', API_LOG_CAPTURE_ROUTES=['/api/auth/*'])
+    assert errors.capture_payload('/api/posts', 400)
+    assert errors.capture_payload('/api/posts', 500)
+    assert not errors.capture_payload('/api/posts', 200)
+    assert not errors.capture_payload('/api/posts', 304)
+    # 白名单路由始终记录
+    assert errors.capture_payload('/api/auth/login', 200)
+
+    assert make_policy(API_LOG_CAPTURE_PAYLOADS='all').capture_payload('/api/posts', 200)
+    assert not make_policy(API_LOG_CAPTURE_PAYLOADS='none').capture_payload('/api/posts', 500)
+
+
+def test_truncated_json_stops_encoding_at_limit():
+    # 超出上限的部分不会被编码，不可序列化的尾部也就不会报错
+    data = ['中文' * 10, {'nested': list(range(100))}, object()]
+    text = truncated_json(data, 30)
+    assert len(text) == 30
+    assert text == json.dumps(data[:2], ensure_ascii=False)[:30]
+    assert truncated_json({'a': 1}, 100) == '{"a": 1}'
+
+
+def test_request_payload_redacts_nested_fields_and_truncates(app):
+    policy = make_policy(API_LOG_REDACT_FIELDS=['Password', 'token'], API_LOG_PAYLOAD_LIMIT=1000)
+    body = {'username': 'alice', 'PASSWORD': 'secret', 'items': [{'token': 'abc', 'id': 1}]}
+    with app.test_request_context(method='POST', json=body):
+        payload = json.loads(policy.request_payload(request))
+    assert payload == {'username': 'alice', 'PASSWORD': '***', 'items': [{'token': '***', 'id': 1}]}
+
+    policy.payload_limit = 20
+    with app.test_request_context(method='POST', json={'content': 'x' * 100, 'password': 'secret'}):
+        text = policy.request_payload(request)
+    assert len(text) == 20
+    assert 'secret' not in text
+
+    with app.test_request_context(method='POST', data='not json'):
+        assert policy.request_payload(request) is None
+
+
+def test_response_payload_truncates_by_characters(app):
+    policy = make_policy(API_LOG_PAYLOAD_LIMIT=10)
+    response = jsonify({'message': '文章不存在文章不存在'})
+    text = policy.response_payload(response)
+    assert len(text) == 10
+    assert text == response.get_data(as_text=True)[:10]
+    assert policy.response_payload(app.response_class('plain')) is None
+
+
+def _rollup_count(route):
+    table = APILogRollup.__table__
+    return db.session.execute(
+        select(func.coalesce(func.sum(table.c.count), 0))
+        .where(table.c.granularity == 'day', table.c.route == route, table.c.method == 'GET')
+    ).scalar()
+
+
+def _raw_log_count(path):
+    return APILog.query.filter_by(path=path).count()
+
+
+def test_unsampled_requests_reach_rollup_without_raw_log(client, monkeypatch):
+    monkeypatch.setattr(log_policy, 'rules', [('GET', '/api/categories', '2xx', 0.0)])
+    monkeypatch.setattr(log_policy, '_rates', {})
+    rollup_before = _rollup_count('/api/categories')
+    raw_before = _raw_log_count('/api/categories')
+
+    for _ in range(3):
+        assert client.get('/api/categories').status_code == 200
+
+    assert _rollup_count('/api/categories') == rollup_before + 3
+    assert _raw_log_count('/api/categories') == raw_before
+
+
+def test_error_responses_store_redacted_payloads(client, monkeypatch):
+    monkeypatch.setattr(log_policy, 'rules', [])
+    monkeypatch.setattr(log_policy, '_rates', {})
+    monkeypatch.setattr(log_policy, 'capture', 'errors')
+
+    r = client.post('/api/auth/login', json={'username': 'nobody', 'password': 'hunter2'})
+    assert r.status_code >= 400
+    log = APILog.query.filter_by(path='/api/auth/login').order_by(APILog.id.desc()).first()
+    assert json.loads(log.request_data) == {'username': 'nobody', 'password': '***'}
+    assert log.response_data == r.get_data(as_text=True)[:log_policy.payload_limit]
+
+    # 成功的请求只记元数据，不记内容
+    client.get('/api/categories')
+    log = APILog.query.filter_by(path='/api/categories').order_by(APILog.id.desc()).first()
+    assert log.status_code == 200
+    assert log.request_data is None and log.response_data is None
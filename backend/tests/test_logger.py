@@ -0,0 +1,126 @@
+"""
+API日志后台写入器测试
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+
+from app.models import APILog
+from app.utils.logger import APILogWriter
+
+
+def make_writer(app, batch_size=3, flush_interval=10.0, queue_size=100):
+    """不调用init_app，避免注册退出钩子"""
+    writer = APILogWriter()
+    writer.app = app
+    writer.batch_size = batch_size
+    writer.flush_interval = flush_interval
+    writer._queue = queue.Queue(maxsize=queue_size)
+    return writer
+
+
+def record(path, sampled=True):
+    return {'method': 'GET', 'path': path, 'route': path, 'status_code': 200,
+            'response_time': 0.01, 'created_at': datetime.utcnow(), 'sampled': sampled}
+
+
+def capture_batches(writer, monkeypatch):
+    batches = []
+    monkeypatch.setattr(writer, '_write', lambda batch: batches.append([r['path'] for r in batch]))
+    return batches
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_batches_by_size_and_drains_on_shutdown(app, monkeypatch):
+    writer = make_writer(app, batch_size=3)
+    batches = capture_batches(writer, monkeypatch)
+    for i in range(7):
+        assert writer.enqueue(record(f'/size/{i}'))
+
+    assert wait_for(lambda: len(batches) == 2)
+    assert batches == [['/size/0', '/size/1', '/size/2'], ['/size/3', '/size/4', '/size/5']]
+
+    writer.shutdown()
+    assert batches[2:] == [['/size/6']]
+    assert not writer._thread.is_alive()
+    assert writer.enqueued == 7
+
+
+def test_batches_by_interval(app, monkeypatch):
+    writer = make_writer(app, batch_size=100, flush_interval=0.05)
+    batches = capture_batches(writer, monkeypatch)
+    writer.enqueue(record('/interval/0'))
+    writer.enqueue(record('/interval/1'))
+
+    assert wait_for(lambda: batches == [['/interval/0', '/interval/1']])
+    writer.shutdown()
+
+
+def test_drops_and_counts_when_queue_is_full(app, monkeypatch):
+    writer = make_writer(app, queue_size=2)
+    # 不启动写入线程，队列不会被消费
+    monkeypatch.setattr(writer, '_ensure_worker', lambda: None)
+    results = [writer.enqueue(record(f'/full/{i}')) for i in range(5)]
+    assert results == [True, True, False, False, False]
+    assert (writer.enqueued, writer.dropped) == (2, 3)
+
+
+def test_counters_are_thread_safe(app, monkeypatch):
+    writer = make_writer(app, queue_size=1)
+    monkeypatch.setattr(writer, '_ensure_worker', lambda: None)
+    threads = [threading.Thread(target=lambda: [writer.enqueue(record('/race')) for _ in range(2000)])
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.enqueued + writer.dropped == 16000
+
+
+def test_shutdown_writes_remaining_records_to_database(app):
+    writer = make_writer(app, batch_size=100)
+    paths = [f'/drain/{i}' for i in range(5)]
+    for path in paths:
+        writer.enqueue(record(path))
+    # 未采样的请求只进预聚合，不写原始日志
+    writer.enqueue(record('/drain/unsampled', sampled=False))
+    writer.shutdown()
+
+    assert writer.written == 5
+    stored = {log.path for log in APILog.query.filter(APILog.path.like('/drain/%'))}
+    assert stored == set(paths)
+
+
+def test_shutdown_timeout_leaves_queue_to_running_thread(app, monkeypatch):
+    writer = make_writer(app, batch_size=1)
+    release = threading.Event()
+    active = []
+    batches = []
+
+    def slow_write(batch):
+        active.append(1)
+        assert len(active) == 1, '两个消费者同时在写'
+        release.wait(2)
+        batches.append([r['path'] for r in batch])
+        active.pop()
+
+    monkeypatch.setattr(writer, '_write', slow_write)
+    writer.enqueue(record('/slow/0'))
+    assert wait_for(lambda: active)
+    writer.enqueue(record('/slow/1'))
+
+    writer.shutdown(timeout=0.05)
+    # 写入线程还没退出，shutdown不能自己去取队列
+    assert batches == []
+    assert [r['path'] for r in list(writer._queue.queue) if isinstance(r, dict)] == ['/slow/1']
+
+    release.set()
+    writer._thread.join(2)
+    assert batches == [['/slow/0'], ['/slow/1']]
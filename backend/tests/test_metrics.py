@@ -0,0 +1,80 @@
+"""
+运行指标测试：每个worker一个内存映射文件，抓取时汇总整个目录
+"""
+import os
+import subprocess
+import sys
+
+from app.utils.metrics import (
+    CACHE_HITS, REQUEST_DB_QUERIES, REQUESTS, MmapStore, metrics
+)
+
+
+def exited_pid():
+    """一个已经退出的进程号，模拟重启前的worker"""
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def samples(text):
+    """解析Prometheus文本，返回 {样本行左侧: 数值}"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+
+def test_mmap_store_grows_and_reopens(tmp_path):
+    path = str(tmp_path / '1.db')
+    store = MmapStore(path)
+    # 键足够多，超过初始大小后扩容
+    for i in range(3000):
+        store.inc(f'key-{i}', i)
+    store.inc('key-7', 0.5)
+    store.set('gauge', 3)
+    assert os.path.getsize(path) > MmapStore.INITIAL_SIZE
+
+    reopened = MmapStore(path)
+    values = dict(reopened.items())
+    assert len(values) == 3001
+    assert values['key-7'] == 7.5
+    assert values['key-2999'] == 2999
+    assert values['gauge'] == 3
+
+
+def test_metrics_sum_worker_files(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'directory', str(tmp_path))
+    monkeypatch.setattr(metrics, '_store', None)
+    monkeypatch.setattr(metrics, 'token', None)
+
+    requests = REQUESTS.labels('test.multiprocess', 'GET', 200)
+    queries = REQUEST_DB_QUERIES.labels('test.multiprocess')
+    cache_hits = CACHE_HITS.labels('test_multiprocess')
+
+    # 当前进程、存活的父进程、已退出的进程各一个文件
+    current = metrics.store()
+    live = MmapStore(str(tmp_path / f'{os.getppid()}.db'))
+    dead = MmapStore(str(tmp_path / f'{exited_pid()}.db'))
+    for store, count in ((current, 1), (live, 2), (dead, 4)):
+        store.inc(requests._key, count)
+        store.inc(queries._bucket_keys[0], count)
+        store.inc(queries._sum_key, count)
+        store.inc(queries._count_key, count)
+        store.set(cache_hits._key, count * 10)
+    # 目录里的其他文件不参与汇总
+    (tmp_path / 'notes.txt').write_text('ignored')
+
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    values = samples(r.get_data(as_text=True))
+
+    # 计数器和直方图累加全部文件，包括已退出worker的
+    assert values['http_requests_total{endpoint="test.multiprocess",method="GET",status="200"}'] == 7
+    assert values['http_request_db_queries_bucket{endpoint="test.multiprocess",le="1"}'] == 7
+    assert values['http_request_db_queries_bucket{endpoint="test.multiprocess",le="+Inf"}'] == 7
+    assert values['http_request_db_queries_count{endpoint="test.multiprocess"}'] == 7
+    # 同步来的计数只汇总存活进程
+    assert values['cache_hits_total{cache="test_multiprocess"}'] == 30
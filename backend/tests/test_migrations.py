@@ -0,0 +1,171 @@
+"""
+迁移升级测试
+
+用引入迁移之前 db.create_all() 建出的表结构（基线版本的模型）建库并写入数据，
+执行 init_db 后应升级到最新版本，新增的计数、路径、预聚合等数据已回填。
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import create_app, db, init_db
+from app.config import config, TestingConfig
+
+
+# 基线版本 create_all 在SQLite上生成的DDL
+BASELINE_DDL = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL, avatar VARCHAR(200), bio TEXT, website VARCHAR(200),
+    is_admin BOOLEAN, is_active BOOLEAN, created_at DATETIME, last_seen DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE categories (
+    id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, slug VARCHAR(50) NOT NULL,
+    description VARCHAR(200), created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (name)
+);
+CREATE UNIQUE INDEX ix_categories_slug ON categories (slug);
+CREATE TABLE tags (
+    id INTEGER NOT NULL, name VARCHAR(30) NOT NULL, slug VARCHAR(30) NOT NULL, created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (name)
+);
+CREATE UNIQUE INDEX ix_tags_slug ON tags (slug);
+CREATE TABLE test_tech_resources (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, url VARCHAR(500) NOT NULL, description TEXT,
+    category VARCHAR(50) NOT NULL, icon VARCHAR(200), is_recommended BOOLEAN, sort_order INTEGER,
+    created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE TABLE posts (
+    id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, slug VARCHAR(200) NOT NULL, summary TEXT,
+    content TEXT NOT NULL, content_html TEXT, user_id INTEGER NOT NULL, category_id INTEGER,
+    is_published BOOLEAN, view_count INTEGER, created_at DATETIME, updated_at DATETIME,
+    published_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id),
+    FOREIGN KEY(category_id) REFERENCES categories (id)
+);
+CREATE INDEX ix_posts_created_at ON posts (created_at);
+CREATE UNIQUE INDEX ix_posts_slug ON posts (slug);
+CREATE TABLE post_tags (
+    post_id INTEGER NOT NULL, tag_id INTEGER NOT NULL,
+    PRIMARY KEY (post_id, tag_id),
+    FOREIGN KEY(post_id) REFERENCES posts (id),
+    FOREIGN KEY(tag_id) REFERENCES tags (id)
+);
+CREATE TABLE comments (
+    id INTEGER NOT NULL, content TEXT NOT NULL, content_html TEXT, post_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL, parent_id INTEGER, is_approved BOOLEAN, created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(post_id) REFERENCES posts (id),
+    FOREIGN KEY(user_id) REFERENCES users (id),
+    FOREIGN KEY(parent_id) REFERENCES comments (id)
+);
+CREATE TABLE api_logs (
+    id INTEGER NOT NULL, method VARCHAR(10) NOT NULL, path VARCHAR(200) NOT NULL,
+    ip_address VARCHAR(50), user_agent VARCHAR(500), user_id INTEGER, status_code INTEGER,
+    response_time FLOAT, request_data TEXT, response_data TEXT, created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE TABLE login_logs (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, ip_address VARCHAR(50), user_agent VARCHAR(500),
+    login_type VARCHAR(20), login_status VARCHAR(20), fail_reason VARCHAR(200), created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+"""
+
+
+def seed_baseline(url):
+    now = datetime(2026, 1, 15, 12, 0, 0)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for statement in BASELINE_DDL.split(';'):
+            if statement.strip():
+                conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, password_hash, is_admin, is_active, created_at) "
+            "VALUES (1, 'old_admin', 'old@test.com', 'x', 1, 1, :now)"
+        ), {'now': now})
+        conn.execute(text("INSERT INTO categories (id, name, slug, created_at) VALUES (1, '旧分类', 'old', :now)"),
+                     {'now': now})
+        conn.execute(text("INSERT INTO tags (id, name, slug, created_at) VALUES (1, '旧标签', 'old', :now)"),
+                     {'now': now})
+        for post_id, published in ((1, 1), (2, 1), (3, 0)):
+            conn.execute(text(
+                "INSERT INTO posts (id, title, slug, content, user_id, category_id, is_published, "
+                "view_count, created_at, updated_at, published_at) "
+                "VALUES (:id, :title, :slug, '正文', 1, 1, :published, 0, :now, :now, :published_at)"
+            ), {'id': post_id, 'title': f'旧文章{post_id}', 'slug': f'old-post-{post_id}',
+                'published': published, 'now': now, 'published_at': now if published else None})
+            conn.execute(text("INSERT INTO post_tags (post_id, tag_id) VALUES (:id, 1)"), {'id': post_id})
+        # 文章1：一楼两层回复；文章2：一条根评论
+        for comment_id, post_id, parent_id in ((1, 1, None), (2, 1, 1), (3, 1, 2), (4, 2, None)):
+            conn.execute(text(
+                "INSERT INTO comments (id, content, post_id, user_id, parent_id, is_approved, created_at) "
+                "VALUES (:id, '评论', :post_id, 1, :parent_id, 1, :now)"
+            ), {'id': comment_id, 'post_id': post_id, 'parent_id': parent_id, 'now': now})
+        for i in range(3):
+            conn.execute(text(
+                "INSERT INTO api_logs (method, path, status_code, response_time, created_at) "
+                "VALUES ('GET', '/api/posts', 200, 0.01, :created_at)"
+            ), {'created_at': now - timedelta(minutes=i)})
+    engine.dispose()
+
+
+@pytest.fixture()
+def baseline_app(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    seed_baseline(url)
+    monkeypatch.setitem(config, 'baseline-upgrade',
+                        type('BaselineUpgradeConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': url}))
+    application = create_app('baseline-upgrade')
+    yield application
+    with application.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_upgrade_baseline_database(baseline_app):
+    from alembic.script import ScriptDirectory
+    from app import MIGRATIONS_DIR
+
+    init_db(baseline_app, seed=False)
+
+    with baseline_app.app_context():
+        def scalar(sql):
+            return db.session.execute(text(sql)).scalar()
+
+        head = ScriptDirectory(MIGRATIONS_DIR).get_current_head()
+        assert scalar("SELECT version_num FROM alembic_version") == head
+
+        # 冗余计数
+        assert scalar("SELECT comment_count FROM posts WHERE id = 1") == 3
+        assert scalar("SELECT comment_count FROM posts WHERE id = 2") == 1
+        assert scalar("SELECT published_post_count FROM categories WHERE id = 1") == 2
+        assert scalar("SELECT published_post_count FROM tags WHERE id = 1") == 2
+        assert scalar("SELECT updated_at FROM categories WHERE id = 1") is not None
+        assert scalar("SELECT token_version FROM users WHERE id = 1") == 0
+
+        # 评论物化路径
+        paths = dict(db.session.execute(text("SELECT id, path FROM comments")).all())
+        roots = dict(db.session.execute(text("SELECT id, root_id FROM comments")).all())
+        assert roots == {1: 1, 2: 1, 3: 1, 4: 4}
+        assert paths[3].startswith(paths[2]) and paths[2].startswith(paths[1])
+
+        # 日志预聚合
+        assert scalar("SELECT SUM(count) FROM api_log_rollups WHERE granularity = 'day'") == 3
+
+    client = baseline_app.test_client()
+    response = client.get('/api/posts/1/comments?tree=1')
+    assert response.status_code == 200
+    assert response.get_json()['data']['items'][0]['replies'][0]['replies'][0]['id'] == 3
+
+    # 再次执行是幂等的
+    init_db(baseline_app, seed=False)
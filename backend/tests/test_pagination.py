@@ -0,0 +1,113 @@
+"""
+游标分页测试：编码往返、相同排序值按id定位、正序/倒序、无效游标、省略总数
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, update
+
+from app import db
+from app.models import Category, Comment, Post
+from app.utils.pagination import CursorError, decode_cursor, encode_cursor
+from conftest import auth, comment
+
+
+def walk(client, url, per_page=2, **params):
+    """从第一页开始按next_cursor翻到底，返回所有id"""
+    ids, cursor, pages = [], '', 0
+    while True:
+        r = client.get(url, query_string=dict(params, cursor=cursor, per_page=per_page))
+        assert r.status_code == 200
+        data = r.get_json()['data']
+        ids.extend(item['id'] for item in data['items'])
+        pages += 1
+        if not data['has_more']:
+            assert data['next_cursor'] is None
+            return ids
+        cursor = data['next_cursor']
+        assert pages < 20
+
+
+def test_cursor_round_trip():
+    value = datetime(2026, 3, 1, 12, 30, 45, 123456)
+    cursor = encode_cursor([value, 42])
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor) == [value, 42]
+    assert decode_cursor(encode_cursor([17, 3])) == [17, 3]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor!',
+    encode_cursor([1]),
+    encode_cursor([1, 2, 3]),
+    encode_cursor([{'dt': 'yesterday'}, 1]),
+    encode_cursor([1, 2])[:-3],
+])
+def test_tampered_cursor_is_rejected(client, cursor):
+    with pytest.raises(CursorError):
+        decode_cursor(cursor)
+    r = client.get('/api/posts', query_string={'cursor': cursor})
+    assert r.status_code == 400
+
+
+def test_comment_cursor_breaks_ties_on_id(client, make_post, make_user):
+    post = make_post('游标同一时间')
+    _, token = make_user('cursor_commenter')
+    ids = [comment(client, token, post['id'], f'评论{i}') for i in range(5)]
+    # 所有根评论创建时间相同，只能靠id区分先后
+    db.session.execute(update(Comment).where(Comment.id.in_(ids)).values(created_at=datetime(2026, 3, 1)))
+    db.session.commit()
+
+    assert walk(client, f"/api/posts/{post['id']}/comments") == sorted(ids, reverse=True)
+
+
+def test_post_cursor_ascending_and_descending(client, admin_token):
+    category = Category(name='游标分类', slug='cursor-category')
+    db.session.add(category)
+    db.session.commit()
+    category_id = category.id
+
+    ids = []
+    for i in range(5):
+        r = client.post('/api/posts', json={'title': f'游标文章{i}', 'content': '正文', 'is_published': True,
+                                            'category_id': category_id}, headers=auth(admin_token))
+        assert r.status_code == 200
+        ids.append(r.get_json()['data']['id'])
+    # 两两相同的发布时间
+    published = [datetime(2026, 3, 2), datetime(2026, 3, 1), datetime(2026, 3, 2), datetime(2026, 3, 1),
+                 datetime(2026, 3, 3)]
+    for post_id, value in zip(ids, published):
+        db.session.execute(update(Post).where(Post.id == post_id).values(published_at=value))
+    db.session.commit()
+
+    expected = [post_id for _, post_id in sorted(zip(published, ids))]
+    assert walk(client, '/api/posts', category_id=category_id, order='asc') == expected
+    assert walk(client, '/api/posts', category_id=category_id) == expected[::-1]
+
+
+def test_with_total_false_skips_count(client, make_post):
+    make_post('省略总数')
+    r = client.get('/api/posts', query_string={'cursor': '', 'per_page': 1})
+    assert r.get_json()['data']['total'] >= 1
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        r = client.get('/api/posts', query_string={'cursor': '', 'per_page': 1, 'with_total': 'false'})
+        data = r.get_json()['data']
+        assert 'total' not in data
+        assert data['items']
+
+        r = client.get('/api/posts', query_string={'page': 1, 'with_total': '0'})
+        data = r.get_json()['data']
+        assert data['total'] is None and data['pages'] is None
+        assert data['items']
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    # 两种分页都不执行COUNT(*)
+    assert statements
+    assert not any('count(' in statement.lower() for statement in statements)
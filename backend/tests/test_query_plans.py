@@ -0,0 +1,141 @@
+"""
+查询计划回归测试
+
+对每个接口的主要查询执行 SQLite 的 EXPLAIN QUERY PLAN，
+热点表（文章、评论、日志）上出现不走索引的全表扫描即失败，防止索引被改掉或查询写法退化。
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import User, Post, Category, Tag, Comment, APILog, LoginLog
+
+# 会持续增长的表；分类、标签、用户、测试技术资源等小表全表扫描无所谓
+HOT_TABLES = {'posts', 'comments', 'api_logs', 'login_logs', 'post_tags'}
+
+_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+@pytest.fixture(scope="module")
+def seeded(app):
+    """准备少量数据，保证各接口都会执行到主要查询"""
+    with app.app_context():
+        user = User.query.filter_by(username="planner").first()
+        if user is None:
+            user = User(username="planner", email="planner@test.com")
+            user.set_password("planner123")
+            db.session.add(user)
+            db.session.commit()
+
+        category = Category(name="计划分类")
+        tag = Tag(name="计划标签")
+        db.session.add_all([category, tag])
+        db.session.flush()
+
+        post = Post(title="查询计划", content="正文", user_id=user.id,
+                    category_id=category.id, is_published=True)
+        post.tags.append(tag)
+        db.session.add(post)
+        db.session.flush()
+
+        root = Comment(content="根评论", post_id=post.id, user_id=user.id)
+        db.session.add(root)
+        db.session.flush()
+        db.session.add(Comment(content="回复", post_id=post.id, user_id=user.id, parent_id=root.id))
+
+        now = datetime.utcnow()
+        db.session.add_all([
+            APILog(method="GET", path="/api/posts", user_id=user.id, status_code=200,
+                   response_time=0.01, created_at=now - timedelta(minutes=i))
+            for i in range(3)
+        ])
+        db.session.add(LoginLog(user_id=user.id, login_status="success", created_at=now))
+        db.session.commit()
+        return {
+            'user_id': user.id,
+            'post_id': post.id,
+            'slug': post.slug,
+            'category_id': category.id,
+            'tag_id': tag.id
+        }
+
+
+@contextmanager
+def capture_selects(app):
+    """记录代码块内执行的SELECT语句及参数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def full_scans(app, statements):
+    """返回 [(语句, 计划行)]：热点表上不走索引的全表扫描"""
+    found = []
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+                for row in plan:
+                    detail = row[-1]
+                    match = _SCAN_RE.match(detail)
+                    if not match or "USING" in detail:
+                        continue
+                    # 别名形如 posts_1、comments_2
+                    table = re.sub(r'_\d+$', '', match.group(1))
+                    if table in HOT_TABLES:
+                        found.append((statement, detail))
+    return found
+
+
+def assert_indexed(app, client, url, headers=None):
+    with capture_selects(app) as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert statements, url
+    scans = full_scans(app, statements)
+    assert not scans, "%s 出现全表扫描:\n%s" % (
+        url, "\n\n".join("%s\n  -> %s" % scan for scan in scans)
+    )
+
+
+@pytest.mark.parametrize("url", [
+    "/api/posts",
+    "/api/posts?sort=views",
+    "/api/posts?sort=created_at&order=asc",
+    "/api/posts?category_id={category_id}",
+    "/api/posts?category_id={category_id}&with_total=1",
+    "/api/posts?tag_id={tag_id}",
+    "/api/posts?cursor=",
+    "/api/posts/{slug}",
+    "/api/posts/{post_id}/views",
+    "/api/archives",
+    "/api/posts/{post_id}/comments",
+    "/api/posts/{post_id}/comments?tree=1",
+])
+def test_public_routes_use_indexes(app, client, seeded, url):
+    assert_indexed(app, client, url.format(**seeded))
+
+
+@pytest.mark.parametrize("url", [
+    "/api/admin/logs",
+    "/api/admin/logs?status_code=200",
+    "/api/admin/logs?user_id={user_id}",
+    "/api/admin/users",
+])
+def test_admin_routes_use_indexes(app, client, seeded, admin_token, url):
+    headers = {"Authorization": "Bearer %s" % admin_token}
+    assert_indexed(app, client, url.format(**seeded), headers=headers)
@@ -0,0 +1,95 @@
+"""
+响应缓存测试
+"""
+import os
+import time
+
+from app import db
+from app.models import Comment, User
+from app.utils.response_cache import DiskBackend
+
+from conftest import auth
+
+
+def cache_files(backend):
+    return sorted(path for expires_at, path in backend._entries())
+
+
+def test_disk_backend_removes_expired_entry_on_get(tmp_path):
+    backend = DiskBackend(str(tmp_path))
+    backend.set('/api/posts', 'body', ttl=60)
+    assert backend.get('/api/posts') == 'body'
+
+    backend.set('/api/archives', 'body', ttl=-1)
+    assert backend.get('/api/archives') is None
+    assert len(cache_files(backend)) == 1
+
+
+def test_disk_backend_sweep_drops_expired_and_caps_size(tmp_path):
+    backend = DiskBackend(str(tmp_path), maxsize=3, sweep_interval=3600)
+    for i in range(5):
+        backend.set(f'/api/posts?page={i}', i, ttl=60 + i)
+    backend.set('/api/posts?page=expired', 'old', ttl=-1)
+    # 写入中断留下的临时文件
+    stale = os.path.join(str(tmp_path), '00', 'orphan.tmp')
+    os.makedirs(os.path.dirname(stale), exist_ok=True)
+    open(stale, 'wb').close()
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+
+    assert backend.sweep() == 4
+    assert len(cache_files(backend)) == 3
+    # 保留最晚过期的条目
+    assert [backend.get(f'/api/posts?page={i}') for i in range(5)] == [None, None, 2, 3, 4]
+
+
+def titles(client):
+    r = client.get("/api/posts?per_page=50")
+    assert r.status_code == 200
+    return r, [item["title"] for item in r.get_json()["data"]["items"]]
+
+
+def test_post_delete_invalidates_list(client, admin_token, make_post, memory_cache):
+    post = make_post("将被删除的文章")
+    assert "将被删除的文章" in titles(client)[1]
+    assert titles(client)[0].headers["X-Cache"] == "HIT"
+
+    assert client.delete(f"/api/posts/{post['id']}", headers=auth(admin_token)).status_code == 200
+    r, items = titles(client)
+    assert r.headers["X-Cache"] == "MISS"
+    assert "将被删除的文章" not in items
+
+
+def test_comment_and_user_delete_invalidate_detail(app, client, make_post, make_user, memory_cache,
+                                                  admin_token):
+    post = make_post("缓存评论数")
+    user_id, token = make_user("cached_commenter")
+    url = f"/api/posts/{post['slug']}"
+
+    r = client.post(f"/api/posts/{post['id']}/comments", json={"content": "评论"}, headers=auth(token))
+    comment_id = r.get_json()["data"]["id"]
+    assert client.get(url).get_json()["data"]["comment_count"] == 1
+    assert client.get(url).headers["X-Cache"] == "HIT"
+
+    # 删除评论
+    assert client.delete(f"/api/comments/{comment_id}", headers=auth(token)).status_code == 200
+    r = client.get(url)
+    assert r.headers["X-Cache"] == "MISS"
+    assert r.get_json()["data"]["comment_count"] == 0
+
+    # 删除用户，其评论随之删除（用户不登录，避免留下登录记录）
+    with app.app_context():
+        silent = User(username="silent_commenter", email="silent@test.com")
+        silent.set_password("secret123")
+        db.session.add(silent)
+        db.session.flush()
+        db.session.add(Comment(content="评论", post_id=post["id"], user_id=silent.id))
+        db.session.commit()
+        silent_id = silent.id
+    memory_cache.invalidate("posts")
+    assert client.get(url).get_json()["data"]["comment_count"] == 1
+    assert client.get(url).headers["X-Cache"] == "HIT"
+
+    assert client.delete(f"/api/admin/users/{silent_id}", headers=auth(admin_token)).status_code == 200
+    r = client.get(url)
+    assert r.headers["X-Cache"] == "MISS"
+    assert r.get_json()["data"]["comment_count"] == 0
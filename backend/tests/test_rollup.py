@@ -0,0 +1,93 @@
+"""
+API日志预聚合测试：区间拆分、延迟草图、桶的累加写入
+"""
+import random
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import db
+from app.models import APILogRollup
+from app.utils.rollup import LatencySketch, aggregate, log_rollup, split_range
+
+
+def dt(*args):
+    return datetime(2026, 3, *args)
+
+
+def test_split_range_whole_days_with_partial_edges():
+    segments = split_range(dt(1, 22, 30), dt(4, 1, 15))
+    assert segments == [
+        ('minute', dt(1, 22, 30), dt(1, 23, 0)),
+        ('hour', dt(1, 23, 0), dt(2, 0, 0)),
+        ('day', dt(2, 0, 0), dt(4, 0, 0)),
+        ('hour', dt(4, 0, 0), dt(4, 1, 0)),
+        ('minute', dt(4, 1, 0), dt(4, 1, 15)),
+    ]
+
+
+def test_split_range_on_bucket_boundaries():
+    # 起止都在零点：只有天桶
+    assert split_range(dt(1), dt(3)) == [('day', dt(1), dt(3))]
+    # 起止都在整点且不跨天：只有小时桶
+    assert split_range(dt(1, 5), dt(1, 8)) == [('hour', dt(1, 5), dt(1, 8))]
+
+
+def test_split_range_rounds_partial_minutes():
+    # 开始时间向下、结束时间向上取整到分钟
+    assert split_range(dt(1, 5, 10, 30), dt(1, 5, 12, 1)) == [('minute', dt(1, 5, 10), dt(1, 5, 13))]
+    assert split_range(dt(1, 5, 10), dt(1, 5, 10)) == []
+    assert split_range(dt(1, 5, 10), dt(1, 5, 9)) == []
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(-4, 1) for _ in range(5000))
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= LatencySketch.RELATIVE_ACCURACY + 1e-9
+    assert LatencySketch().quantile(0.5) is None
+
+
+def test_sketch_merge_equals_combined_sketch():
+    fast, slow, combined = LatencySketch(), LatencySketch(), LatencySketch()
+    for i in range(1, 101):
+        fast.add(i / 1000)
+        slow.add(i / 10)
+        combined.add(i / 1000)
+        combined.add(i / 10)
+    merged = LatencySketch.from_json(fast.to_json()).merge(slow)
+    assert merged.bins == combined.bins
+    assert merged.count == 200
+    assert merged.quantile(0.99) == combined.quantile(0.99)
+
+
+def test_apply_upserts_existing_bucket(app):
+    route = '/api/rollup-test/<int:id>'
+    created_at = dt(10, 12, 0, 5)
+
+    def batch(*latencies):
+        return aggregate([{'method': 'GET', 'route': route, 'status_code': 200,
+                           'response_time': latency, 'created_at': created_at} for latency in latencies])
+
+    with db.engine.begin() as conn:
+        log_rollup.apply(conn, batch(0.01, 0.03))
+    with db.engine.begin() as conn:
+        log_rollup.apply(conn, batch(0.05))
+
+    table = APILogRollup.__table__
+    rows = db.session.execute(select(table).where(table.c.route == route)).all()
+    # 三种粒度各一个桶，第二批累加进已有的桶
+    assert sorted(row.granularity for row in rows) == ['day', 'hour', 'minute']
+    for row in rows:
+        assert row.count == 3
+        assert abs(row.latency_sum - 0.09) < 1e-9
+        assert row.latency_min == 0.01
+        assert row.latency_max == 0.05
+        assert LatencySketch.from_json(row.latency_sketch).count == 3
+
+    result = log_rollup.query(dt(10, 11), dt(10, 13), group_by=('route',))
+    assert result[(route,)].count == 3
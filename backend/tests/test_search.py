@@ -0,0 +1,65 @@
+"""
+全文搜索测试：分词、查询词、中文二元组检索、相关度排序
+"""
+import pytest
+
+from app.utils.search import MemorySearchBackend, query_terms, tokenize
+
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert tokenize("全文搜索") == ["全文", "文搜", "搜索", "索"]
+    assert tokenize("Flask 入门 v2") == ["flask", "入门", "门", "v2"]
+    assert tokenize("") == []
+
+
+def test_query_terms_prefix_rules():
+    # 单字和英文词按前缀匹配，多字中文按二元组精确匹配，重复的词只保留一次
+    assert query_terms("搜") == [("搜", True)]
+    assert query_terms("Python 缓存缓存") == [("python", True), ("缓存", False), ("存缓", False)]
+    assert query_terms("  ,.!") == []
+
+
+def keyword_titles(client, keyword):
+    r = client.get("/api/posts", query_string={"keyword": keyword, "per_page": 50})
+    assert r.status_code == 200
+    return [item["title"] for item in r.get_json()["data"]["items"]]
+
+
+@pytest.fixture()
+def search_posts(make_post):
+    make_post("数据库索引优化")
+    make_post("前端工程化")
+    make_post("随笔：数据库索引与缓存")
+
+
+def test_cjk_bigram_search(client, search_posts):
+    titles = keyword_titles(client, "索引")
+    assert set(titles) >= {"数据库索引优化", "随笔：数据库索引与缓存"}
+    assert "前端工程化" not in titles
+    # 二元组都要命中
+    assert "数据库索引优化" not in keyword_titles(client, "索缓")
+
+
+def test_ranked_by_relevance(client, make_post):
+    # 标题命中的文章排在前面，尽管它发布得更早
+    titled = make_post("限流策略详解", "令牌桶和漏桶两种限流方式")
+    make_post("周末随笔", "顺便聊了聊接口限流")
+    assert keyword_titles(client, "限流")[:2] == [titled["title"], "周末随笔"]
+
+
+def test_memory_backend_resyncs_only_after_writes(app, make_post, monkeypatch):
+    backend = MemorySearchBackend()
+    syncs = []
+    sync = backend._sync
+    monkeypatch.setattr(backend, "_sync", lambda: syncs.append(1) or sync())
+
+    make_post("内存索引一")
+    with app.app_context():
+        assert backend.search("内存索引")
+        backend.search("内存索引")
+        assert len(syncs) == 1
+
+    make_post("内存索引二")
+    with app.app_context():
+        assert len(backend.search("内存索引")) == 2
+        assert len(syncs) == 2
@@ -1,7 +1,9 @@
 import request from '../utils/request'
 
 export const getPosts = (params) => request.get('/posts', { params })
+export const getArchives = () => request.get('/archives')
 export const getPost = (slug) => request.get(`/posts/${slug}`)
+export const getPostViews = (id) => request.get(`/posts/${id}/views`)
 export const createPost = (data) => request.post('/posts', data)
 export const updatePost = (id, data) => request.put(`/posts/${id}`, data)
 export const deletePost = (id) => request.delete(`/posts/${id}`)